@@ -0,0 +1,213 @@
+"""
+Retention and archival of old configuration revisions.
+
+Every upload adds a revision that stays in its resource table forever, so
+the tables and their indexes keep growing although reads almost always
+want recent revisions. :func:`archive_history` moves revisions that are
+older than ARCHIVE_AFTER_DAYS out of the four resource tables into the
+``archived_revisions`` table, except the newest ARCHIVE_KEEP_LATEST of each
+group (the current configuration is never moved). Archived revisions keep
+their ID and timestamps; their other columns are stored as zlib-compressed
+JSON.
+
+Reads fall back to the archive transparently: by-ID reads look there when
+the ID is not in the resource table, and bulk reads merge archived
+revisions in when called with ``include_archived``. The job runs on
+``POST /db/archive``, and main.py also runs it every ARCHIVE_INTERVAL_HOURS
+when that is set (off by default: archiving hides old revisions from reads
+without ``include_archived``).
+"""
+import json
+import os
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from child_rows import delete_child_rows
+from models import ArchivedRevision, CurrentConfig
+from revisions import hydrate, release_revisions
+
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "365"))
+ARCHIVE_KEEP_LATEST = int(os.getenv("ARCHIVE_KEEP_LATEST", "10"))
+ARCHIVE_INTERVAL_HOURS = float(os.getenv("ARCHIVE_INTERVAL_HOURS", "0"))
+# Revisions moved per transaction
+ARCHIVE_BATCH_SIZE = 500
+
+# Columns stored outside the compressed payload
+_KEY_COLUMNS = ("id", "analytical_group", "created_at", "updated_at")
+
+
+def _pack(record: Dict[str, Any]) -> bytes:
+    payload = {name: value for name, value in record.items() if name not in _KEY_COLUMNS}
+    return zlib.compress(json.dumps(payload, separators=(",", ":")).encode())
+
+
+def _unpack(row) -> Dict[str, Any]:
+    return {
+        "id": row.record_id,
+        "analytical_group": row.analytical_group,
+        **json.loads(zlib.decompress(row.payload)),
+        "created_at": row.created_at,
+        "updated_at": row.updated_at,
+    }
+
+
+def _project(record: Dict[str, Any], columns: Optional[List[str]]) -> Dict[str, Any]:
+    return record if columns is None else {name: record.get(name) for name in columns}
+
+
+def get_archived(db: Session, model, record_id: int) -> Optional[Dict[str, Any]]:
+    """Return an archived revision of ``model`` as a dict, or None."""
+    archive = ArchivedRevision.__table__
+    row = db.execute(
+        select(archive).where(archive.c.resource == model.__tablename__, archive.c.record_id == record_id)
+    ).first()
+    return _unpack(row) if row else None
+
+
+def get_archived_many(db: Session, model, record_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """Return ``{record_id: record}`` for the archived revisions of ``model`` among ``record_ids``."""
+    archive = ArchivedRevision.__table__
+    rows = db.execute(
+        select(archive).where(archive.c.resource == model.__tablename__, archive.c.record_id.in_(record_ids))
+    )
+    return {row.record_id: _unpack(row) for row in rows}
+
+
+def read_archived(
+    db: Session,
+    model,
+    analytical_group: Optional[str] = None,
+    after: Optional[Tuple[datetime, int]] = None,
+    limit: Optional[int] = None,
+    columns: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Read archived revisions of ``model`` as dicts, newest first.
+
+    Uses the same ``(created_at, id)`` order and keyset position ``after``
+    as :func:`crud.build_list_query`, so the result merges with a page of
+    the resource table.
+    """
+    archive = ArchivedRevision.__table__
+    stmt = select(archive).where(archive.c.resource == model.__tablename__)
+    if analytical_group:
+        stmt = stmt.where(archive.c.analytical_group == analytical_group)
+    if after:
+        created_at, record_id = after
+        stmt = stmt.where(or_(
+            archive.c.created_at < created_at,
+            and_(archive.c.created_at == created_at, archive.c.record_id < record_id),
+        ))
+    stmt = stmt.order_by(archive.c.created_at.desc(), archive.c.record_id.desc())
+    if limit:
+        stmt = stmt.limit(limit)
+    return [_project(_unpack(row), columns) for row in db.execute(stmt)]
+
+
+def archive_validator(db: Session, model, analytical_group: Optional[str] = None) -> Tuple[int, Optional[int]]:
+    """``(count, max(record_id))`` of the archived revisions of ``model`` (in ``analytical_group``)."""
+    archive = ArchivedRevision.__table__
+    stmt = select(func.count(), func.max(archive.c.record_id)).where(archive.c.resource == model.__tablename__)
+    if analytical_group:
+        stmt = stmt.where(archive.c.analytical_group == analytical_group)
+    count, max_id = db.execute(stmt).one()
+    return count, max_id
+
+
+def delete_archived(db: Session, model, record_id: int) -> Optional[str]:
+    """Delete an archived revision. Returns its analytical_group, or None. The caller commits."""
+    archive = ArchivedRevision.__table__
+    key = (archive.c.resource == model.__tablename__, archive.c.record_id == record_id)
+    group = db.execute(select(archive.c.analytical_group).where(*key)).scalar()
+    if group is not None:
+        db.execute(delete(archive).where(*key))
+    return group
+
+
+def _archivable_ids(db: Session, model, group: str, cutoff: datetime, keep_latest: int, limit: int) -> List[int]:
+    """IDs of the group's revisions older than ``cutoff``, except its newest ``keep_latest`` and the current one."""
+    table, current = model.__table__, CurrentConfig.__table__
+    oldest_kept = db.execute(
+        select(table.c.id)
+        .where(table.c.analytical_group == group)
+        .order_by(table.c.id.desc())
+        .offset(keep_latest - 1)
+        .limit(1)
+    ).scalar()
+    if oldest_kept is None:
+        return []
+    current_id = db.execute(
+        select(current.c.record_id).where(current.c.resource == table.name, current.c.analytical_group == group)
+    ).scalar()
+    stmt = (
+        select(table.c.id)
+        .where(table.c.analytical_group == group, table.c.id < oldest_kept, table.c.created_at < cutoff)
+        .order_by(table.c.id)
+        .limit(limit)
+    )
+    if current_id is not None:
+        stmt = stmt.where(table.c.id != current_id)
+    return list(db.execute(stmt).scalars())
+
+
+def archive_history(
+    db: Session,
+    models: List[Any],
+    max_age_days: float = ARCHIVE_AFTER_DAYS,
+    keep_latest: int = ARCHIVE_KEEP_LATEST,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+) -> Dict[str, Dict[str, int]]:
+    """
+    Move old revisions of ``models`` to the archive, committing per batch.
+
+    A revision is moved if it was created more than ``max_age_days`` ago
+    (measured with the database clock) and is not among the newest
+    ``keep_latest`` (at least 1) of its group. Its child rows are deleted
+    and revisions stored as diffs against it are stored in full first.
+    Returns ``{table name: {group: revisions moved}}`` for cache invalidation.
+    """
+    keep_latest = max(1, keep_latest)
+    now = db.execute(select(func.now())).scalar()
+    if isinstance(now, str):
+        now = datetime.fromisoformat(now)
+    cutoff = now - timedelta(days=max_age_days)
+    archive = ArchivedRevision.__table__
+
+    moved: Dict[str, Dict[str, int]] = {}
+    for model in models:
+        table = model.__table__
+        groups = db.execute(select(table.c.analytical_group).distinct()).scalars().all()
+        for group in groups:
+            while True:
+                ids = _archivable_ids(db, model, group, cutoff, keep_latest, batch_size)
+                if not ids:
+                    break
+                try:
+                    records = hydrate(db, model, [dict(r) for r in db.execute(
+                        select(table).where(table.c.id.in_(ids))
+                    ).mappings()])
+                    release_revisions(db, model, ids)
+                    delete_child_rows(db, model, ids)
+                    db.execute(insert(archive), [
+                        {
+                            "resource": table.name,
+                            "record_id": record["id"],
+                            "analytical_group": record["analytical_group"],
+                            "created_at": record["created_at"],
+                            "updated_at": record["updated_at"],
+                            "payload": _pack(record),
+                        }
+                        for record in records
+                    ])
+                    db.execute(table.delete().where(table.c.id.in_(ids)))
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    raise
+                counts = moved.setdefault(table.name, {})
+                counts[group] = counts.get(group, 0) + len(ids)
+    return moved
@@ -0,0 +1,159 @@
+"""
+In-process read-through cache for configuration reads.
+
+The same analytical group configurations are read over and over by the Tk
+pages, integration.py and the hardware path. Single-record reads and
+group-filtered bulk reads are cached here in a bounded LRU with a TTL, and
+the write endpoints invalidate exactly the entries they affect:
+
+- entries are tagged with :func:`record_tag` (one record) and/or
+  :func:`group_tag` (reads that depend on one group of one resource)
+- POST invalidates the group tags of the groups it wrote to
+- DELETE invalidates the deleted record's tag and its group's tag
+
+Settings come from the environment: CACHE_MAX_ENTRIES (default 1024, 0
+disables caching) and CACHE_TTL_SECONDS (default 60). The cache is per
+process; with several uvicorn workers another worker's entry can be stale
+for at most the TTL.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Set, Tuple
+
+_MISSING = object()
+
+
+def record_tag(resource: str, record_id: int) -> Tuple:
+    return ("record", resource, record_id)
+
+
+def group_tag(resource: str, analytical_group: str) -> Tuple:
+    return ("group", resource, analytical_group)
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, Tuple]]" = OrderedDict()
+        self._keys_by_tag: Dict[Hashable, Set[Hashable]] = {}
+        # Bumped by every invalidation; a load that overlapped one is not stored
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _remove(self, key: Hashable):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[Hashable] = (), generation: int = None):
+        """Store ``value``; skipped if ``generation`` is given and an invalidation happened since."""
+        if self.maxsize <= 0:
+            return
+        tags = tuple(tags)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, tags)
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    async def read_through(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        tags: Iterable[Hashable] = (),
+    ) -> Any:
+        """Return the cached value for ``key`` or await ``loader()`` and cache it.
+
+        None results (e.g. record not found) are not cached.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        generation = self._generation
+        value = await loader()
+        if value is not None:
+            self.set(key, value, tags, generation=generation)
+        return value
+
+    def discard(self, key: Hashable):
+        """Drop a single entry if present."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate(self, *tags: Hashable) -> int:
+        """Drop every entry carrying any of ``tags``. Returns the number removed."""
+        removed = 0
+        with self._lock:
+            self._generation += 1
+            for tag in tags:
+                for key in list(self._keys_by_tag.get(tag, ())):
+                    self._remove(key)
+                    removed += 1
+            self.invalidations += removed
+        return removed
+
+    def invalidate_groups(self, resource: str, groups: Iterable[str]) -> int:
+        return self.invalidate(*(group_tag(resource, g) for g in set(groups)))
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._keys_by_tag.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+config_cache = TTLCache(
+    maxsize=int(os.getenv("CACHE_MAX_ENTRIES", "1024")),
+    ttl=float(os.getenv("CACHE_TTL_SECONDS", "60")),
+)
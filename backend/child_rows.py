@@ -0,0 +1,241 @@
+"""
+Normalized child rows for the element, channel and attenuator tables.
+
+The arrays in ElementInformation.elements, ChannelInformation.channels and
+AttenuatorInformation.left_table / right_table are mirrored into
+element_entries, channel_entries and attenuator_entries (see models.py)
+whenever a record is inserted, so the search endpoints can answer questions
+such as "which groups measure Mn at 293.3 nm" from indexes. The JSON columns
+remain the source of truth; :func:`backfill_child_rows` rebuilds the mirrors
+for records written before these tables existed.
+"""
+import math
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, exists, insert, select
+from sqlalchemy.orm import Session
+
+from models import AttenuatorEntry, ChannelEntry, CurrentConfig, ElementEntry
+from revisions import hydrate
+
+# Parent rows read per batch when backfilling
+BACKFILL_BATCH_SIZE = 500
+# Length of the text columns of the child tables (see models.py)
+TEXT_LENGTH = 255
+# Largest value of an INTEGER column on every backend
+MAX_INT = 2**31 - 1
+
+
+def _number(value: Any, cast: Callable = float) -> Optional[Any]:
+    """
+    Parse a numeric string such as "259.940" (or "259.9+1", using the part before "+").
+
+    Returns None when the value does not parse or does not fit its column.
+    """
+    try:
+        number = cast(str(value).split("+")[0])
+    except (TypeError, ValueError):
+        return None
+    if cast is int:
+        return number if -MAX_INT <= number <= MAX_INT else None
+    return number if math.isfinite(number) else None
+
+
+def _text(value: Any) -> str:
+    return str(value or "")[:TEXT_LENGTH]
+
+
+def _symbol(value: Any) -> str:
+    return _text(value).strip().upper()
+
+
+def _element_entries(record: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "ele_name": _symbol(e.get("ele_name")),
+            "chemic_ele": _symbol(e.get("chemic_ele")),
+            "element": _text(e.get("element")),
+            "asterisk": _text(e.get("asterisk")),
+            "analytical_range_min": _number(e.get("analytical_range_min")),
+            "analytical_range_max": _number(e.get("analytical_range_max")),
+        }
+        for e in record.get("elements") or []
+    ]
+
+
+def _channel_entries(record: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "ele_name": _symbol(c.get("ele_name")),
+            "wavelength": _number(c.get("w_lengh")),
+            "seq": _number(c.get("seq"), int),
+            "w_no": _text(c.get("w_no")),
+            "interval_element": _symbol(c.get("interval_element")),
+            "interval_value": _number(c.get("interval_value")),
+        }
+        for c in record.get("channels") or []
+    ]
+
+
+def _attenuator_entries(record: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "side": side,
+            "element": _symbol(a.get("element")),
+            "ele_value": _number(a.get("ele_value")),
+            "att_value": _number(a.get("att_value"), int),
+        }
+        for side in ("left", "right")
+        for a in record.get(f"{side}_table") or []
+    ]
+
+
+# Parent table name -> (child model, JSON columns it is built from, extractor)
+CHILD_TABLES: Dict[str, Tuple[Any, Tuple[str, ...], Callable]] = {
+    "element_information": (ElementEntry, ("elements",), _element_entries),
+    "channel_information": (ChannelEntry, ("channels",), _channel_entries),
+    "attenuator_information": (AttenuatorEntry, ("left_table", "right_table"), _attenuator_entries),
+}
+
+
+def child_rows_for(model, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Build the child rows of ``records`` (dicts with ``id``, group and JSON columns)."""
+    _, _, extract = CHILD_TABLES[model.__tablename__]
+    rows = []
+    for record in records:
+        for position, entry in enumerate(extract(record)):
+            entry.update(record_id=record["id"], analytical_group=record["analytical_group"], position=position)
+            rows.append(entry)
+    return rows
+
+
+def insert_child_rows(db: Session, model, records: List[Dict[str, Any]]):
+    """Insert the child rows of freshly inserted ``records``. The caller commits."""
+    if model.__tablename__ not in CHILD_TABLES:
+        return
+    rows = child_rows_for(model, records)
+    if rows:
+        db.execute(insert(CHILD_TABLES[model.__tablename__][0].__table__), rows)
+
+
+def delete_child_rows(db: Session, model, record_ids: List[int]):
+    """Delete the child rows of ``record_ids``. The caller commits."""
+    if model.__tablename__ not in CHILD_TABLES or not record_ids:
+        return
+    child = CHILD_TABLES[model.__tablename__][0].__table__
+    db.execute(delete(child).where(child.c.record_id.in_(record_ids)))
+
+
+def backfill_child_rows(db: Session, models: List[Any], batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """
+    Build child rows for parent records that have none, committing per batch.
+
+    Only parents without any child row are read, so this is cheap once the
+    tables are in sync and safe to run at every startup. Returns the number
+    of parent records processed.
+    """
+    processed = 0
+    for model in models:
+        if model.__tablename__ not in CHILD_TABLES:
+            continue
+        child_model, json_columns, _ = CHILD_TABLES[model.__tablename__]
+        table, child = model.__table__, child_model.__table__
+        columns = [table.c.id, table.c.analytical_group, *(table.c[name] for name in json_columns)]
+        last_id = 0
+        while True:
+            batch = db.execute(
+                select(*columns)
+                .where(table.c.id > last_id, ~exists().where(child.c.record_id == table.c.id))
+                .order_by(table.c.id)
+                .limit(batch_size)
+            ).mappings().all()
+            if not batch:
+                break
+            insert_child_rows(db, model, hydrate(db, model, [dict(r) for r in batch]))
+            db.commit()
+            processed += len(batch)
+            last_id = batch[-1]["id"]
+    return processed
+
+
+def _search(
+    db: Session,
+    child_model,
+    resource: str,
+    conditions: List[Any],
+    analytical_group: Optional[str],
+    current_only: bool,
+    limit: Optional[int],
+) -> List[Dict[str, Any]]:
+    child = child_model.__table__
+    stmt = select(*(c for c in child.columns if c.name != "id")).where(*conditions)
+    if analytical_group:
+        stmt = stmt.where(child.c.analytical_group == analytical_group)
+    if current_only:
+        # Keep only rows of each group's current configuration (pointer primary key lookup)
+        current = CurrentConfig.__table__
+        stmt = stmt.join(current, (current.c.resource == resource)
+                         & (current.c.analytical_group == child.c.analytical_group)
+                         & (current.c.record_id == child.c.record_id))
+    stmt = stmt.order_by(child.c.analytical_group, child.c.record_id, child.c.position)
+    if limit:
+        stmt = stmt.limit(limit)
+    return [dict(r) for r in db.execute(stmt).mappings()]
+
+
+def search_elements(
+    db: Session,
+    ele_name: Optional[str] = None,
+    chemic_ele: Optional[str] = None,
+    analytical_group: Optional[str] = None,
+    current_only: bool = True,
+    limit: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Element entries matching the given element name / chemical element."""
+    child = ElementEntry.__table__
+    conditions = []
+    if ele_name:
+        conditions.append(child.c.ele_name == _symbol(ele_name))
+    if chemic_ele:
+        conditions.append(child.c.chemic_ele == _symbol(chemic_ele))
+    return _search(db, ElementEntry, "element_information", conditions, analytical_group, current_only, limit)
+
+
+def search_channels(
+    db: Session,
+    ele_name: Optional[str] = None,
+    wavelength: Optional[float] = None,
+    tolerance: float = 0.05,
+    interval_element: Optional[str] = None,
+    analytical_group: Optional[str] = None,
+    current_only: bool = True,
+    limit: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Channel entries matching an element, a wavelength (within ``tolerance`` nm) and/or interval element."""
+    child = ChannelEntry.__table__
+    conditions = []
+    if ele_name:
+        conditions.append(child.c.ele_name == _symbol(ele_name))
+    if wavelength is not None:
+        conditions.append(child.c.wavelength.between(wavelength - tolerance, wavelength + tolerance))
+    if interval_element:
+        conditions.append(child.c.interval_element == _symbol(interval_element))
+    return _search(db, ChannelEntry, "channel_information", conditions, analytical_group, current_only, limit)
+
+
+def search_attenuators(
+    db: Session,
+    element: Optional[str] = None,
+    side: Optional[str] = None,
+    analytical_group: Optional[str] = None,
+    current_only: bool = True,
+    limit: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Attenuator entries matching an element and/or table side."""
+    child = AttenuatorEntry.__table__
+    conditions = []
+    if element:
+        conditions.append(child.c.element == _symbol(element))
+    if side:
+        conditions.append(child.c.side == side)
+    return _search(db, AttenuatorEntry, "attenuator_information", conditions, analytical_group, current_only, limit)
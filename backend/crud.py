@@ -0,0 +1,433 @@
+"""
+Shared database helpers used by the endpoints in main.py.
+
+The four resources (analytical conditions, element, channel and attenuator
+information) share the same table layout: an auto-increment ``id``, an
+``analytical_group``, one or more JSON payload columns and the
+``created_at`` / ``updated_at`` audit timestamps. The helpers below work on
+any of those models so the per-resource endpoints stay thin.
+"""
+import base64
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, insert, or_, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from archive import archive_validator, delete_archived, get_archived, get_archived_many, read_archived
+from child_rows import delete_child_rows, insert_child_rows
+from models import CurrentConfig
+from revisions import compact_superseded, detach_dependents, hydrate
+
+# Rows per INSERT statement. Keeps a single statement well below MySQL's
+# default max_allowed_packet even for large element/channel arrays.
+BULK_INSERT_BATCH_SIZE = 1000
+# IDs per IN (...) list when reading records by ID
+ID_LOOKUP_BATCH_SIZE = 1000
+
+
+def bulk_insert(db: Session, model, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Insert ``rows`` into the table of ``model`` without per-row round trips.
+
+    Each row is a dict of column values (typically ``Create.model_dump()``).
+    Returns one ``{"id", "created_at", "updated_at"}`` dict per input row, in
+    input order. The caller is responsible for committing.
+
+    Backends with INSERT ... RETURNING (SQLite, MariaDB, PostgreSQL) get the
+    generated values back from the insert itself. MySQL has no RETURNING, so
+    each batch is written as one multi-row INSERT and the generated values are
+    read back with a single range SELECT: a multi-row INSERT with a known row
+    count is allocated a consecutive block of AUTO_INCREMENT values starting
+    at LAST_INSERT_ID().
+    """
+    if not rows:
+        return []
+
+    table = model.__table__
+    generated = (table.c.id, table.c.created_at, table.c.updated_at)
+    dialect = db.get_bind().dialect
+
+    if dialect.insert_executemany_returning_sort_by_parameter_order:
+        result = db.execute(
+            insert(table).returning(*generated, sort_by_parameter_order=True),
+            rows,
+        )
+        return [dict(r) for r in result.mappings()]
+
+    created: List[Dict[str, Any]] = []
+    for start in range(0, len(rows), BULK_INSERT_BATCH_SIZE):
+        batch = rows[start:start + BULK_INSERT_BATCH_SIZE]
+        result = db.execute(insert(table).values(batch))
+        first_id = result.lastrowid
+        last_id = first_id + len(batch) - 1
+        generated_rows = db.execute(
+            select(*generated)
+            .where(table.c.id.between(first_id, last_id))
+            .order_by(table.c.id)
+        ).mappings().all()
+        if len(generated_rows) != len(batch):
+            raise RuntimeError(
+                f"Expected {len(batch)} generated ids starting at {first_id}, "
+                f"found {len(generated_rows)}"
+            )
+        created.extend(dict(r) for r in generated_rows)
+    return created
+
+
+def set_current(db: Session, resource: str, record_ids: Dict[str, int], newest_wins: bool = True):
+    """
+    Upsert the current-config pointers of ``resource`` to ``{group: record_id}``.
+
+    Uses the dialect's native upsert (ON DUPLICATE KEY UPDATE on MySQL /
+    MariaDB, ON CONFLICT DO UPDATE on SQLite / PostgreSQL). With
+    ``newest_wins`` an existing pointer only moves to a higher id, so two
+    concurrent uploads to the same group cannot leave it on the older one.
+    The caller is responsible for committing.
+    """
+    if not record_ids:
+        return
+    table = CurrentConfig.__table__
+    rows = [
+        {"resource": resource, "analytical_group": group, "record_id": record_id}
+        for group, record_id in record_ids.items()
+    ]
+    dialect = db.get_bind().dialect.name
+
+    if dialect in ("mysql", "mariadb"):
+        stmt = mysql.insert(table).values(rows)
+        new_id = stmt.inserted.record_id
+        stmt = stmt.on_duplicate_key_update(
+            record_id=func.greatest(table.c.record_id, new_id) if newest_wins else new_id,
+            updated_at=func.now(),
+        )
+    elif dialect in ("sqlite", "postgresql"):
+        stmt = (sqlite if dialect == "sqlite" else postgresql).insert(table).values(rows)
+        new_id = stmt.excluded.record_id
+        if newest_wins:
+            new_id = (func.max if dialect == "sqlite" else func.greatest)(table.c.record_id, new_id)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.resource, table.c.analytical_group],
+            set_={"record_id": new_id, "updated_at": func.now()},
+        )
+    else:
+        db.execute(delete(table).where(
+            table.c.resource == resource,
+            table.c.analytical_group.in_(list(record_ids)),
+        ))
+        stmt = insert(table).values(rows)
+    db.execute(stmt)
+
+
+def insert_records(db: Session, model, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Bulk insert ``rows`` and commit, rolling back on any error.
+
+    The records' normalized child rows are written, the revisions they
+    supersede are re-stored as diffs (see revisions.py) and the newest
+    inserted row of each group becomes that group's current configuration,
+    all in the same transaction.
+    """
+    try:
+        created = bulk_insert(db, model, rows)
+        records = [{**row, **generated} for row, generated in zip(rows, created)]
+        insert_child_rows(db, model, records)
+        compact_superseded(db, model, records)
+        latest = {}
+        for row, generated in zip(rows, created):
+            latest[row["analytical_group"]] = generated["id"]
+        set_current(db, model.__tablename__, latest)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return created
+
+
+def get_record(db: Session, model, record_id: int) -> Optional[Dict[str, Any]]:
+    """Return a single record as a dict (looking in the archive too), or None if it does not exist."""
+    table = model.__table__
+    row = db.execute(select(table).where(table.c.id == record_id)).mappings().first()
+    if row is None:
+        return get_archived(db, model, record_id)
+    return hydrate(db, model, [dict(row)])[0]
+
+
+def parse_id_list(value: str) -> List[int]:
+    """Parse a comma-separated ID list such as "1,2,3". Raises ValueError if malformed."""
+    try:
+        return [int(part) for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise ValueError(f"Invalid ID list: {value!r}")
+
+
+def get_records(db: Session, model, record_ids: List[int]) -> Tuple[List[Dict[str, Any]], List[int]]:
+    """
+    Return ``(records, missing_ids)`` for ``record_ids``.
+
+    Records come back in the requested order (each ID once) from one
+    ``IN (...)`` query per ID_LOOKUP_BATCH_SIZE IDs, plus one archive query
+    for IDs not found in the resource table. ``missing_ids`` lists the IDs
+    found in neither, in requested order.
+    """
+    table = model.__table__
+    ids = list(dict.fromkeys(record_ids))
+    found: Dict[int, Dict[str, Any]] = {}
+    for start in range(0, len(ids), ID_LOOKUP_BATCH_SIZE):
+        chunk = ids[start:start + ID_LOOKUP_BATCH_SIZE]
+        rows = [dict(r) for r in db.execute(select(table).where(table.c.id.in_(chunk))).mappings()]
+        found.update((record["id"], record) for record in hydrate(db, model, rows))
+    absent = [record_id for record_id in ids if record_id not in found]
+    for start in range(0, len(absent), ID_LOOKUP_BATCH_SIZE):
+        found.update(get_archived_many(db, model, absent[start:start + ID_LOOKUP_BATCH_SIZE]))
+    return [found[i] for i in ids if i in found], [i for i in ids if i not in found]
+
+
+def get_latest(db: Session, model, analytical_group: str) -> Optional[Dict[str, Any]]:
+    """
+    Return the current configuration of ``analytical_group`` as a dict, or None.
+
+    Two primary key lookups (pointer, then record) regardless of how many
+    revisions the group has.
+    """
+    table = model.__table__
+    current = CurrentConfig.__table__
+    row = db.execute(
+        select(table)
+        .join(current, current.c.record_id == table.c.id)
+        .where(current.c.resource == table.name, current.c.analytical_group == analytical_group)
+    ).mappings().first()
+    return hydrate(db, model, [dict(row)])[0] if row else None
+
+
+def get_group_snapshot(db: Session, models: List[Any], analytical_group: str) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Return ``{table name: current configuration or None}`` of ``analytical_group``.
+
+    One pointer-join query per table (see :func:`get_latest`), all on the
+    same session, so a client gets the whole setup of a group in one call.
+    """
+    return {model.__tablename__: get_latest(db, model, analytical_group) for model in models}
+
+
+def put_group_config(db: Session, model, analytical_group: str, row: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+    """
+    Make ``row`` the current configuration of ``analytical_group``.
+
+    Returns ``(record, status)`` where status is "created" (first config of
+    the group), "updated" (a new revision was stored and is now current) or
+    "unchanged" (identical to the current config, nothing was written), so
+    repeated uploads of the same settings do not grow the table.
+    """
+    row = {**row, "analytical_group": analytical_group}
+    current = get_latest(db, model, analytical_group)
+    if current is not None and all(current.get(key) == value for key, value in row.items()):
+        return current, "unchanged"
+    created = insert_records(db, model, [row])[0]
+    return {**row, **created}, "updated" if current is not None else "created"
+
+
+def delete_record(db: Session, model, record_id: int) -> Optional[str]:
+    """
+    Delete a single record (or archived revision) and commit.
+
+    If it was its group's current configuration, the group's newest remaining
+    record becomes current (or the pointer is dropped if none is left).
+    Returns the deleted record's analytical_group (so callers can invalidate
+    group-level caches), or None if it did not exist.
+    """
+    table = model.__table__
+    current = CurrentConfig.__table__
+    group = db.execute(select(table.c.analytical_group).where(table.c.id == record_id)).scalar()
+    if group is None:
+        group = delete_archived(db, model, record_id)
+        db.commit()
+        return group
+    try:
+        detach_dependents(db, model, record_id)
+        delete_child_rows(db, model, [record_id])
+        db.execute(table.delete().where(table.c.id == record_id))
+        pointer = (current.c.resource == table.name, current.c.analytical_group == group, current.c.record_id == record_id)
+        if db.execute(select(current.c.record_id).where(*pointer)).first():
+            newest = db.execute(
+                select(table.c.id)
+                .where(table.c.analytical_group == group)
+                .order_by(table.c.created_at.desc(), table.c.id.desc())
+                .limit(1)
+            ).scalar()
+            if newest is None:
+                db.execute(delete(current).where(*pointer))
+            else:
+                set_current(db, table.name, {group: newest}, newest_wins=False)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return group
+
+
+def backfill_current(db: Session, models: List[Any]) -> int:
+    """
+    Create missing current-config pointers from existing rows and commit.
+
+    For each group without a pointer, its highest id becomes current. Run at
+    startup so databases written before the pointer table existed get a
+    complete "latest" view. Returns the number of pointers created.
+    """
+    current = CurrentConfig.__table__
+    created = 0
+    for model in models:
+        table = model.__table__
+        known = select(current.c.analytical_group).where(current.c.resource == table.name)
+        missing = dict(db.execute(
+            select(table.c.analytical_group, func.max(table.c.id))
+            .where(table.c.analytical_group.not_in(known))
+            .group_by(table.c.analytical_group)
+        ).all())
+        set_current(db, table.name, missing)
+        created += len(missing)
+    db.commit()
+    return created
+
+
+def query_validator(
+    db: Session,
+    model,
+    conditions: List[Any],
+    include_archived: bool = False,
+    analytical_group: Optional[str] = None,
+) -> Tuple[Any, ...]:
+    """
+    Cheap change validator for a filtered read: ``(count, max(updated_at), max(id))``.
+
+    Any insert or delete matching ``conditions`` changes at least one of the
+    three values. Served from the group / primary key indexes, so it is much
+    cheaper than reading the rows themselves. With ``include_archived`` the
+    count and highest ID of the group's archived revisions are appended, so
+    archiving or deleting an archived revision changes it too.
+    """
+    table = model.__table__
+    stmt = select(func.count(), func.max(table.c.updated_at), func.max(table.c.id)).select_from(table)
+    if conditions:
+        stmt = stmt.where(*conditions)
+    count, max_updated, max_id = db.execute(stmt).one()
+    validator = (count, max_updated.isoformat() if max_updated else None, max_id)
+    if include_archived:
+        validator += archive_validator(db, model, analytical_group)
+    return validator
+
+
+def encode_cursor(created_at: datetime, record_id: int) -> str:
+    """Encode a keyset position as an opaque, URL-safe cursor string."""
+    raw = f"{created_at.isoformat()}|{record_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by :func:`encode_cursor`. Raises ValueError if malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, record_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(created_at), int(record_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+
+
+# Columns of view=summary per table: the identifying fields and timestamps.
+# Listed explicitly so the summary stays the same when columns are added.
+SUMMARY_COLUMNS: Dict[str, List[str]] = {
+    "analytical_conditions": ["id", "analytical_group", "analytical_method", "created_at", "updated_at"],
+    "element_information": ["id", "analytical_group", "page", "ch_value", "created_at", "updated_at"],
+    "channel_information": ["id", "analytical_group", "page", "created_at", "updated_at"],
+    "attenuator_information": ["id", "analytical_group", "page", "created_at", "updated_at"],
+}
+
+
+def projected_columns(model, view: str = "full", fields: Optional[str] = None) -> Optional[List[str]]:
+    """
+    Resolve the ``view`` / ``fields`` query parameters to a list of column names.
+
+    Returns None for the full view (every column). ``view=summary`` selects
+    the table's :data:`SUMMARY_COLUMNS` (id, group, method/page and
+    timestamps), so the heavy payload columns are never read from the
+    database. ``fields`` is a
+    comma-separated list of column names; ``id`` and ``created_at`` are always
+    included because pagination cursors are built from them. Raises
+    ValueError for unknown field names.
+    """
+    table = model.__table__
+    if fields:
+        names = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in names if name not in table.c]
+        if unknown:
+            raise ValueError(f"Unknown field(s) for {table.name}: {', '.join(unknown)}")
+        return list(dict.fromkeys(["id", *names, "created_at"]))
+    if view == "summary":
+        return list(SUMMARY_COLUMNS[table.name])
+    return None
+
+
+def build_list_query(
+    model,
+    conditions: List[Any],
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    columns: Optional[List[str]] = None,
+):
+    """
+    Build the SELECT used by the bulk read endpoints.
+
+    Rows are ordered newest first by ``(created_at, id)``; ``id`` breaks ties
+    between records created in the same second. When ``cursor`` is given only
+    rows strictly after that position are returned (keyset pagination), so
+    deep pages cost the same as the first one. ``limit`` is applied after the
+    ordering. ``columns`` restricts the SELECT list (see :func:`projected_columns`).
+    """
+    table = model.__table__
+    stmt = select(*(table.c[name] for name in columns)) if columns else select(table)
+    if conditions:
+        stmt = stmt.where(*conditions)
+    if cursor:
+        created_at, record_id = decode_cursor(cursor)
+        stmt = stmt.where(or_(
+            table.c.created_at < created_at,
+            and_(table.c.created_at == created_at, table.c.id < record_id),
+        ))
+    stmt = stmt.order_by(table.c.created_at.desc(), table.c.id.desc())
+    if limit:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def read_page(
+    db: Session,
+    model,
+    conditions: List[Any],
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+    include_archived: bool = False,
+    analytical_group: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Read one page of records as dicts, newest first.
+
+    Returns ``(records, next_cursor)``. ``next_cursor`` is None when there are
+    no more rows after this page (always None when ``limit`` is not given).
+    With ``include_archived`` the page also covers archived revisions (see
+    archive.py); those are only filtered by ``analytical_group``, so
+    ``conditions`` must not hold any other filter.
+    """
+    stmt = build_list_query(model, conditions, cursor, limit + 1 if limit else None, columns)
+    records = hydrate(db, model, [dict(r) for r in db.execute(stmt).mappings()])
+    if include_archived:
+        after = decode_cursor(cursor) if cursor else None
+        archived = read_archived(db, model, analytical_group, after, limit + 1 if limit else None, columns)
+        records = sorted(records + archived, key=lambda r: (r["created_at"], r["id"]), reverse=True)
+    next_cursor = None
+    if limit and len(records) > limit:
+        records = records[:limit]
+        last = records[-1]
+        next_cursor = encode_cursor(last["created_at"], last["id"])
+    return records, next_cursor
@@ -1,14 +1,27 @@
 
+import functools
 import os
+from typing import Union
+
+import anyio
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
-from sqlalchemy.engine import URL
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 dotenv_path = os.path.join(os.path.dirname(__file__), '.env')
 load_dotenv(dotenv_path)
 
+# Pool and codec settings are read from the environment, so import after load_dotenv
+import json_codec
+from pool_stats import instrument_engine, pool_options
+
+# Storage backend. DATABASE_URL selects it, e.g. sqlite:///daq.db for a
+# standalone spectrometer PC; without it the MySQL settings below are used.
+DATABASE_URL = os.getenv('DATABASE_URL')
+
 # MySQL credentials
 MYSQL_USER = os.getenv('MYSQL_USER', 'root')
 MYSQL_PASSWORD = os.getenv('MYSQL_PASSWORD', 'password')
@@ -19,9 +32,25 @@ MYSQL_PORT = os.getenv('MYSQL_PORT', '3306')
 # SQLAlchemy URL cannot contain raw spaces — encode for the URL path.
 MYSQL_DB = os.getenv('MYSQL_DB', 'DAQ project')
 
-# 1. Connect to MySQL server (no DB) and create DB if not exists
-SERVER_URL = f"mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/"
-engine_tmp = create_engine(SERVER_URL, pool_pre_ping=True)
+# SQLite tuning (only used with a sqlite:// DATABASE_URL)
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+
+# Build the SQLAlchemy URL using the URL object so the database name is sent as
+# a separate parameter (this preserves spaces and special characters) instead of
+# being embedded (and percent-encoded) in the path portion of a raw URL string.
+SQLALCHEMY_DATABASE_URL = make_url(DATABASE_URL) if DATABASE_URL else URL.create(
+	drivername="mysql+mysqlconnector",
+	username=MYSQL_USER,
+	password=MYSQL_PASSWORD,
+	host=MYSQL_HOST,
+	port=int(MYSQL_PORT) if MYSQL_PORT.isdigit() else MYSQL_PORT,
+	database=MYSQL_DB,
+)
+IS_MYSQL = SQLALCHEMY_DATABASE_URL.get_backend_name() in ('mysql', 'mariadb')
+IS_SQLITE = SQLALCHEMY_DATABASE_URL.get_backend_name() == 'sqlite'
+
+
 def ensure_database_exists(retries: int = 1):
 	"""Ensure the target MySQL database exists by connecting to the server
 	(without selecting a database) and issuing a CREATE DATABASE IF NOT EXISTS.
@@ -29,27 +58,123 @@ def ensure_database_exists(retries: int = 1):
 	This function creates and disposes a short-lived engine so importing the
 	module does not attempt a network call. Call this from an application
 	startup hook so the app can start even when the DB is temporarily down.
+	Other backends need no server round trip: SQLite creates its file on
+	first connect, so this returns immediately.
 	"""
-	engine_tmp_local = create_engine(SERVER_URL, pool_pre_ping=True)
+	if not IS_MYSQL:
+		return
+	url = SQLALCHEMY_DATABASE_URL
+	server_url = URL.create(
+		drivername=url.drivername,
+		username=url.username,
+		password=url.password,
+		host=url.host,
+		port=url.port,
+		query=url.query,
+	)
+	engine_tmp_local = create_engine(server_url, pool_pre_ping=True)
 	try:
 		with engine_tmp_local.connect() as conn:
-			conn.execute(text(f"CREATE DATABASE IF NOT EXISTS `{MYSQL_DB}`"))
+			conn.execute(text(f"CREATE DATABASE IF NOT EXISTS `{url.database}`"))
 			conn.commit()
 	finally:
 		engine_tmp_local.dispose()
 
-# 2. Now connect to the target DB
-# Build the SQLAlchemy URL using the URL object so the database name is sent as
-# a separate parameter (this preserves spaces and special characters) instead of
-# being embedded (and percent-encoded) in the path portion of a raw URL string.
-SQLALCHEMY_DATABASE_URL = URL.create(
-	drivername="mysql+mysqlconnector",
-	username=MYSQL_USER,
-	password=MYSQL_PASSWORD,
-	host=MYSQL_HOST,
-	port=int(MYSQL_PORT) if MYSQL_PORT.isdigit() else MYSQL_PORT,
-	database=MYSQL_DB,
-)
-engine = create_engine(SQLALCHEMY_DATABASE_URL, pool_pre_ping=True)
+
+def _configure_sqlite(sync_engine):
+	"""Apply the SQLite tuning PRAGMAs to every new connection of an engine.
+
+	WAL lets readers run concurrently with the single writer, synchronous=NORMAL
+	only fsyncs at checkpoints (safe in WAL mode; a power cut can lose the last
+	commits but never corrupts the file), and mmap serves reads from the page
+	cache without extra copies.
+	"""
+	@event.listens_for(sync_engine, "connect")
+	def set_sqlite_pragmas(dbapi_connection, connection_record):
+		cursor = dbapi_connection.cursor()
+		try:
+			cursor.execute("PRAGMA journal_mode=WAL")
+			cursor.execute("PRAGMA synchronous=NORMAL")
+			cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+			cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+			cursor.execute("PRAGMA foreign_keys=ON")
+			cursor.execute("PRAGMA temp_store=MEMORY")
+		finally:
+			cursor.close()
+
+
+def create_storage_engine(url, is_async: bool = False):
+	"""Create an engine for ``url`` with the pool settings, telemetry, the JSON
+	codec and, for SQLite, the tuning PRAGMAs. Used for the app engines and by
+	bench.py."""
+	url = make_url(url)
+	options = pool_options(is_async=is_async)
+	# JSON columns go through the fast codec (orjson when installed)
+	options["json_serializer"] = json_codec.dumps
+	options["json_deserializer"] = json_codec.loads
+	if url.get_backend_name() == 'sqlite':
+		# Connections move between threadpool workers; the pool serializes use
+		options["connect_args"] = {"check_same_thread": False}
+	new_engine = (create_async_engine if is_async else create_engine)(url, **options)
+	sync_engine = new_engine.sync_engine if is_async else new_engine
+	if url.get_backend_name() == 'sqlite':
+		_configure_sqlite(sync_engine)
+	instrument_engine(sync_engine)
+	return new_engine
+
+
+engine = create_storage_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
+
+# Optional async engine. With DB_ASYNC=1 request handlers talk to the
+# database through an asyncio driver instead of holding a threadpool worker
+# for every query. The default URL is the one above with the matching
+# asyncio driver (aiomysql / aiosqlite); ASYNC_DATABASE_URL overrides it.
+DB_ASYNC = os.getenv('DB_ASYNC', '0').lower() in ('1', 'true', 'yes')
+ASYNC_DRIVERS = {'mysql': 'mysql+aiomysql', 'mariadb': 'mariadb+aiomysql', 'sqlite': 'sqlite+aiosqlite'}
+ASYNC_DATABASE_URL = (
+	make_url(os.environ['ASYNC_DATABASE_URL']) if os.getenv('ASYNC_DATABASE_URL')
+	else SQLALCHEMY_DATABASE_URL.set(drivername=ASYNC_DRIVERS.get(
+		SQLALCHEMY_DATABASE_URL.get_backend_name(), SQLALCHEMY_DATABASE_URL.drivername
+	))
+)
+async_engine = create_storage_engine(ASYNC_DATABASE_URL, is_async=True) if DB_ASYNC else None
+AsyncSessionLocal = (
+	async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False) if DB_ASYNC else None
+)
+
+
+class ThreadedSession:
+	"""Expose a sync Session through the ``run_sync`` interface of AsyncSession.
+
+	Endpoints are written once against ``await db.run_sync(fn, ...)``. With an
+	AsyncSession the call runs on the event loop via the asyncio driver; with
+	this wrapper it runs ``fn(session, ...)`` in a worker thread, which is what
+	sync ``def`` endpoints did implicitly.
+	"""
+
+	def __init__(self, session):
+		self.sync_session = session
+
+	async def run_sync(self, fn, *args, **kwargs):
+		return await anyio.to_thread.run_sync(functools.partial(fn, self.sync_session, *args, **kwargs))
+
+	async def close(self):
+		await anyio.to_thread.run_sync(self.sync_session.close)
+
+
+DbSession = Union[AsyncSession, ThreadedSession]
+
+
+async def get_db():
+	"""FastAPI dependency yielding an AsyncSession (DB_ASYNC=1) or a ThreadedSession."""
+	if AsyncSessionLocal is not None:
+		async with AsyncSessionLocal() as db:
+			yield db
+	else:
+		db = ThreadedSession(SessionLocal())
+		try:
+			yield db
+		finally:
+			await db.close()
@@ -0,0 +1,95 @@
+"""
+ETag helpers for conditional GET support on the read endpoints.
+
+Bulk reads use a cheap validator computed by the database (row count,
+newest ``updated_at`` and highest ``id`` for the filtered query) combined
+with the query parameters, so the full result set is only read and sent
+when something changed. Single-record reads hash the record content.
+Clients send the ETag back in ``If-None-Match`` and get ``304 Not Modified``
+with an empty body when it still matches. The endpoints answer in JSON or
+MessagePack depending on ``Accept``, so every ETag also covers the
+representation and responses (304s included) carry ``Vary: Accept``.
+"""
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+from cache import config_cache, group_tag
+from crud import query_validator
+from database import DbSession
+from json_codec import dumps_bytes
+from negotiation import wants_msgpack
+
+
+def make_etag(*parts: Any) -> str:
+    """Build a weak ETag from JSON-serializable ``parts`` (datetimes allowed)."""
+    payload = dumps_bytes(parts)
+    return f'W/"{hashlib.blake2b(payload, digest_size=16).hexdigest()}"'
+
+
+def representation(request: Request) -> str:
+    """The representation negotiated for ``request``: ``"msgpack"`` or ``"json"``."""
+    return "msgpack" if wants_msgpack(request) else "json"
+
+
+def response_etag(request: Request, *parts: Any) -> str:
+    """ETag for the representation of ``parts`` that ``request`` gets."""
+    return make_etag(representation(request), *parts)
+
+
+def query_etag(request: Request, resource: str, validator: Any) -> str:
+    """ETag for a bulk read: the table validator plus the normalized query string."""
+    return response_etag(request, resource, validator, sorted(request.query_params.multi_items()))
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an ``If-None-Match`` header against ``etag``."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Vary": "Accept"})
+
+
+async def bulk_read_etag(
+    request: Request,
+    db: DbSession,
+    model,
+    conditions: list,
+    analytical_group: Optional[str] = None,
+    *key_parts: Any,
+    include_archived: bool = False,
+) -> str:
+    """
+    ETag for a bulk read of ``model`` filtered by ``conditions``.
+
+    Group-filtered validators are cached and invalidated together with the
+    group's reads; ``key_parts`` must hold any other filter values. Pass
+    ``include_archived`` when the read merges in archived revisions.
+    """
+    resource = model.__tablename__
+
+    def load():
+        return db.run_sync(query_validator, model, conditions, include_archived, analytical_group)
+
+    if analytical_group:
+        validator = await config_cache.read_through(
+            ("validator", resource, analytical_group, *key_parts, include_archived),
+            load,
+            tags=[group_tag(resource, analytical_group)],
+        )
+    else:
+        validator = await load()
+    return query_etag(request, resource, validator)
@@ -0,0 +1,66 @@
+"""
+Pluggable JSON codec for database JSON columns and HTTP responses.
+
+The element and channel arrays make JSON encoding/decoding one of the
+largest CPU costs of a bulk read. With the optional ``orjson`` package
+installed, the JSON columns are (de)serialized with it instead of the
+stdlib ``json`` module (see ``create_storage_engine`` in database.py), and
+responses that FastAPI renders through a response class use it too.
+JSON_CODEC selects the codec: ``orjson`` (default when installed) or
+``json`` (stdlib, always available). Both produce standard JSON, so
+existing rows read back the same whichever codec wrote them.
+"""
+import json
+import os
+from typing import Any, Callable
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+JSON_CODEC = os.getenv("JSON_CODEC", "orjson" if orjson is not None else "json").lower()
+if JSON_CODEC == "orjson" and orjson is None:
+    raise RuntimeError("JSON_CODEC=orjson but the orjson package is not installed")
+if JSON_CODEC not in ("orjson", "json"):
+    raise RuntimeError(f"Unknown JSON_CODEC {JSON_CODEC!r} (expected 'orjson' or 'json')")
+
+dumps_bytes: Callable[[Any], bytes]
+dumps: Callable[[Any], str]
+loads: Callable[[Any], Any]
+
+if JSON_CODEC == "orjson":
+    def dumps_bytes(obj: Any) -> bytes:
+        """Serialize ``obj`` to compact UTF-8 JSON bytes (datetimes as ISO 8601, UTC as "Z" like Pydantic)."""
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+
+    def dumps(obj: Any) -> str:
+        """Serialize ``obj`` to a compact JSON string (used for the JSON columns)."""
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    loads = orjson.loads
+else:
+    def _default(value: Any) -> Any:
+        if hasattr(value, "isoformat"):
+            text = value.isoformat()
+            return text[:-6] + "Z" if text.endswith("+00:00") else text
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+    def dumps_bytes(obj: Any) -> bytes:
+        """Serialize ``obj`` to compact UTF-8 JSON bytes (datetimes as ISO 8601, UTC as "Z" like Pydantic)."""
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=_default).encode()
+
+    def dumps(obj: Any) -> str:
+        """Serialize ``obj`` to a JSON string (used for the JSON columns)."""
+        return json.dumps(obj)
+
+    loads = json.loads
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the configured codec instead of ``json.dumps``."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_bytes(content)
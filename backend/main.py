@@ -1,12 +1,48 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.datastructures import Default
+from fastapi.responses import StreamingResponse
 from sqlalchemy import text
-from sqlalchemy.orm import Session
-from typing import List, Optional
-import serial
-from pydantic import BaseModel
-import time
+from typing import List, Literal, Optional, Union
+from pydantic import BaseModel, Field
+import asyncio
+import logging
 
-from database import SessionLocal, engine, Base, ensure_database_exists
+from database import (
+    DbSession,
+    engine,
+    async_engine,
+    AsyncSessionLocal,
+    SessionLocal,
+    Base,
+    IS_SQLITE,
+    ensure_database_exists,
+    get_db,
+)
+from cache import config_cache, group_tag, record_tag
+from negotiation import MsgPackRoute, negotiated
+from json_codec import FastJSONResponse
+from trusted import trusted_response
+from etag import bulk_read_etag, etag_matches, not_modified, response_etag
+from pool_stats import POOL_WARMUP, pool_status, warm_up, warm_up_async
+from crud import (
+    backfill_current,
+    delete_record,
+    get_group_snapshot,
+    get_latest,
+    get_record,
+    get_records,
+    insert_records,
+    parse_id_list,
+    projected_columns,
+    put_group_config,
+    read_page,
+)
+from ndjson_io import NDJSON_MEDIA_TYPE, import_ndjson, stream_ndjson
+from schema_upgrade import upgrade_schema
+from archive import ARCHIVE_AFTER_DAYS, ARCHIVE_INTERVAL_HOURS, ARCHIVE_KEEP_LATEST, archive_history
+from child_rows import backfill_child_rows, search_attenuators, search_channels, search_elements
+from serial_link import PRIORITY_NORMAL, SERIAL_WRITE_TIMEOUT, serial_link
 from models import (
     AnalyticalCondition,
     ElementInformation,
@@ -18,38 +54,59 @@ from schemas import (
     AnalyticalConditionResponse,
     AnalyticalConditionBulkCreate,
     AnalyticalConditionBulkResponse,
+    AnalyticalConditionBatchResponse,
     ElementInformationCreate,
     ElementInformationResponse,
     ElementInformationBulkCreate,
     ElementInformationBulkResponse,
+    ElementInformationBatchResponse,
     ChannelInformationCreate,
     ChannelInformationResponse,
     ChannelInformationBulkCreate,
     ChannelInformationBulkResponse,
+    ChannelInformationBatchResponse,
     AttenuatorInformationCreate,
     AttenuatorInformationResponse,
     AttenuatorInformationBulkCreate,
     AttenuatorInformationBulkResponse,
+    AttenuatorInformationBatchResponse,
+    BulkCreateMinimalResponse,
+    ImportResponse,
+    ProjectedBulkResponse,
+    ElementSearchResponse,
+    ChannelSearchResponse,
+    AttenuatorSearchResponse,
+    GroupSnapshotResponse,
+    IdListRequest,
 )
 
 app = FastAPI(
     title="DAQ API",
     description="Data Acquisition Backend API for analytical conditions, elements, attenuators, and channels",
-    version="1.0.0"
+    version="1.0.0",
+    # Responses without a response_model are rendered with the fast JSON
+    # codec. Kept a Default() so routes with a response_model still let
+    # Pydantic serialize straight to JSON bytes (FastAPI skips that path for
+    # an explicitly chosen response class).
+    default_response_class=Default(FastJSONResponse)
 )
+# Accept application/msgpack request bodies on every route
+app.router.route_class = MsgPackRoute
+
+# Resource models whose latest row per group is tracked in current_configs
+CONFIG_MODELS = [AnalyticalCondition, ElementInformation, ChannelInformation, AttenuatorInformation]
 
 
 @app.on_event("startup")
-def on_startup():
+async def on_startup():
     """Attempt to create the database (if missing) and ensure tables exist.
 
     We call `ensure_database_exists()` here rather than at import time so the
-    application can start even when the MySQL server is temporarily unreachable.
+    application can start even when the MySQL server is temporarily unreachable
+    (with a SQLite DATABASE_URL it is a no-op).
     Table creation is attempted and any errors are logged rather than raised so
     the server doesn't crash the process on startup.
     """
-    import logging
-
     try:
         # create DB if it doesn't exist (may raise if server unreachable)
         ensure_database_exists()
@@ -57,17 +114,88 @@ def on_startup():
         logging.error(f"Database existence check failed at startup: {e}")
 
     try:
-        Base.metadata.create_all(bind=engine)
+        # Create missing tables, then add columns/indexes introduced since
+        # the existing tables were created
+        if async_engine is not None:
+            async with async_engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+                await conn.run_sync(upgrade_schema)
+        else:
+            with engine.begin() as conn:
+                Base.metadata.create_all(bind=conn)
+                upgrade_schema(conn)
     except Exception as e:
         logging.error(f"Failed to create tables at startup: {e}")
 
-
-def get_db():
-    db = SessionLocal()
     try:
-        yield db
-    finally:
-        db.close()
+        # Point every group that predates the current_configs table at its newest
+        # row and build child rows for records that predate the entry tables
+        if AsyncSessionLocal is not None:
+            async with AsyncSessionLocal() as session:
+                await session.run_sync(backfill_current, CONFIG_MODELS)
+                await session.run_sync(backfill_child_rows, CONFIG_MODELS)
+        else:
+            with SessionLocal() as session:
+                backfill_current(session, CONFIG_MODELS)
+                backfill_child_rows(session, CONFIG_MODELS)
+    except Exception as e:
+        logging.error(f"Failed to backfill derived configuration tables: {e}")
+
+    if POOL_WARMUP:
+        try:
+            if async_engine is not None:
+                await warm_up_async(async_engine)
+            else:
+                warm_up(engine)
+        except Exception as e:
+            logging.error(f"Failed to warm up connection pool: {e}")
+
+    if ARCHIVE_INTERVAL_HOURS > 0:
+        app.state.archive_task = asyncio.create_task(archive_periodically())
+
+    # Open the hardware port once; the link reconnects on its own after failures.
+    # Without SERIAL_PORT (servers with no hardware) no I/O thread is started
+    if serial_link.port:
+        serial_link.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    archive_task = getattr(app.state, "archive_task", None)
+    if archive_task is not None:
+        archive_task.cancel()
+        try:
+            await archive_task
+        except asyncio.CancelledError:
+            pass
+    await run_in_threadpool(serial_link.stop)
+
+
+async def run_archive(max_age_days: float = ARCHIVE_AFTER_DAYS, keep_latest: int = ARCHIVE_KEEP_LATEST):
+    """Move old revisions to the archive and drop the cached reads of the affected groups."""
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as session:
+            moved = await session.run_sync(archive_history, CONFIG_MODELS, max_age_days, keep_latest)
+    else:
+        def archive():
+            with SessionLocal() as session:
+                return archive_history(session, CONFIG_MODELS, max_age_days, keep_latest)
+        moved = await run_in_threadpool(archive)
+    for resource, groups in moved.items():
+        config_cache.invalidate_groups(resource, groups)
+    return moved
+
+
+async def archive_periodically():
+    """Run the archival job at startup and then every ARCHIVE_INTERVAL_HOURS."""
+    while True:
+        try:
+            moved = await run_archive()
+            for resource, groups in moved.items():
+                logging.info(f"Archived {sum(groups.values())} {resource} revision(s)")
+        except Exception as e:
+            logging.error(f"Archival job failed: {e}")
+        await asyncio.sleep(ARCHIVE_INTERVAL_HOURS * 3600)
 
 
 @app.get("/")
@@ -76,26 +204,140 @@ def read_root():
 
 
 @app.get("/db")
-def read_database_name(db: Session = Depends(get_db)):
-    """Return the current database name the connection is using.
+async def read_database_name(db: DbSession = Depends(get_db)):
+    """Return the storage backend and the database the connection is using.
+
+    On MySQL this runs a simple SELECT DATABASE() query to verify
+    connectivity and show the active DB name (useful to confirm the DB named
+    "DAQ project" is in use). On SQLite it reports the database file and
+    journal mode (WAL when the tuned settings are active).
+    """
+    def describe(session):
+        if IS_SQLITE:
+            return {
+                "database": session.execute(text("PRAGMA database_list")).first()[2] or ":memory:",
+                "journal_mode": session.execute(text("PRAGMA journal_mode")).scalar(),
+            }
+        return {"database": session.execute(text("SELECT DATABASE()")).scalar()}
+
+    info = await db.run_sync(describe)
+    return {"backend": engine.dialect.name, **info}
+
+
+@app.get("/db/pool")
+def read_pool_status():
+    """Return connection pool state and counters for sizing pools against real load.
 
-    This runs a simple SELECT DATABASE() query to verify connectivity
-    and show the active DB name (useful to confirm the DB named
-    "DAQ project" is in use).
+    Reports the configured settings, connections checked in/out, overflow in
+    use, checkout wait times, timeouts, pre-pings and invalidations for the
+    sync engine and (when DB_ASYNC=1) the async engine.
     """
-    res = db.execute(text("SELECT DATABASE()"))
-    db_name = res.scalar()
-    return {"database": db_name}
+    return {
+        "sync": pool_status(engine),
+        "async": pool_status(async_engine.sync_engine) if async_engine is not None else None,
+    }
+
+
+@app.get("/cache/stats")
+def read_cache_stats():
+    """Return hit/miss/eviction counters for the configuration read cache."""
+    return config_cache.stats()
+
+
+@app.post("/db/archive")
+async def archive_old_revisions(
+    max_age_days: float = Query(ARCHIVE_AFTER_DAYS, ge=0),
+    keep_latest: int = Query(ARCHIVE_KEEP_LATEST, ge=1),
+):
+    """Run the archival job now.
+
+    Moves revisions created more than ``max_age_days`` ago to the archive,
+    keeping the newest ``keep_latest`` of every group in the resource tables
+    (defaults: ARCHIVE_AFTER_DAYS / ARCHIVE_KEEP_LATEST). Archived revisions
+    are still served by the by-ID endpoints and by bulk reads with
+    ``include_archived=true``.
+    """
+    moved = await run_archive(max_age_days, keep_latest)
+    return {
+        "success": True,
+        "archived": {resource: sum(groups.values()) for resource, groups in moved.items()},
+    }
+
+
+# ============================================================================
+# Group Snapshot Endpoint
+# ============================================================================
+
+@app.get("/api/groups/{analytical_group:path}/snapshot", response_model=GroupSnapshotResponse)
+async def get_group_snapshot_endpoint(
+    analytical_group: str,
+    request: Request,
+    response: Response,
+    db: DbSession = Depends(get_db)
+):
+    """
+    Get the current analytical condition, element, channel and attenuator
+    configuration of an analytical group in one response.
+    
+    Assembled server-side from the current-config pointers (one query per
+    table) and cached until any of the group's configurations changes.
+    Resources without a configuration for the group are null; 404 if the
+    group has none at all. Supports If-None-Match -> 304.
+    """
+    snapshot = await config_cache.read_through(
+        ("snapshot", analytical_group),
+        lambda: db.run_sync(get_group_snapshot, CONFIG_MODELS, analytical_group),
+        tags=[group_tag(model.__tablename__, analytical_group) for model in CONFIG_MODELS]
+    )
+    
+    if not any(snapshot.values()):
+        raise HTTPException(status_code=404, detail=f"No configuration for group {analytical_group}")
+    
+    etag = response_etag(request, snapshot)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    
+    return negotiated(request, response, GroupSnapshotResponse(
+        success=True,
+        message=f"Retrieved {sum(1 for r in snapshot.values() if r)} configuration(s) for group {analytical_group}",
+        analytical_group=analytical_group,
+        analytical_condition=snapshot["analytical_conditions"],
+        element_information=snapshot["element_information"],
+        channel_information=snapshot["channel_information"],
+        attenuator_information=snapshot["attenuator_information"]
+    ))
+
+
+async def read_by_ids(request: Request, response: Response, db: DbSession, model, schema, batch_schema, record_ids: List[int], label: str):
+    """Shared body of the batch by-ID endpoints: one IN query, requested order, missing IDs reported."""
+    records, missing_ids = await db.run_sync(get_records, model, record_ids)
+    
+    etag = response_etag(request, records, missing_ids)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    
+    return trusted_response(
+        request, response, batch_schema, schema, records,
+        success=True,
+        message=f"Retrieved {len(records)} {label}(s)" + (f", {len(missing_ids)} not found" if missing_ids else ""),
+        count=len(records),
+        missing_ids=missing_ids
+    )
 
 
 # ============================================================================
 # Analytical Condition Endpoints
 # ============================================================================
 
-@app.post("/api/analytical-conditions/bulk", response_model=AnalyticalConditionBulkResponse)
-def bulk_create_analytical_conditions(
+@app.post("/api/analytical-conditions/bulk", response_model=Union[AnalyticalConditionBulkResponse, BulkCreateMinimalResponse])
+async def bulk_create_analytical_conditions(
+    request: Request,
+    response: Response,
     bulk_data: AnalyticalConditionBulkCreate,
-    db: Session = Depends(get_db)
+    return_mode: Literal["representation", "minimal"] = Query("representation", alias="return"),
+    db: DbSession = Depends(get_db)
 ):
     """
     Bulk create analytical condition records.
@@ -104,122 +346,310 @@ def bulk_create_analytical_conditions(
     inserts them into the database in a single transaction.
     
     Returns the created records with their assigned IDs and timestamps.
+    Pass ``return=minimal`` to get back only the new IDs and a count.
+    Bodies may be MessagePack (Content-Type / Accept: application/msgpack).
     """
     try:
-        created_records = []
-        
-        for record_data in bulk_data.records:
-            # Convert Pydantic model to dict for JSON fields
-            db_record = AnalyticalCondition(
-                analytical_group=record_data.analytical_group,
-                analytical_method=record_data.analytical_method,
-                seq=record_data.seq.model_dump(),  # Pydantic v2
-                level_out_information=record_data.level_out_information.model_dump(),
-            )
-            db.add(db_record)
-            created_records.append(db_record)
-        
-        # Commit all records at once
-        db.commit()
-        
-        # Refresh to get IDs and timestamps
-        for record in created_records:
-            db.refresh(record)
-        
-        return AnalyticalConditionBulkResponse(
+        rows = [record_data.model_dump() for record_data in bulk_data.records]
+
+        # One multi-row INSERT; ids and timestamps come back without per-row refreshes
+        created = await db.run_sync(insert_records, AnalyticalCondition, rows)
+        config_cache.invalidate_groups("analytical_conditions", (row["analytical_group"] for row in rows))
+
+        message = f"Successfully created {len(created)} analytical condition(s)"
+        if return_mode == "minimal":
+            return negotiated(request, response, BulkCreateMinimalResponse(
+                success=True,
+                message=message,
+                count=len(created),
+                ids=[c["id"] for c in created]
+            ))
+
+        return negotiated(request, response, AnalyticalConditionBulkResponse(
             success=True,
-            message=f"Successfully created {len(created_records)} analytical condition(s)",
-            count=len(created_records),
-            records=[AnalyticalConditionResponse.model_validate(r) for r in created_records]
-        )
+            message=message,
+            count=len(created),
+            records=[AnalyticalConditionResponse.model_validate({**row, **generated}) for row, generated in zip(rows, created)]
+        ))
     
     except Exception as e:
-        db.rollback()
         raise HTTPException(status_code=400, detail=f"Error creating records: {str(e)}")
 
 
-@app.get("/api/analytical-conditions/bulk", response_model=AnalyticalConditionBulkResponse)
-def bulk_read_analytical_conditions(
+@app.post("/api/analytical-conditions/import", response_model=ImportResponse)
+async def import_analytical_conditions(
+    request: Request,
+    chunk_size: int = Query(500, ge=1, le=10000),
+    db: DbSession = Depends(get_db)
+):
+    """
+    Stream-import analytical condition records from newline-delimited JSON.
+    
+    The request body holds one AnalyticalConditionCreate object per line. It is read
+    incrementally and inserted ``chunk_size`` lines at a time with a commit per
+    chunk, so large migrations neither buffer the whole upload nor hold one
+    giant transaction. Invalid lines are skipped and reported per chunk.
+    """
+    return await import_ndjson(request.stream(), db, AnalyticalCondition, AnalyticalConditionCreate, chunk_size)
+
+
+@app.get("/api/analytical-conditions/bulk", response_model=Union[AnalyticalConditionBulkResponse, ProjectedBulkResponse])
+async def bulk_read_analytical_conditions(
+    request: Request,
+    response: Response,
     analytical_group: Optional[str] = None,
     analytical_method: Optional[str] = None,
-    limit: Optional[int] = None,
-    db: Session = Depends(get_db)
+    source_seq1: Optional[str] = None,
+    monitor_element: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    output_format: Literal["json", "ndjson"] = Query("json", alias="format"),
+    view: Literal["full", "summary"] = "full",
+    fields: Optional[str] = None,
+    include_archived: bool = False,
+    db: DbSession = Depends(get_db)
 ):
     """
     Bulk read analytical condition records.
     
     Retrieves all analytical condition records from the database.
-    Supports optional filtering by analytical_group and analytical_method.
+    Supports optional filtering by analytical_group, analytical_method and
+    the indexed JSON paths source_seq1 and monitor_element.
     
     Query Parameters:
     - analytical_group: Filter by analytical group name (e.g., "LAS 2023")
     - analytical_method: Filter by analytical method (e.g., "integration Mode")
-    - limit: Maximum number of records to return
+    - source_seq1: Filter by seq.source.seq1 (e.g., "Normal Spark")
+    - monitor_element: Filter by level_out_information.monitor_element.element (e.g., "FE")
+    - limit: Maximum number of records to return (page size)
+    - cursor: `next_cursor` from the previous page, to continue after it
+    - format: "json" (default) or "ndjson" to stream one record per line
+    - view: "summary" returns only id, group, method and timestamps; the JSON
+      payload columns are not read from the database
+    - fields: Comma-separated columns to return (id and created_at are always included)
+    - include_archived: Also return revisions moved to the archive (only
+      combinable with the analytical_group filter and format=json)
     
-    Returns all matching records in the same JSON schema format.
+    Returns all matching records in the same JSON schema format, newest first.
+    When more rows remain after a limited page, `next_cursor` is set.
+    The response carries an ETag; send it back in If-None-Match to get 304
+    Not Modified when nothing matching the query has changed.
+    Send ``Accept: application/msgpack`` for a MessagePack response.
     """
     try:
-        query = db.query(AnalyticalCondition)
-        
-        # Apply filters if provided
+        conditions = []
         if analytical_group:
-            query = query.filter(AnalyticalCondition.analytical_group == analytical_group)
+            conditions.append(AnalyticalCondition.analytical_group == analytical_group)
         if analytical_method:
-            query = query.filter(AnalyticalCondition.analytical_method == analytical_method)
+            conditions.append(AnalyticalCondition.analytical_method == analytical_method)
+        # JSON path filters go through the indexed generated columns
+        if source_seq1:
+            conditions.append(AnalyticalCondition.source_seq1 == source_seq1)
+        if monitor_element:
+            conditions.append(AnalyticalCondition.monitor_element == monitor_element)
         
-        # Apply limit if provided
-        if limit:
-            query = query.limit(limit)
+        columns = projected_columns(AnalyticalCondition, view, fields)
+        if include_archived and (analytical_method or source_seq1 or monitor_element):
+            raise ValueError("include_archived can only be combined with the analytical_group filter")
+        if include_archived and output_format == "ndjson":
+            raise ValueError("include_archived is not supported with format=ndjson")
         
-        # Order by most recent first
-        query = query.order_by(AnalyticalCondition.created_at.desc())
+        etag = await bulk_read_etag(
+            request, db, AnalyticalCondition, conditions, analytical_group, analytical_method, source_seq1, monitor_element,
+            include_archived=include_archived
+        )
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return not_modified(etag)
+        
+        if output_format == "ndjson":
+            return StreamingResponse(
+                stream_ndjson(AnalyticalCondition, AnalyticalConditionResponse, conditions, cursor, limit, columns),
+                media_type=NDJSON_MEDIA_TYPE,
+                headers={"ETag": etag}
+            )
+        
+        if analytical_group:
+            # Group-filtered reads are cached until that group is written to
+            records, next_cursor = await config_cache.read_through(
+                ("bulk", "analytical_conditions", analytical_group, analytical_method, source_seq1, monitor_element,
+                 limit, cursor, columns and tuple(columns), include_archived),
+                lambda: db.run_sync(read_page, AnalyticalCondition, conditions, limit, cursor, columns, include_archived, analytical_group),
+                tags=[group_tag("analytical_conditions", analytical_group)]
+            )
+        else:
+            records, next_cursor = await db.run_sync(read_page, AnalyticalCondition, conditions, limit, cursor, columns, include_archived, analytical_group)
+        
+        response.headers["ETag"] = etag
         
-        records = query.all()
+        if columns is not None:
+            return negotiated(request, response, ProjectedBulkResponse(
+                success=True,
+                message=f"Retrieved {len(records)} analytical condition(s)",
+                count=len(records),
+                records=records,
+                next_cursor=next_cursor
+            ))
         
-        return AnalyticalConditionBulkResponse(
+        # Rows were validated when written; serialize them without re-validating
+        return trusted_response(
+            request, response, AnalyticalConditionBulkResponse, AnalyticalConditionResponse, records,
             success=True,
             message=f"Retrieved {len(records)} analytical condition(s)",
             count=len(records),
-            records=[AnalyticalConditionResponse.model_validate(r) for r in records]
+            next_cursor=next_cursor
         )
     
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error reading records: {str(e)}")
 
 
+@app.put("/api/analytical-conditions/groups/{analytical_group:path}", response_model=AnalyticalConditionBulkResponse)
+async def put_analytical_condition_group(
+    analytical_group: str,
+    record_data: AnalyticalConditionCreate,
+    request: Request,
+    response: Response,
+    db: DbSession = Depends(get_db)
+):
+    """
+    Set the current analytical condition configuration of an analytical group.
+    
+    Upsert semantics: the body becomes the group's active configuration
+    (the group in the path overrides the one in the body). The previous
+    configuration is kept as history. Uploading settings identical to the
+    current ones writes nothing. Responds 201 for a group's first
+    configuration and 200 otherwise.
+    """
+    try:
+        record, status = await db.run_sync(put_group_config, AnalyticalCondition, analytical_group, record_data.model_dump())
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error saving configuration: {str(e)}")
+    
+    if status != "unchanged":
+        config_cache.invalidate_groups("analytical_conditions", [analytical_group])
+    response.status_code = 201 if status == "created" else 200
+    
+    return negotiated(request, response, AnalyticalConditionBulkResponse(
+        success=True,
+        message=f"{status.capitalize()} analytical condition configuration for group {analytical_group}",
+        count=1,
+        records=[AnalyticalConditionResponse.model_validate(record)]
+    ))
+
+
+@app.get("/api/analytical-conditions/groups/{analytical_group:path}/latest", response_model=AnalyticalConditionResponse)
+async def get_latest_analytical_condition(
+    analytical_group: str,
+    request: Request,
+    response: Response,
+    db: DbSession = Depends(get_db)
+):
+    """
+    Get the current analytical condition configuration of an analytical group.
+    
+    Served from the current-config pointer, so the cost does not depend on
+    the size of the group's history. Supports If-None-Match -> 304.
+    """
+    record = await config_cache.read_through(
+        ("latest", "analytical_conditions", analytical_group),
+        lambda: db.run_sync(get_latest, AnalyticalCondition, analytical_group),
+        tags=[group_tag("analytical_conditions", analytical_group)]
+    )
+    
+    if not record:
+        raise HTTPException(status_code=404, detail=f"No analytical condition configuration for group {analytical_group}")
+    
+    etag = response_etag(request, record)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    
+    return negotiated(request, response, AnalyticalConditionResponse.model_validate(record))
+
+
+@app.get("/api/analytical-conditions", response_model=AnalyticalConditionBatchResponse)
+async def get_analytical_conditions_by_ids(
+    request: Request,
+    response: Response,
+    ids: str = Query(..., description="Comma-separated record IDs, e.g. 1,2,3"),
+    db: DbSession = Depends(get_db)
+):
+    """
+    Get several analytical conditions by ID with a single query.
+    
+    Records are returned in the requested order (each ID once); IDs that do
+    not exist are listed in ``missing_ids``. Archived revisions are included.
+    Use POST /api/analytical-conditions/lookup for lists too long for a URL.
+    """
+    try:
+        record_ids = parse_id_list(ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await read_by_ids(request, response, db, AnalyticalCondition, AnalyticalConditionResponse, AnalyticalConditionBatchResponse, record_ids, "analytical condition")
+
+
+@app.post("/api/analytical-conditions/lookup", response_model=AnalyticalConditionBatchResponse)
+async def lookup_analytical_conditions_by_ids(
+    body: IdListRequest,
+    request: Request,
+    response: Response,
+    db: DbSession = Depends(get_db)
+):
+    """
+    Get several analytical conditions by ID, with the ID list in the request body.
+    
+    Same result as GET /api/analytical-conditions?ids=...
+    """
+    return await read_by_ids(request, response, db, AnalyticalCondition, AnalyticalConditionResponse, AnalyticalConditionBatchResponse, body.ids, "analytical condition")
+
+
 @app.get("/api/analytical-conditions/{record_id}", response_model=AnalyticalConditionResponse)
-def get_analytical_condition_by_id(
+async def get_analytical_condition_by_id(
     record_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: DbSession = Depends(get_db)
 ):
     """
     Get a single analytical condition record by ID.
     
     Returns the complete record including all nested data.
+    The response carries an ETag for conditional GETs (If-None-Match -> 304).
     """
-    record = db.query(AnalyticalCondition).filter(AnalyticalCondition.id == record_id).first()
+    record = await config_cache.read_through(
+        record_tag("analytical_conditions", record_id),
+        lambda: db.run_sync(get_record, AnalyticalCondition, record_id),
+        tags=[record_tag("analytical_conditions", record_id)]
+    )
     
     if not record:
         raise HTTPException(status_code=404, detail=f"Analytical condition with ID {record_id} not found")
     
-    return AnalyticalConditionResponse.model_validate(record)
+    etag = response_etag(request, record)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    
+    return negotiated(request, response, AnalyticalConditionResponse.model_validate(record))
 
 
 @app.delete("/api/analytical-conditions/{record_id}")
-def delete_analytical_condition(
+async def delete_analytical_condition(
     record_id: int,
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
     """
     Delete a single analytical condition record by ID.
     """
-    record = db.query(AnalyticalCondition).filter(AnalyticalCondition.id == record_id).first()
+    group = await db.run_sync(delete_record, AnalyticalCondition, record_id)
     
-    if not record:
+    if group is None:
         raise HTTPException(status_code=404, detail=f"Analytical condition with ID {record_id} not found")
     
-    db.delete(record)
-    db.commit()
+    config_cache.invalidate(
+        record_tag("analytical_conditions", record_id),
+        group_tag("analytical_conditions", group)
+    )
     
     return {"success": True, "message": f"Deleted analytical condition with ID {record_id}"}
 
@@ -228,298 +658,917 @@ def delete_analytical_condition(
 # Element Information Endpoints
 # ============================================================================
 
-@app.post("/api/element-information/bulk", response_model=ElementInformationBulkResponse)
-def bulk_create_element_information(
+@app.post("/api/element-information/bulk", response_model=Union[ElementInformationBulkResponse, BulkCreateMinimalResponse])
+async def bulk_create_element_information(
+    request: Request,
+    response: Response,
     bulk_data: ElementInformationBulkCreate,
-    db: Session = Depends(get_db)
+    return_mode: Literal["representation", "minimal"] = Query("representation", alias="return"),
+    db: DbSession = Depends(get_db)
 ):
     """
     Bulk create element information records.
     
     Accepts a list of element information objects and inserts them into the database.
     Returns the created records with their assigned IDs and timestamps.
+    Pass ``return=minimal`` to get back only the new IDs and a count.
+    Bodies may be MessagePack (Content-Type / Accept: application/msgpack).
     """
     try:
-        created_records = []
-        
-        for record_data in bulk_data.records:
-            db_record = ElementInformation(
-                analytical_group=record_data.analytical_group,
-                page=record_data.page,
-                ch_value=record_data.ch_value,
-                elements=[elem.model_dump() for elem in record_data.elements],
-            )
-            db.add(db_record)
-            created_records.append(db_record)
-        
-        db.commit()
-        
-        for record in created_records:
-            db.refresh(record)
-        
-        return ElementInformationBulkResponse(
+        rows = [record_data.model_dump() for record_data in bulk_data.records]
+
+        # One multi-row INSERT; ids and timestamps come back without per-row refreshes
+        created = await db.run_sync(insert_records, ElementInformation, rows)
+        config_cache.invalidate_groups("element_information", (row["analytical_group"] for row in rows))
+
+        message = f"Successfully created {len(created)} element information record(s)"
+        if return_mode == "minimal":
+            return negotiated(request, response, BulkCreateMinimalResponse(
+                success=True,
+                message=message,
+                count=len(created),
+                ids=[c["id"] for c in created]
+            ))
+
+        return negotiated(request, response, ElementInformationBulkResponse(
             success=True,
-            message=f"Successfully created {len(created_records)} element information record(s)",
-            count=len(created_records),
-            records=[ElementInformationResponse.model_validate(r) for r in created_records]
-        )
+            message=message,
+            count=len(created),
+            records=[ElementInformationResponse.model_validate({**row, **generated}) for row, generated in zip(rows, created)]
+        ))
     
     except Exception as e:
-        db.rollback()
         raise HTTPException(status_code=400, detail=f"Error creating records: {str(e)}")
 
 
-@app.get("/api/element-information/bulk", response_model=ElementInformationBulkResponse)
-def bulk_read_element_information(
+@app.post("/api/element-information/import", response_model=ImportResponse)
+async def import_element_information(
+    request: Request,
+    chunk_size: int = Query(500, ge=1, le=10000),
+    db: DbSession = Depends(get_db)
+):
+    """
+    Stream-import element information records from newline-delimited JSON.
+    
+    The request body holds one ElementInformationCreate object per line. It is read
+    incrementally and inserted ``chunk_size`` lines at a time with a commit per
+    chunk, so large migrations neither buffer the whole upload nor hold one
+    giant transaction. Invalid lines are skipped and reported per chunk.
+    """
+    return await import_ndjson(request.stream(), db, ElementInformation, ElementInformationCreate, chunk_size)
+
+
+@app.get("/api/element-information/bulk", response_model=Union[ElementInformationBulkResponse, ProjectedBulkResponse])
+async def bulk_read_element_information(
+    request: Request,
+    response: Response,
     analytical_group: Optional[str] = None,
-    limit: Optional[int] = None,
-    db: Session = Depends(get_db)
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    output_format: Literal["json", "ndjson"] = Query("json", alias="format"),
+    view: Literal["full", "summary"] = "full",
+    fields: Optional[str] = None,
+    include_archived: bool = False,
+    db: DbSession = Depends(get_db)
 ):
     """
     Bulk read element information records.
     
     Retrieves all element information records from the database.
-    Supports optional filtering by analytical_group.
+    Supports optional filtering by analytical_group, keyset pagination via
+    ``limit`` and ``cursor`` (see ``next_cursor`` in the response) and
+    ``format=ndjson`` to stream the full history with flat memory.
+    ``view=summary`` or ``fields=a,b`` skip the heavy JSON columns at the SQL level.
+    ``include_archived=true`` also returns revisions moved to the archive.
+    Send ``Accept: application/msgpack`` for a MessagePack response.
     """
     try:
-        query = db.query(ElementInformation)
+        conditions = []
+        if analytical_group:
+            conditions.append(ElementInformation.analytical_group == analytical_group)
+        
+        columns = projected_columns(ElementInformation, view, fields)
+        if include_archived and output_format == "ndjson":
+            raise ValueError("include_archived is not supported with format=ndjson")
+        
+        etag = await bulk_read_etag(request, db, ElementInformation, conditions, analytical_group, include_archived=include_archived)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return not_modified(etag)
+        
+        if output_format == "ndjson":
+            return StreamingResponse(
+                stream_ndjson(ElementInformation, ElementInformationResponse, conditions, cursor, limit, columns),
+                media_type=NDJSON_MEDIA_TYPE,
+                headers={"ETag": etag}
+            )
         
         if analytical_group:
-            query = query.filter(ElementInformation.analytical_group == analytical_group)
+            # Group-filtered reads are cached until that group is written to
+            records, next_cursor = await config_cache.read_through(
+                ("bulk", "element_information", analytical_group, limit, cursor, columns and tuple(columns), include_archived),
+                lambda: db.run_sync(read_page, ElementInformation, conditions, limit, cursor, columns, include_archived, analytical_group),
+                tags=[group_tag("element_information", analytical_group)]
+            )
+        else:
+            records, next_cursor = await db.run_sync(read_page, ElementInformation, conditions, limit, cursor, columns, include_archived, analytical_group)
         
-        if limit:
-            query = query.limit(limit)
+        response.headers["ETag"] = etag
         
-        query = query.order_by(ElementInformation.created_at.desc())
-        records = query.all()
+        if columns is not None:
+            return negotiated(request, response, ProjectedBulkResponse(
+                success=True,
+                message=f"Retrieved {len(records)} element information record(s)",
+                count=len(records),
+                records=records,
+                next_cursor=next_cursor
+            ))
         
-        return ElementInformationBulkResponse(
+        # Rows were validated when written; serialize them without re-validating
+        return trusted_response(
+            request, response, ElementInformationBulkResponse, ElementInformationResponse, records,
             success=True,
             message=f"Retrieved {len(records)} element information record(s)",
             count=len(records),
-            records=[ElementInformationResponse.model_validate(r) for r in records]
+            next_cursor=next_cursor
         )
     
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error reading records: {str(e)}")
 
 
+@app.get("/api/element-information/search", response_model=ElementSearchResponse)
+async def search_element_information(
+    ele_name: Optional[str] = None,
+    chemic_ele: Optional[str] = None,
+    analytical_group: Optional[str] = None,
+    current_only: bool = True,
+    limit: Optional[int] = Query(None, ge=1),
+    db: DbSession = Depends(get_db)
+):
+    """
+    Find element entries across element information records.
+    
+    Served from the indexed element_entries table instead of parsing the
+    elements JSON of every record. Symbols match case-insensitively.
+    
+    Query Parameters:
+    - ele_name: Element name/symbol (e.g., "Mn")
+    - chemic_ele: Chemical element identifier (e.g., "MN")
+    - analytical_group: Restrict to one group
+    - current_only: Only search each group's current configuration (default true)
+    - limit: Maximum number of matches
+    """
+    matches = await db.run_sync(search_elements, ele_name, chemic_ele, analytical_group, current_only, limit)
+    return ElementSearchResponse(
+        success=True,
+        message=f"Found {len(matches)} element entr{'y' if len(matches) == 1 else 'ies'}",
+        count=len(matches),
+        matches=matches
+    )
+
+
+@app.put("/api/element-information/groups/{analytical_group:path}", response_model=ElementInformationBulkResponse)
+async def put_element_information_group(
+    analytical_group: str,
+    record_data: ElementInformationCreate,
+    request: Request,
+    response: Response,
+    db: DbSession = Depends(get_db)
+):
+    """
+    Set the current element information configuration of an analytical group.
+    
+    Upsert semantics: the body becomes the group's active configuration
+    (the group in the path overrides the one in the body). The previous
+    configuration is kept as history. Uploading settings identical to the
+    current ones writes nothing. Responds 201 for a group's first
+    configuration and 200 otherwise.
+    """
+    try:
+        record, status = await db.run_sync(put_group_config, ElementInformation, analytical_group, record_data.model_dump())
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error saving configuration: {str(e)}")
+    
+    if status != "unchanged":
+        config_cache.invalidate_groups("element_information", [analytical_group])
+    response.status_code = 201 if status == "created" else 200
+    
+    return negotiated(request, response, ElementInformationBulkResponse(
+        success=True,
+        message=f"{status.capitalize()} element information configuration for group {analytical_group}",
+        count=1,
+        records=[ElementInformationResponse.model_validate(record)]
+    ))
+
+
+@app.get("/api/element-information/groups/{analytical_group:path}/latest", response_model=ElementInformationResponse)
+async def get_latest_element_information(
+    analytical_group: str,
+    request: Request,
+    response: Response,
+    db: DbSession = Depends(get_db)
+):
+    """
+    Get the current element information configuration of an analytical group.
+    
+    Served from the current-config pointer, so the cost does not depend on
+    the size of the group's history. Supports If-None-Match -> 304.
+    """
+    record = await config_cache.read_through(
+        ("latest", "element_information", analytical_group),
+        lambda: db.run_sync(get_latest, ElementInformation, analytical_group),
+        tags=[group_tag("element_information", analytical_group)]
+    )
+    
+    if not record:
+        raise HTTPException(status_code=404, detail=f"No element information configuration for group {analytical_group}")
+    
+    etag = response_etag(request, record)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    
+    return negotiated(request, response, ElementInformationResponse.model_validate(record))
+
+
+@app.get("/api/element-information", response_model=ElementInformationBatchResponse)
+async def get_element_information_by_ids(
+    request: Request,
+    response: Response,
+    ids: str = Query(..., description="Comma-separated record IDs, e.g. 1,2,3"),
+    db: DbSession = Depends(get_db)
+):
+    """
+    Get several element information records by ID with a single query.
+    
+    Records are returned in the requested order (each ID once); IDs that do
+    not exist are listed in ``missing_ids``. Archived revisions are included.
+    Use POST /api/element-information/lookup for lists too long for a URL.
+    """
+    try:
+        record_ids = parse_id_list(ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await read_by_ids(request, response, db, ElementInformation, ElementInformationResponse, ElementInformationBatchResponse, record_ids, "element information record")
+
+
+@app.post("/api/element-information/lookup", response_model=ElementInformationBatchResponse)
+async def lookup_element_information_by_ids(
+    body: IdListRequest,
+    request: Request,
+    response: Response,
+    db: DbSession = Depends(get_db)
+):
+    """
+    Get several element information records by ID, with the ID list in the request body.
+    
+    Same result as GET /api/element-information?ids=...
+    """
+    return await read_by_ids(request, response, db, ElementInformation, ElementInformationResponse, ElementInformationBatchResponse, body.ids, "element information record")
+
+
 @app.get("/api/element-information/{record_id}", response_model=ElementInformationResponse)
-def get_element_information_by_id(
+async def get_element_information_by_id(
     record_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: DbSession = Depends(get_db)
 ):
     """
     Get a single element information record by ID.
     
     Returns the complete record including all element configurations.
+    The response carries an ETag for conditional GETs (If-None-Match -> 304).
     """
-    record = db.query(ElementInformation).filter(ElementInformation.id == record_id).first()
+    record = await config_cache.read_through(
+        record_tag("element_information", record_id),
+        lambda: db.run_sync(get_record, ElementInformation, record_id),
+        tags=[record_tag("element_information", record_id)]
+    )
     
     if not record:
         raise HTTPException(status_code=404, detail=f"Element information with ID {record_id} not found")
     
-    return ElementInformationResponse.model_validate(record)
+    etag = response_etag(request, record)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    
+    return negotiated(request, response, ElementInformationResponse.model_validate(record))
 
 
 # ============================================================================
 # Channel Information Endpoints
 # ============================================================================
 
-@app.post("/api/channel-information/bulk", response_model=ChannelInformationBulkResponse)
-def bulk_create_channel_information(
+@app.post("/api/channel-information/bulk", response_model=Union[ChannelInformationBulkResponse, BulkCreateMinimalResponse])
+async def bulk_create_channel_information(
+    request: Request,
+    response: Response,
     bulk_data: ChannelInformationBulkCreate,
-    db: Session = Depends(get_db)
+    return_mode: Literal["representation", "minimal"] = Query("representation", alias="return"),
+    db: DbSession = Depends(get_db)
 ):
     """
     Bulk create channel information records.
     
     Accepts a list of channel information objects and inserts them into the database.
     Returns the created records with their assigned IDs and timestamps.
+    Pass ``return=minimal`` to get back only the new IDs and a count.
+    Bodies may be MessagePack (Content-Type / Accept: application/msgpack).
     """
     try:
-        created_records = []
-        
-        for record_data in bulk_data.records:
-            db_record = ChannelInformation(
-                analytical_group=record_data.analytical_group,
-                page=record_data.page,
-                channels=[chan.model_dump() for chan in record_data.channels],
-            )
-            db.add(db_record)
-            created_records.append(db_record)
-        
-        db.commit()
-        
-        for record in created_records:
-            db.refresh(record)
-        
-        return ChannelInformationBulkResponse(
+        rows = [record_data.model_dump() for record_data in bulk_data.records]
+
+        # One multi-row INSERT; ids and timestamps come back without per-row refreshes
+        created = await db.run_sync(insert_records, ChannelInformation, rows)
+        config_cache.invalidate_groups("channel_information", (row["analytical_group"] for row in rows))
+
+        message = f"Successfully created {len(created)} channel information record(s)"
+        if return_mode == "minimal":
+            return negotiated(request, response, BulkCreateMinimalResponse(
+                success=True,
+                message=message,
+                count=len(created),
+                ids=[c["id"] for c in created]
+            ))
+
+        return negotiated(request, response, ChannelInformationBulkResponse(
             success=True,
-            message=f"Successfully created {len(created_records)} channel information record(s)",
-            count=len(created_records),
-            records=[ChannelInformationResponse.model_validate(r) for r in created_records]
-        )
+            message=message,
+            count=len(created),
+            records=[ChannelInformationResponse.model_validate({**row, **generated}) for row, generated in zip(rows, created)]
+        ))
     
     except Exception as e:
-        db.rollback()
         raise HTTPException(status_code=400, detail=f"Error creating records: {str(e)}")
 
 
-@app.get("/api/channel-information/bulk", response_model=ChannelInformationBulkResponse)
-def bulk_read_channel_information(
+@app.post("/api/channel-information/import", response_model=ImportResponse)
+async def import_channel_information(
+    request: Request,
+    chunk_size: int = Query(500, ge=1, le=10000),
+    db: DbSession = Depends(get_db)
+):
+    """
+    Stream-import channel information records from newline-delimited JSON.
+    
+    The request body holds one ChannelInformationCreate object per line. It is read
+    incrementally and inserted ``chunk_size`` lines at a time with a commit per
+    chunk, so large migrations neither buffer the whole upload nor hold one
+    giant transaction. Invalid lines are skipped and reported per chunk.
+    """
+    return await import_ndjson(request.stream(), db, ChannelInformation, ChannelInformationCreate, chunk_size)
+
+
+@app.get("/api/channel-information/bulk", response_model=Union[ChannelInformationBulkResponse, ProjectedBulkResponse])
+async def bulk_read_channel_information(
+    request: Request,
+    response: Response,
     analytical_group: Optional[str] = None,
-    limit: Optional[int] = None,
-    db: Session = Depends(get_db)
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    output_format: Literal["json", "ndjson"] = Query("json", alias="format"),
+    view: Literal["full", "summary"] = "full",
+    fields: Optional[str] = None,
+    include_archived: bool = False,
+    db: DbSession = Depends(get_db)
 ):
     """
     Bulk read channel information records.
     
     Retrieves all channel information records from the database.
-    Supports optional filtering by analytical_group.
+    Supports optional filtering by analytical_group, keyset pagination via
+    ``limit`` and ``cursor`` (see ``next_cursor`` in the response) and
+    ``format=ndjson`` to stream the full history with flat memory.
+    ``view=summary`` or ``fields=a,b`` skip the heavy JSON columns at the SQL level.
+    ``include_archived=true`` also returns revisions moved to the archive.
+    Send ``Accept: application/msgpack`` for a MessagePack response.
     """
     try:
-        query = db.query(ChannelInformation)
+        conditions = []
+        if analytical_group:
+            conditions.append(ChannelInformation.analytical_group == analytical_group)
+        
+        columns = projected_columns(ChannelInformation, view, fields)
+        if include_archived and output_format == "ndjson":
+            raise ValueError("include_archived is not supported with format=ndjson")
+        
+        etag = await bulk_read_etag(request, db, ChannelInformation, conditions, analytical_group, include_archived=include_archived)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return not_modified(etag)
+        
+        if output_format == "ndjson":
+            return StreamingResponse(
+                stream_ndjson(ChannelInformation, ChannelInformationResponse, conditions, cursor, limit, columns),
+                media_type=NDJSON_MEDIA_TYPE,
+                headers={"ETag": etag}
+            )
         
         if analytical_group:
-            query = query.filter(ChannelInformation.analytical_group == analytical_group)
+            # Group-filtered reads are cached until that group is written to
+            records, next_cursor = await config_cache.read_through(
+                ("bulk", "channel_information", analytical_group, limit, cursor, columns and tuple(columns), include_archived),
+                lambda: db.run_sync(read_page, ChannelInformation, conditions, limit, cursor, columns, include_archived, analytical_group),
+                tags=[group_tag("channel_information", analytical_group)]
+            )
+        else:
+            records, next_cursor = await db.run_sync(read_page, ChannelInformation, conditions, limit, cursor, columns, include_archived, analytical_group)
         
-        if limit:
-            query = query.limit(limit)
+        response.headers["ETag"] = etag
         
-        query = query.order_by(ChannelInformation.created_at.desc())
-        records = query.all()
+        if columns is not None:
+            return negotiated(request, response, ProjectedBulkResponse(
+                success=True,
+                message=f"Retrieved {len(records)} channel information record(s)",
+                count=len(records),
+                records=records,
+                next_cursor=next_cursor
+            ))
         
-        return ChannelInformationBulkResponse(
+        # Rows were validated when written; serialize them without re-validating
+        return trusted_response(
+            request, response, ChannelInformationBulkResponse, ChannelInformationResponse, records,
             success=True,
             message=f"Retrieved {len(records)} channel information record(s)",
             count=len(records),
-            records=[ChannelInformationResponse.model_validate(r) for r in records]
+            next_cursor=next_cursor
         )
     
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error reading records: {str(e)}")
 
 
+@app.get("/api/channel-information/search", response_model=ChannelSearchResponse)
+async def search_channel_information(
+    ele_name: Optional[str] = None,
+    wavelength: Optional[float] = Query(None, gt=0),
+    tolerance: float = Query(0.05, ge=0),
+    interval_element: Optional[str] = None,
+    analytical_group: Optional[str] = None,
+    current_only: bool = True,
+    limit: Optional[int] = Query(None, ge=1),
+    db: DbSession = Depends(get_db)
+):
+    """
+    Find channel entries across channel information records.
+    
+    Served from the indexed channel_entries table, e.g. "which groups measure
+    Mn at 293.3 nm" is ``?ele_name=Mn&wavelength=293.3``.
+    
+    Query Parameters:
+    - ele_name: Element name/symbol of the channel
+    - wavelength: Wavelength in nm, matched within ``tolerance`` (default 0.05 nm)
+    - interval_element: Interval reference element (e.g., "FE")
+    - analytical_group: Restrict to one group
+    - current_only: Only search each group's current configuration (default true)
+    - limit: Maximum number of matches
+    """
+    matches = await db.run_sync(
+        search_channels, ele_name, wavelength, tolerance, interval_element, analytical_group, current_only, limit
+    )
+    return ChannelSearchResponse(
+        success=True,
+        message=f"Found {len(matches)} channel entr{'y' if len(matches) == 1 else 'ies'}",
+        count=len(matches),
+        matches=matches
+    )
+
+
+@app.put("/api/channel-information/groups/{analytical_group:path}", response_model=ChannelInformationBulkResponse)
+async def put_channel_information_group(
+    analytical_group: str,
+    record_data: ChannelInformationCreate,
+    request: Request,
+    response: Response,
+    db: DbSession = Depends(get_db)
+):
+    """
+    Set the current channel information configuration of an analytical group.
+    
+    Upsert semantics: the body becomes the group's active configuration
+    (the group in the path overrides the one in the body). The previous
+    configuration is kept as history. Uploading settings identical to the
+    current ones writes nothing. Responds 201 for a group's first
+    configuration and 200 otherwise.
+    """
+    try:
+        record, status = await db.run_sync(put_group_config, ChannelInformation, analytical_group, record_data.model_dump())
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error saving configuration: {str(e)}")
+    
+    if status != "unchanged":
+        config_cache.invalidate_groups("channel_information", [analytical_group])
+    response.status_code = 201 if status == "created" else 200
+    
+    return negotiated(request, response, ChannelInformationBulkResponse(
+        success=True,
+        message=f"{status.capitalize()} channel information configuration for group {analytical_group}",
+        count=1,
+        records=[ChannelInformationResponse.model_validate(record)]
+    ))
+
+
+@app.get("/api/channel-information/groups/{analytical_group:path}/latest", response_model=ChannelInformationResponse)
+async def get_latest_channel_information(
+    analytical_group: str,
+    request: Request,
+    response: Response,
+    db: DbSession = Depends(get_db)
+):
+    """
+    Get the current channel information configuration of an analytical group.
+    
+    Served from the current-config pointer, so the cost does not depend on
+    the size of the group's history. Supports If-None-Match -> 304.
+    """
+    record = await config_cache.read_through(
+        ("latest", "channel_information", analytical_group),
+        lambda: db.run_sync(get_latest, ChannelInformation, analytical_group),
+        tags=[group_tag("channel_information", analytical_group)]
+    )
+    
+    if not record:
+        raise HTTPException(status_code=404, detail=f"No channel information configuration for group {analytical_group}")
+    
+    etag = response_etag(request, record)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    
+    return negotiated(request, response, ChannelInformationResponse.model_validate(record))
+
+
+@app.get("/api/channel-information", response_model=ChannelInformationBatchResponse)
+async def get_channel_information_by_ids(
+    request: Request,
+    response: Response,
+    ids: str = Query(..., description="Comma-separated record IDs, e.g. 1,2,3"),
+    db: DbSession = Depends(get_db)
+):
+    """
+    Get several channel information records by ID with a single query.
+    
+    Records are returned in the requested order (each ID once); IDs that do
+    not exist are listed in ``missing_ids``. Archived revisions are included.
+    Use POST /api/channel-information/lookup for lists too long for a URL.
+    """
+    try:
+        record_ids = parse_id_list(ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await read_by_ids(request, response, db, ChannelInformation, ChannelInformationResponse, ChannelInformationBatchResponse, record_ids, "channel information record")
+
+
+@app.post("/api/channel-information/lookup", response_model=ChannelInformationBatchResponse)
+async def lookup_channel_information_by_ids(
+    body: IdListRequest,
+    request: Request,
+    response: Response,
+    db: DbSession = Depends(get_db)
+):
+    """
+    Get several channel information records by ID, with the ID list in the request body.
+    
+    Same result as GET /api/channel-information?ids=...
+    """
+    return await read_by_ids(request, response, db, ChannelInformation, ChannelInformationResponse, ChannelInformationBatchResponse, body.ids, "channel information record")
+
+
 @app.get("/api/channel-information/{record_id}", response_model=ChannelInformationResponse)
-def get_channel_information_by_id(
+async def get_channel_information_by_id(
     record_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: DbSession = Depends(get_db)
 ):
     """
     Get a single channel information record by ID.
     
     Returns the complete record including all channel configurations.
+    The response carries an ETag for conditional GETs (If-None-Match -> 304).
     """
-    record = db.query(ChannelInformation).filter(ChannelInformation.id == record_id).first()
+    record = await config_cache.read_through(
+        record_tag("channel_information", record_id),
+        lambda: db.run_sync(get_record, ChannelInformation, record_id),
+        tags=[record_tag("channel_information", record_id)]
+    )
     
     if not record:
         raise HTTPException(status_code=404, detail=f"Channel information with ID {record_id} not found")
     
-    return ChannelInformationResponse.model_validate(record)
+    etag = response_etag(request, record)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    
+    return negotiated(request, response, ChannelInformationResponse.model_validate(record))
 
 
 # ============================================================================
 # Attenuator Information Endpoints
 # ============================================================================
 
-@app.post("/api/attenuator-information/bulk", response_model=AttenuatorInformationBulkResponse)
-def bulk_create_attenuator_information(
+@app.post("/api/attenuator-information/bulk", response_model=Union[AttenuatorInformationBulkResponse, BulkCreateMinimalResponse])
+async def bulk_create_attenuator_information(
+    request: Request,
+    response: Response,
     bulk_data: AttenuatorInformationBulkCreate,
-    db: Session = Depends(get_db)
+    return_mode: Literal["representation", "minimal"] = Query("representation", alias="return"),
+    db: DbSession = Depends(get_db)
 ):
     """
     Bulk create attenuator information records.
     
     Accepts a list of attenuator information objects and inserts them into the database.
     Returns the created records with their assigned IDs and timestamps.
+    Pass ``return=minimal`` to get back only the new IDs and a count.
+    Bodies may be MessagePack (Content-Type / Accept: application/msgpack).
     """
     try:
-        created_records = []
-        
-        for record_data in bulk_data.records:
-            db_record = AttenuatorInformation(
-                analytical_group=record_data.analytical_group,
-                page=record_data.page,
-                left_table=[row.model_dump() for row in record_data.left_table],
-                right_table=[row.model_dump() for row in record_data.right_table],
-            )
-            db.add(db_record)
-            created_records.append(db_record)
-        
-        db.commit()
-        
-        for record in created_records:
-            db.refresh(record)
-        
-        return AttenuatorInformationBulkResponse(
+        rows = [record_data.model_dump() for record_data in bulk_data.records]
+
+        # One multi-row INSERT; ids and timestamps come back without per-row refreshes
+        created = await db.run_sync(insert_records, AttenuatorInformation, rows)
+        config_cache.invalidate_groups("attenuator_information", (row["analytical_group"] for row in rows))
+
+        message = f"Successfully created {len(created)} attenuator information record(s)"
+        if return_mode == "minimal":
+            return negotiated(request, response, BulkCreateMinimalResponse(
+                success=True,
+                message=message,
+                count=len(created),
+                ids=[c["id"] for c in created]
+            ))
+
+        return negotiated(request, response, AttenuatorInformationBulkResponse(
             success=True,
-            message=f"Successfully created {len(created_records)} attenuator information record(s)",
-            count=len(created_records),
-            records=[AttenuatorInformationResponse.model_validate(r) for r in created_records]
-        )
+            message=message,
+            count=len(created),
+            records=[AttenuatorInformationResponse.model_validate({**row, **generated}) for row, generated in zip(rows, created)]
+        ))
     
     except Exception as e:
-        db.rollback()
         raise HTTPException(status_code=400, detail=f"Error creating records: {str(e)}")
 
 
-@app.get("/api/attenuator-information/bulk", response_model=AttenuatorInformationBulkResponse)
-def bulk_read_attenuator_information(
+@app.post("/api/attenuator-information/import", response_model=ImportResponse)
+async def import_attenuator_information(
+    request: Request,
+    chunk_size: int = Query(500, ge=1, le=10000),
+    db: DbSession = Depends(get_db)
+):
+    """
+    Stream-import attenuator information records from newline-delimited JSON.
+    
+    The request body holds one AttenuatorInformationCreate object per line. It is read
+    incrementally and inserted ``chunk_size`` lines at a time with a commit per
+    chunk, so large migrations neither buffer the whole upload nor hold one
+    giant transaction. Invalid lines are skipped and reported per chunk.
+    """
+    return await import_ndjson(request.stream(), db, AttenuatorInformation, AttenuatorInformationCreate, chunk_size)
+
+
+@app.get("/api/attenuator-information/bulk", response_model=Union[AttenuatorInformationBulkResponse, ProjectedBulkResponse])
+async def bulk_read_attenuator_information(
+    request: Request,
+    response: Response,
     analytical_group: Optional[str] = None,
-    limit: Optional[int] = None,
-    db: Session = Depends(get_db)
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    output_format: Literal["json", "ndjson"] = Query("json", alias="format"),
+    view: Literal["full", "summary"] = "full",
+    fields: Optional[str] = None,
+    include_archived: bool = False,
+    db: DbSession = Depends(get_db)
 ):
     """
     Bulk read attenuator information records.
     
     Retrieves all attenuator information records from the database.
-    Supports optional filtering by analytical_group.
+    Supports optional filtering by analytical_group, keyset pagination via
+    ``limit`` and ``cursor`` (see ``next_cursor`` in the response) and
+    ``format=ndjson`` to stream the full history with flat memory.
+    ``view=summary`` or ``fields=a,b`` skip the heavy JSON columns at the SQL level.
+    ``include_archived=true`` also returns revisions moved to the archive.
+    Send ``Accept: application/msgpack`` for a MessagePack response.
     """
     try:
-        query = db.query(AttenuatorInformation)
+        conditions = []
+        if analytical_group:
+            conditions.append(AttenuatorInformation.analytical_group == analytical_group)
+        
+        columns = projected_columns(AttenuatorInformation, view, fields)
+        if include_archived and output_format == "ndjson":
+            raise ValueError("include_archived is not supported with format=ndjson")
+        
+        etag = await bulk_read_etag(request, db, AttenuatorInformation, conditions, analytical_group, include_archived=include_archived)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return not_modified(etag)
+        
+        if output_format == "ndjson":
+            return StreamingResponse(
+                stream_ndjson(AttenuatorInformation, AttenuatorInformationResponse, conditions, cursor, limit, columns),
+                media_type=NDJSON_MEDIA_TYPE,
+                headers={"ETag": etag}
+            )
         
         if analytical_group:
-            query = query.filter(AttenuatorInformation.analytical_group == analytical_group)
+            # Group-filtered reads are cached until that group is written to
+            records, next_cursor = await config_cache.read_through(
+                ("bulk", "attenuator_information", analytical_group, limit, cursor, columns and tuple(columns), include_archived),
+                lambda: db.run_sync(read_page, AttenuatorInformation, conditions, limit, cursor, columns, include_archived, analytical_group),
+                tags=[group_tag("attenuator_information", analytical_group)]
+            )
+        else:
+            records, next_cursor = await db.run_sync(read_page, AttenuatorInformation, conditions, limit, cursor, columns, include_archived, analytical_group)
         
-        if limit:
-            query = query.limit(limit)
+        response.headers["ETag"] = etag
         
-        query = query.order_by(AttenuatorInformation.created_at.desc())
-        records = query.all()
+        if columns is not None:
+            return negotiated(request, response, ProjectedBulkResponse(
+                success=True,
+                message=f"Retrieved {len(records)} attenuator information record(s)",
+                count=len(records),
+                records=records,
+                next_cursor=next_cursor
+            ))
         
-        return AttenuatorInformationBulkResponse(
+        # Rows were validated when written; serialize them without re-validating
+        return trusted_response(
+            request, response, AttenuatorInformationBulkResponse, AttenuatorInformationResponse, records,
             success=True,
             message=f"Retrieved {len(records)} attenuator information record(s)",
             count=len(records),
-            records=[AttenuatorInformationResponse.model_validate(r) for r in records]
+            next_cursor=next_cursor
         )
     
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error reading records: {str(e)}")
 
 
+@app.get("/api/attenuator-information/search", response_model=AttenuatorSearchResponse)
+async def search_attenuator_information(
+    element: Optional[str] = None,
+    side: Optional[Literal["left", "right"]] = None,
+    analytical_group: Optional[str] = None,
+    current_only: bool = True,
+    limit: Optional[int] = Query(None, ge=1),
+    db: DbSession = Depends(get_db)
+):
+    """
+    Find attenuator table rows across attenuator information records.
+    
+    Served from the indexed attenuator_entries table.
+    
+    Query Parameters:
+    - element: Element symbol (e.g., "Fe")
+    - side: "left" or "right" table
+    - analytical_group: Restrict to one group
+    - current_only: Only search each group's current configuration (default true)
+    - limit: Maximum number of matches
+    """
+    matches = await db.run_sync(search_attenuators, element, side, analytical_group, current_only, limit)
+    return AttenuatorSearchResponse(
+        success=True,
+        message=f"Found {len(matches)} attenuator entr{'y' if len(matches) == 1 else 'ies'}",
+        count=len(matches),
+        matches=matches
+    )
+
+
+@app.put("/api/attenuator-information/groups/{analytical_group:path}", response_model=AttenuatorInformationBulkResponse)
+async def put_attenuator_information_group(
+    analytical_group: str,
+    record_data: AttenuatorInformationCreate,
+    request: Request,
+    response: Response,
+    db: DbSession = Depends(get_db)
+):
+    """
+    Set the current attenuator information configuration of an analytical group.
+    
+    Upsert semantics: the body becomes the group's active configuration
+    (the group in the path overrides the one in the body). The previous
+    configuration is kept as history. Uploading settings identical to the
+    current ones writes nothing. Responds 201 for a group's first
+    configuration and 200 otherwise.
+    """
+    try:
+        record, status = await db.run_sync(put_group_config, AttenuatorInformation, analytical_group, record_data.model_dump())
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error saving configuration: {str(e)}")
+    
+    if status != "unchanged":
+        config_cache.invalidate_groups("attenuator_information", [analytical_group])
+    response.status_code = 201 if status == "created" else 200
+    
+    return negotiated(request, response, AttenuatorInformationBulkResponse(
+        success=True,
+        message=f"{status.capitalize()} attenuator information configuration for group {analytical_group}",
+        count=1,
+        records=[AttenuatorInformationResponse.model_validate(record)]
+    ))
+
+
+@app.get("/api/attenuator-information/groups/{analytical_group:path}/latest", response_model=AttenuatorInformationResponse)
+async def get_latest_attenuator_information(
+    analytical_group: str,
+    request: Request,
+    response: Response,
+    db: DbSession = Depends(get_db)
+):
+    """
+    Get the current attenuator information configuration of an analytical group.
+    
+    Served from the current-config pointer, so the cost does not depend on
+    the size of the group's history. Supports If-None-Match -> 304.
+    """
+    record = await config_cache.read_through(
+        ("latest", "attenuator_information", analytical_group),
+        lambda: db.run_sync(get_latest, AttenuatorInformation, analytical_group),
+        tags=[group_tag("attenuator_information", analytical_group)]
+    )
+    
+    if not record:
+        raise HTTPException(status_code=404, detail=f"No attenuator information configuration for group {analytical_group}")
+    
+    etag = response_etag(request, record)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    
+    return negotiated(request, response, AttenuatorInformationResponse.model_validate(record))
+
+
+@app.get("/api/attenuator-information", response_model=AttenuatorInformationBatchResponse)
+async def get_attenuator_information_by_ids(
+    request: Request,
+    response: Response,
+    ids: str = Query(..., description="Comma-separated record IDs, e.g. 1,2,3"),
+    db: DbSession = Depends(get_db)
+):
+    """
+    Get several attenuator information records by ID with a single query.
+    
+    Records are returned in the requested order (each ID once); IDs that do
+    not exist are listed in ``missing_ids``. Archived revisions are included.
+    Use POST /api/attenuator-information/lookup for lists too long for a URL.
+    """
+    try:
+        record_ids = parse_id_list(ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await read_by_ids(request, response, db, AttenuatorInformation, AttenuatorInformationResponse, AttenuatorInformationBatchResponse, record_ids, "attenuator information record")
+
+
+@app.post("/api/attenuator-information/lookup", response_model=AttenuatorInformationBatchResponse)
+async def lookup_attenuator_information_by_ids(
+    body: IdListRequest,
+    request: Request,
+    response: Response,
+    db: DbSession = Depends(get_db)
+):
+    """
+    Get several attenuator information records by ID, with the ID list in the request body.
+    
+    Same result as GET /api/attenuator-information?ids=...
+    """
+    return await read_by_ids(request, response, db, AttenuatorInformation, AttenuatorInformationResponse, AttenuatorInformationBatchResponse, body.ids, "attenuator information record")
+
+
 @app.get("/api/attenuator-information/{record_id}", response_model=AttenuatorInformationResponse)
-def get_attenuator_information_by_id(
+async def get_attenuator_information_by_id(
     record_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: DbSession = Depends(get_db)
 ):
     """
     Get a single attenuator information record by ID.
     
     Returns the complete record including both left_table and right_table data.
+    The response carries an ETag for conditional GETs (If-None-Match -> 304).
     """
-    record = db.query(AttenuatorInformation).filter(AttenuatorInformation.id == record_id).first()
+    record = await config_cache.read_through(
+        record_tag("attenuator_information", record_id),
+        lambda: db.run_sync(get_record, AttenuatorInformation, record_id),
+        tags=[record_tag("attenuator_information", record_id)]
+    )
     
     if not record:
         raise HTTPException(status_code=404, detail=f"Attenuator information with ID {record_id} not found")
     
-    return AttenuatorInformationResponse.model_validate(record)
+    etag = response_etag(request, record)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    
+    return negotiated(request, response, AttenuatorInformationResponse.model_validate(record))
 
 
 # --- CONSTANTS ---
-SERIAL_PORT = "COM6"  # Updated to match your working script
-BAUD_RATE = 115200
+# The port itself is configured with SERIAL_PORT / SERIAL_BAUD_RATE (serial_link.py)
 CONTROL_HEADER = 0xFF
 ATT_STEP = 0.5
 
@@ -551,12 +1600,23 @@ def build_time_value(ms: int) -> int:
 class TestCommand(BaseModel):
     element: str    # e.g., "Fe"
     value: float    # Interpreted as Attenuation (dB) e.g., 77.0
+    priority: int = Field(PRIORITY_NORMAL, ge=0, le=9)  # 0 is sent first
+
+
+class HardwareJobRequest(BaseModel):
+    frames: List[str] = Field(min_length=1)  # hex, e.g. "FF870A"
+    priority: int = Field(PRIORITY_NORMAL, ge=0, le=9)
+
 
 # --- ENDPOINT ---
 @app.post("/api/test-hardware")
-def test_hardware_connection(command: TestCommand):
+async def test_hardware_connection(command: TestCommand, wait: bool = Query(False, description="Wait until the frame is sent (and acknowledged)")):
     """
     Directly converts input using the 'Port Value' bitwise logic and sends to Serial.
+
+    The frame is queued on the serial link and the job ID returned right
+    away (poll ``/api/hardware/jobs/{job_id}``); with ``wait`` the request
+    waits for the job to finish.
     """
     try:
         # 1. Logic Phase: Prepare the 3 Bytes
@@ -578,20 +1638,26 @@ def test_hardware_connection(command: TestCommand):
         print(f"HARDWARE TEST: {status_msg}")
 
         # 2. Transmission Phase
-        # Using the exact logic from your working script
-        with serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=1) as ser:
-            # IMPORTANT: Wait for Arduino reset behavior
-            time.sleep(2) 
-            
-            ser.write(payload)
-            ser.flush()
+        job = serial_link.submit([payload], command.priority)
+        if wait:
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job.future)), SERIAL_WRITE_TIMEOUT)
+        elif job.state == "failed":
+            raise Exception(job.error)
 
         return {
             "success": True, 
-            "message": f"Sent sequence 0x{hex_string} to hardware!",
+            "message": f"{'Sent' if wait else 'Queued'} sequence 0x{hex_string} to hardware!",
+            "job_id": job.id,
             "debug": status_msg
         }
 
+    except asyncio.TimeoutError:
+        return {
+            "success": False,
+            "message": "Hardware Error",
+            "job_id": job.id,
+            "error": f"Job {job.id} not finished within {SERIAL_WRITE_TIMEOUT}s"
+        }
     except KeyError:
         return {
             "success": False,
@@ -603,4 +1669,29 @@ def test_hardware_connection(command: TestCommand):
             "success": False, 
             "message": "Hardware Error",
             "error": str(e)
-        }
\ No newline at end of file
+        }
+
+
+@app.post("/api/hardware/jobs")
+def submit_hardware_job(request: HardwareJobRequest):
+    """Queue raw frames (hex) as one job and return its status without waiting."""
+    try:
+        frames = [bytes.fromhex(frame) for frame in request.frames]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid hex frame: {e}")
+    return serial_link.submit(frames, request.priority).as_dict()
+
+
+@app.get("/api/hardware/jobs/{job_id}")
+def get_hardware_job(job_id: int):
+    """Status of a hardware job (finished jobs are kept for the last 1000 jobs)."""
+    job = serial_link.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Hardware job {job_id} not found")
+    return job.as_dict()
+
+
+@app.get("/api/hardware/status")
+def hardware_status():
+    """Serial link state, queue depth, counters and job latency percentiles."""
+    return serial_link.status()
@@ -1,8 +1,19 @@
-from sqlalchemy import Column, Integer, String, JSON, DateTime, Index
+from sqlalchemy import Column, Computed, Integer, String, JSON, DateTime, Float, ForeignKey, Index, LargeBinary
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.sql import func
 from database import Base
 
 
+# Audit timestamp type. SQLite stores the CURRENT_TIMESTAMP server default
+# without fractional seconds, so bound datetimes use the same text format;
+# otherwise equal timestamps compare unequal as strings and keyset
+# pagination skips or repeats rows. (MySQL DATETIME has second precision too.)
+Timestamp = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"),
+    "sqlite",
+)
+
+
 class AnalyticalCondition(Base):
     """
     Model for storing analytical condition configurations.
@@ -12,6 +23,7 @@ class AnalyticalCondition(Base):
     - analytical_method: Integration Mode or PDA + Integration
     - seq: Nested object with purge, source, preburn, integ, clean sequences
     - level_out_information: Monitor element and level percentages
+    - source_seq1 / monitor_element: indexed columns generated from the JSON
     """
     __tablename__ = "analytical_conditions"
 
@@ -19,7 +31,7 @@ class AnalyticalCondition(Base):
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     
     # Core fields from the schema
-    analytical_group = Column(String(100), nullable=False, index=True)
+    analytical_group = Column(String(100), nullable=False)
     analytical_method = Column(String(50), nullable=False)
     
     # Complex nested structures stored as JSON
@@ -29,13 +41,27 @@ class AnalyticalCondition(Base):
     # level_out_information contains: monitor_element, h_level_percent, l_level_percent
     level_out_information = Column(JSON, nullable=False)
     
+    # Virtual generated columns for frequently filtered JSON paths, so those
+    # filters use a secondary index instead of parsing every row's JSON.
+    # ->> is supported by MySQL 5.7.13+ and SQLite 3.38+.
+    source_seq1 = Column(String(50), Computed("seq ->> '$.source.seq1'", persisted=False))
+    monitor_element = Column(String(10), Computed("level_out_information ->> '$.monitor_element.element'", persisted=False))
+    
     # Timestamps for audit trail
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    created_at = Column(Timestamp, server_default=func.now(), nullable=False)
+    updated_at = Column(Timestamp, server_default=func.now(), onupdate=func.now(), nullable=False)
 
-    # Composite index for common queries
+    # Composite indexes matched to the bulk read access patterns: every
+    # filter is followed by the (created_at, id) sort key so MySQL reads rows
+    # in order instead of filesorting, and (group, updated_at) covers the
+    # ETag validator query
     __table_args__ = (
-        Index('idx_group_method', 'analytical_group', 'analytical_method'),
+        Index('idx_ac_group_created', 'analytical_group', 'created_at', 'id'),
+        Index('idx_ac_group_method_created', 'analytical_group', 'analytical_method', 'created_at', 'id'),
+        Index('idx_ac_group_updated', 'analytical_group', 'updated_at'),
+        Index('idx_ac_created', 'created_at', 'id'),
+        Index('idx_ac_source_seq1_created', 'source_seq1', 'created_at', 'id'),
+        Index('idx_ac_monitor_element_created', 'monitor_element', 'created_at', 'id'),
     )
 
     def __repr__(self):
@@ -58,7 +84,7 @@ class ElementInformation(Base):
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     
     # Core fields from the schema
-    analytical_group = Column(String(100), nullable=False, index=True)
+    analytical_group = Column(String(100), nullable=False)
     page = Column(String(50), nullable=False, default="element_information")
     ch_value = Column(String(10), nullable=False)
     
@@ -66,12 +92,16 @@ class ElementInformation(Base):
     elements = Column(JSON, nullable=False)
     
     # Timestamps for audit trail
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    created_at = Column(Timestamp, server_default=func.now(), nullable=False)
+    updated_at = Column(Timestamp, server_default=func.now(), onupdate=func.now(), nullable=False)
 
-    # Index for common queries
+    # Indexes matched to the bulk read access patterns (see AnalyticalCondition)
     __table_args__ = (
-        Index('idx_elem_group', 'analytical_group'),
+        Index('idx_elem_group_created', 'analytical_group', 'created_at', 'id'),
+        Index('idx_elem_group_updated', 'analytical_group', 'updated_at'),
+        Index('idx_elem_created', 'created_at', 'id'),
+        # Never reuse IDs on SQLite: cached reconstructions are keyed by them
+        {"sqlite_autoincrement": True},
     )
 
     def __repr__(self):
@@ -93,19 +123,23 @@ class ChannelInformation(Base):
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     
     # Core fields from the schema
-    analytical_group = Column(String(100), nullable=False, index=True)
+    analytical_group = Column(String(100), nullable=False)
     page = Column(String(50), nullable=False, default="channel_information")
     
     # Array of channel configurations stored as JSON
     channels = Column(JSON, nullable=False)
     
     # Timestamps for audit trail
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    created_at = Column(Timestamp, server_default=func.now(), nullable=False)
+    updated_at = Column(Timestamp, server_default=func.now(), onupdate=func.now(), nullable=False)
 
-    # Index for common queries
+    # Indexes matched to the bulk read access patterns (see AnalyticalCondition)
     __table_args__ = (
-        Index('idx_chan_group', 'analytical_group'),
+        Index('idx_chan_group_created', 'analytical_group', 'created_at', 'id'),
+        Index('idx_chan_group_updated', 'analytical_group', 'updated_at'),
+        Index('idx_chan_created', 'created_at', 'id'),
+        # Never reuse IDs on SQLite: cached reconstructions are keyed by them
+        {"sqlite_autoincrement": True},
     )
 
     def __repr__(self):
@@ -128,7 +162,7 @@ class AttenuatorInformation(Base):
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     
     # Core fields from the schema
-    analytical_group = Column(String(100), nullable=False, index=True)
+    analytical_group = Column(String(100), nullable=False)
     page = Column(String(50), nullable=False, default="attenuator_information")
     
     # Left and right table data stored as JSON arrays
@@ -136,13 +170,186 @@ class AttenuatorInformation(Base):
     right_table = Column(JSON, nullable=False)
     
     # Timestamps for audit trail
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    created_at = Column(Timestamp, server_default=func.now(), nullable=False)
+    updated_at = Column(Timestamp, server_default=func.now(), onupdate=func.now(), nullable=False)
 
-    # Index for common queries
+    # Indexes matched to the bulk read access patterns (see AnalyticalCondition)
     __table_args__ = (
-        Index('idx_att_group', 'analytical_group'),
+        Index('idx_att_group_created', 'analytical_group', 'created_at', 'id'),
+        Index('idx_att_group_updated', 'analytical_group', 'updated_at'),
+        Index('idx_att_created', 'created_at', 'id'),
+        # Never reuse IDs on SQLite: cached reconstructions are keyed by them
+        {"sqlite_autoincrement": True},
     )
 
     def __repr__(self):
         return f"<AttenuatorInformation(id={self.id}, group={self.analytical_group})>"
+
+
+class CurrentConfig(Base):
+    """
+    Pointer to the active (latest) configuration of each analytical group.
+    
+    Every upload of a page is kept as a new row in its resource table; this
+    table holds one row per (resource, analytical_group) naming the row that
+    is currently in effect, so the active configuration is a primary key
+    lookup however long the group's history is:
+    - resource: Table name of the resource (e.g. "channel_information")
+    - analytical_group: Group identifier
+    - record_id: ID of the current row in the resource table
+    """
+    __tablename__ = "current_configs"
+
+    resource = Column(String(50), primary_key=True)
+    analytical_group = Column(String(100), primary_key=True)
+    record_id = Column(Integer, nullable=False)
+    
+    updated_at = Column(Timestamp, server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<CurrentConfig(resource={self.resource}, group={self.analytical_group}, record_id={self.record_id})>"
+
+
+# ============================================================================
+# Normalized child rows
+# ============================================================================
+# One row per entry of the JSON arrays above, with typed and indexed columns
+# so "which groups measure Mn at 293.3 nm" is an index lookup instead of
+# parsing every blob. The JSON columns stay the source of truth; these rows
+# are written in the same transaction as their parent record. Element
+# symbols are stored upper-cased so lookups are case-insensitive on every
+# backend. The schemas do not bound these fields, so the text columns are
+# wide and child_rows.py clips longer values and stores NULL for numbers
+# that do not fit: a record the API accepts never fails its child rows.
+
+
+class ElementEntry(Base):
+    """One entry of ElementInformation.elements."""
+    __tablename__ = "element_entries"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    record_id = Column(Integer, ForeignKey("element_information.id", ondelete="CASCADE"), nullable=False, index=True)
+    analytical_group = Column(String(100), nullable=False)
+    position = Column(Integer, nullable=False)
+    
+    ele_name = Column(String(255), nullable=False)
+    chemic_ele = Column(String(255), nullable=False)
+    element = Column(String(255), nullable=False)
+    asterisk = Column(String(255), nullable=False)
+    analytical_range_min = Column(Float, nullable=True)
+    analytical_range_max = Column(Float, nullable=True)
+
+    __table_args__ = (
+        Index('idx_elem_entry_name', 'ele_name', 'analytical_group'),
+        Index('idx_elem_entry_chemic', 'chemic_ele', 'analytical_group'),
+    )
+
+    def __repr__(self):
+        return f"<ElementEntry(record_id={self.record_id}, position={self.position}, ele_name={self.ele_name})>"
+
+
+class ChannelEntry(Base):
+    """One entry of ChannelInformation.channels, with the wavelength parsed to a number."""
+    __tablename__ = "channel_entries"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    record_id = Column(Integer, ForeignKey("channel_information.id", ondelete="CASCADE"), nullable=False, index=True)
+    analytical_group = Column(String(100), nullable=False)
+    position = Column(Integer, nullable=False)
+    
+    ele_name = Column(String(255), nullable=False)
+    wavelength = Column(Float, nullable=True)
+    seq = Column(Integer, nullable=True)
+    w_no = Column(String(255), nullable=False)
+    interval_element = Column(String(255), nullable=False)
+    interval_value = Column(Float, nullable=True)
+
+    __table_args__ = (
+        Index('idx_chan_entry_name_wl', 'ele_name', 'wavelength'),
+        Index('idx_chan_entry_wl', 'wavelength'),
+        Index('idx_chan_entry_interval', 'interval_element', 'analytical_group'),
+    )
+
+    def __repr__(self):
+        return f"<ChannelEntry(record_id={self.record_id}, ele_name={self.ele_name}, wavelength={self.wavelength})>"
+
+
+class AttenuatorEntry(Base):
+    """One row of AttenuatorInformation.left_table or right_table."""
+    __tablename__ = "attenuator_entries"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    record_id = Column(Integer, ForeignKey("attenuator_information.id", ondelete="CASCADE"), nullable=False, index=True)
+    analytical_group = Column(String(100), nullable=False)
+    side = Column(String(5), nullable=False)  # "left" or "right"
+    position = Column(Integer, nullable=False)
+    
+    element = Column(String(255), nullable=False)
+    ele_value = Column(Float, nullable=True)
+    att_value = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index('idx_att_entry_element', 'element', 'analytical_group'),
+    )
+
+    def __repr__(self):
+        return f"<AttenuatorEntry(record_id={self.record_id}, side={self.side}, element={self.element})>"
+
+
+class ConfigDelta(Base):
+    """
+    Diff of a superseded element/channel/attenuator revision against its base.
+    
+    A row here means the resource row's JSON columns hold JSON null and its
+    content is the base revision with ``delta`` applied (see revisions.py):
+    - resource: Table name of the resource
+    - record_id: ID of the revision stored as a diff
+    - base_id: ID of the revision the diff applies to
+    - depth: Number of diffs between this revision and its full snapshot
+    """
+    __tablename__ = "config_deltas"
+
+    resource = Column(String(50), primary_key=True)
+    record_id = Column(Integer, primary_key=True)
+    base_id = Column(Integer, nullable=False)
+    depth = Column(Integer, nullable=False)
+    delta = Column(JSON, nullable=False)
+
+    __table_args__ = (
+        Index('idx_delta_base', 'resource', 'base_id'),
+    )
+
+    def __repr__(self):
+        return f"<ConfigDelta(resource={self.resource}, record_id={self.record_id}, base_id={self.base_id})>"
+
+
+class ArchivedRevision(Base):
+    """
+    Configuration revision moved out of its resource table by the archival job.
+    
+    Old history is kept here so the resource tables and their indexes only
+    hold recent revisions (see archive.py):
+    - resource / record_id: Table name and original ID of the revision
+    - analytical_group, created_at, updated_at: Copied from the revision
+    - archived_at: When the revision was moved
+    - payload: zlib-compressed JSON of the remaining columns
+    """
+    __tablename__ = "archived_revisions"
+
+    resource = Column(String(50), primary_key=True)
+    record_id = Column(Integer, primary_key=True)
+    analytical_group = Column(String(100), nullable=False)
+    created_at = Column(Timestamp, nullable=False)
+    updated_at = Column(Timestamp, nullable=False)
+    archived_at = Column(Timestamp, server_default=func.now(), nullable=False)
+    payload = Column(LargeBinary(length=2**24), nullable=False)
+
+    # Same (created_at, id) order as the resource tables, so archived pages
+    # merge with hot pages without sorting
+    __table_args__ = (
+        Index('idx_archive_group_created', 'resource', 'analytical_group', 'created_at', 'record_id'),
+        Index('idx_archive_created', 'resource', 'created_at', 'record_id'),
+    )
+
+    def __repr__(self):
+        return f"<ArchivedRevision(resource={self.resource}, record_id={self.record_id}, group={self.analytical_group})>"
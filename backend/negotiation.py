@@ -0,0 +1,87 @@
+"""
+MessagePack content negotiation for the bulk endpoints.
+
+Clients that send ``Content-Type: application/msgpack`` have their request
+body decoded from MessagePack before FastAPI validates it, and clients that
+send ``Accept: application/msgpack`` get MessagePack responses. Everything
+else keeps using JSON. The ``msgpack`` package is optional: without it
+MessagePack request bodies are rejected with 415 and responses fall back to
+JSON.
+"""
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException, Request, Response
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+
+
+def _media_type(header: Optional[str]) -> str:
+    return (header or "").split(";")[0].strip().lower()
+
+
+def wants_msgpack(request: Request) -> bool:
+    """True if the client listed a MessagePack media type in ``Accept``."""
+    if msgpack is None:
+        return False
+    accept = request.headers.get("accept", "")
+    return any(_media_type(part) in MSGPACK_MEDIA_TYPES for part in accept.split(","))
+
+
+def negotiated(request: Request, response: Response, content: BaseModel) -> Any:
+    """
+    Return ``content`` in the representation the client asked for.
+
+    For MessagePack this builds the response directly and copies over headers
+    set on the injected ``response`` (e.g. ETag). Otherwise ``content`` is
+    returned unchanged and FastAPI serializes it as JSON.
+    """
+    response.headers["Vary"] = "Accept"
+    if not wants_msgpack(request):
+        return content
+    headers = {k: v for k, v in response.headers.items() if k.lower() not in ("content-length", "content-type")}
+    return Response(
+        msgpack.packb(content.model_dump(mode="json")),
+        status_code=response.status_code or 200,
+        media_type=MSGPACK_MEDIA_TYPE,
+        headers=headers,
+    )
+
+
+class MsgPackRequest(Request):
+    """Request whose MessagePack body is exposed to FastAPI as already-parsed JSON."""
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = msgpack.unpackb(await self.body())
+        return self._json
+
+
+class MsgPackRoute(APIRoute):
+    """APIRoute that accepts ``application/msgpack`` request bodies."""
+
+    def get_route_handler(self) -> Callable:
+        original_route_handler = super().get_route_handler()
+
+        async def route_handler(request: Request) -> Response:
+            if _media_type(request.headers.get("content-type")) in MSGPACK_MEDIA_TYPES:
+                if msgpack is None:
+                    raise HTTPException(status_code=415, detail="MessagePack support is not installed")
+                # FastAPI only parses bodies it sees as JSON; present the
+                # request as JSON and let MsgPackRequest.json() decode it.
+                scope = dict(request.scope)
+                scope["headers"] = [
+                    (k, b"application/json" if k == b"content-type" else v)
+                    for k, v in request.scope["headers"]
+                ]
+                request = MsgPackRequest(scope, request.receive)
+            return await original_route_handler(request)
+
+        return route_handler
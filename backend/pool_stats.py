@@ -0,0 +1,234 @@
+"""
+Connection pool configuration and telemetry.
+
+Pool sizing and the pre-ping strategy are read from the environment so they
+can be tuned per installation without code changes:
+
+- DB_POOL_SIZE: connections kept open in the pool (default 5)
+- DB_MAX_OVERFLOW: extra connections allowed above the pool size (default 10)
+- DB_POOL_TIMEOUT: seconds to wait for a free connection (default 30)
+- DB_POOL_RECYCLE: seconds after which a connection is replaced (default 1800,
+  below MySQL's default wait_timeout)
+- DB_POOL_PRE_PING: "always" pings on every checkout, "idle" only pings
+  connections idle for longer than DB_POOL_PRE_PING_IDLE seconds (default
+  30), "never" disables pinging (default "idle")
+- DB_POOL_WARMUP: connections opened at startup (default 0)
+
+Every engine created with :func:`instrument_engine` records checkouts, wait
+time, timeouts, pings and invalidations; :func:`pool_status` reports them
+together with the live pool state.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+PRE_PING_STRATEGIES = ("always", "idle", "never")
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+POOL_SIZE = _env_int("DB_POOL_SIZE", 5)
+MAX_OVERFLOW = _env_int("DB_MAX_OVERFLOW", 10)
+POOL_TIMEOUT = _env_int("DB_POOL_TIMEOUT", 30)
+POOL_RECYCLE = _env_int("DB_POOL_RECYCLE", 1800)
+PRE_PING = os.getenv("DB_POOL_PRE_PING", "idle").lower()
+PRE_PING_IDLE_SECONDS = _env_int("DB_POOL_PRE_PING_IDLE", 30)
+POOL_WARMUP = _env_int("DB_POOL_WARMUP", 0)
+
+if PRE_PING not in PRE_PING_STRATEGIES:
+    raise ValueError(f"DB_POOL_PRE_PING must be one of {', '.join(PRE_PING_STRATEGIES)}, got {PRE_PING!r}")
+
+
+class PoolStats:
+    """Thread-safe counters for one engine's connection pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.soft_invalidations = 0
+        self.pings = 0
+        self.ping_failures = 0
+        self.timeouts = 0
+        self.wait_count = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def incr(self, name: str, amount: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.wait_count += 1
+            self.wait_time_total += seconds
+            self.wait_time_max = max(self.wait_time_max, seconds)
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "soft_invalidations": self.soft_invalidations,
+                "pings": self.pings,
+                "ping_failures": self.ping_failures,
+                "timeouts": self.timeouts,
+                "wait_ms_avg": (self.wait_time_total / self.wait_count * 1000) if self.wait_count else 0.0,
+                "wait_ms_max": self.wait_time_max * 1000,
+            }
+
+
+class _TimedPoolMixin:
+    """Measures how long each checkout waits for a free connection."""
+
+    stats: PoolStats
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.stats.incr("timeouts")
+            raise
+        finally:
+            self.stats.record_wait(time.perf_counter() - start)
+
+
+def pool_options(is_async: bool = False) -> Dict[str, Any]:
+    """Keyword arguments for create_engine / create_async_engine.
+
+    Returns a fresh stats-recording pool class each call, so every engine
+    gets its own counters (they survive ``engine.dispose()`` because a
+    recreated pool keeps its class).
+    """
+    base = AsyncAdaptedQueuePool if is_async else QueuePool
+    pool_class = type(f"Timed{base.__name__}", (_TimedPoolMixin, base), {"stats": PoolStats()})
+    return {
+        "poolclass": pool_class,
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": PRE_PING == "always",
+    }
+
+
+def _ping(dbapi_connection):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("SELECT 1")
+        cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def instrument_engine(sync_engine) -> None:
+    """Attach telemetry (and the "idle" pre-ping strategy) to an engine's pool.
+
+    For an AsyncEngine pass ``async_engine.sync_engine``.
+    """
+    pool = sync_engine.pool
+    stats = getattr(pool, "stats", None)
+    if stats is None:
+        return
+
+    @event.listens_for(pool, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        stats.incr("connects")
+
+    @event.listens_for(pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        stats.incr("checkouts")
+        if PRE_PING != "idle":
+            return
+        last_checkin = connection_record.info.get("last_checkin")
+        if last_checkin is None or time.monotonic() - last_checkin < PRE_PING_IDLE_SECONDS:
+            return
+        stats.incr("pings")
+        try:
+            _ping(dbapi_connection)
+        except Exception as e:
+            stats.incr("ping_failures")
+            # The pool discards this connection and retries with a new one
+            raise exc.DisconnectionError(f"Idle connection failed pre-ping: {e}")
+
+    @event.listens_for(pool, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        stats.incr("checkins")
+        connection_record.info["last_checkin"] = time.monotonic()
+
+    @event.listens_for(pool, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        stats.incr("invalidations")
+
+    @event.listens_for(pool, "soft_invalidate")
+    def on_soft_invalidate(dbapi_connection, connection_record, exception):
+        stats.incr("soft_invalidations")
+
+
+def pool_status(sync_engine) -> Optional[Dict[str, Any]]:
+    """Live pool state plus recorded counters for an engine (None if not given)."""
+    if sync_engine is None:
+        return None
+    pool = sync_engine.pool
+    status: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            status[name] = method()
+    status["settings"] = {
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pre_ping": PRE_PING,
+        "pre_ping_idle_seconds": PRE_PING_IDLE_SECONDS,
+    }
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        status.update(stats.as_dict())
+    return status
+
+
+def warm_up(sync_engine, count: int = POOL_WARMUP) -> int:
+    """Open ``count`` connections up front so the first requests don't pay for them."""
+    count = min(count, POOL_SIZE + MAX_OVERFLOW)
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(sync_engine.connect())
+    finally:
+        for conn in connections:
+            conn.close()
+    if connections:
+        logger.info("Warmed up %d database connection(s)", len(connections))
+    return len(connections)
+
+
+async def warm_up_async(async_engine, count: int = POOL_WARMUP) -> int:
+    """Async counterpart of :func:`warm_up`."""
+    count = min(count, POOL_SIZE + MAX_OVERFLOW)
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(await async_engine.connect())
+    finally:
+        for conn in connections:
+            await conn.close()
+    if connections:
+        logger.info("Warmed up %d async database connection(s)", len(connections))
+    return len(connections)
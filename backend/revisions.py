@@ -0,0 +1,383 @@
+"""
+Delta-compressed revision storage for the element, channel and attenuator tables.
+
+Successive uploads for one analytical group usually differ in a single
+wavelength or attenuator value, yet each used to be stored as a full JSON
+copy. Rows of those tables are now stored like this:
+
+- the newest revision of every group is always stored in full, so latest /
+  current reads and the child rows never need reconstruction
+- when a revision is superseded it is re-written as a compact JSON diff
+  against the revision before it (kept in ``config_deltas``) and its JSON
+  columns are set to JSON ``null``
+- every REVISION_SNAPSHOT_INTERVAL-th revision of a chain stays a full
+  snapshot (re-basing), which bounds reconstruction to that many diffs;
+  so does any revision whose diff would not be much smaller than itself
+
+Reads call :func:`hydrate`, which rebuilds the JSON of superseded rows from
+the nearest snapshot and caches recent reconstructions. Deleting a revision
+first re-writes the revisions based on it (:func:`detach_dependents`).
+
+Diff format (JSON, applied recursively): ``{"v": value}`` replaces a value,
+``{"d": {key: diff}, "r": [keys]}`` changes/removes dict keys and
+``{"l": length, "i": {index: diff}}`` resizes a list and changes items.
+"""
+import copy
+import json
+import os
+from typing import Any, Dict, Hashable, List, Optional
+
+from sqlalchemy import JSON, and_, delete, event, insert, select
+from sqlalchemy.orm import Session
+
+from cache import TTLCache
+from models import ConfigDelta
+
+# Resource tables stored as deltas. Analytical conditions stay full: their
+# JSON feeds the indexed generated columns.
+DELTA_TABLES = {"element_information", "channel_information", "attenuator_information"}
+
+REVISION_SNAPSHOT_INTERVAL = int(os.getenv("REVISION_SNAPSHOT_INTERVAL", "16"))
+# Keep a revision in full unless its diff is at most this fraction of its size
+REVISION_MAX_DELTA_RATIO = float(os.getenv("REVISION_MAX_DELTA_RATIO", "0.5"))
+
+# Reconstructed revisions, keyed by revision ID. The content of a revision
+# never changes and IDs are not reused (AUTOINCREMENT on SQLite, the
+# persisted auto-increment counter on MySQL 8), so entries cannot go stale;
+# the TTL only bounds how long an unused entry occupies memory. Entries
+# written or dropped by a transaction that changes revision storage are
+# applied when it commits and discarded when it rolls back. The cache is
+# per process: a worker only evicts what it deleted itself, which is safe
+# because the IDs of deleted revisions are never read again.
+revision_cache = TTLCache(maxsize=int(os.getenv("REVISION_CACHE_SIZE", "512")), ttl=3600.0)
+# Revisions read per IN (...) list while walking diff chains
+RECONSTRUCT_BATCH_SIZE = 1000
+
+
+def make_delta(old: Any, new: Any) -> Optional[Dict[str, Any]]:
+    """Return a diff turning ``old`` into ``new``, or None if they are equal."""
+    if old == new:
+        return None
+    if isinstance(old, dict) and isinstance(new, dict):
+        patch: Dict[str, Any] = {}
+        changed = {}
+        for key, value in new.items():
+            sub = make_delta(old[key], value) if key in old else {"v": value}
+            if sub is not None:
+                changed[key] = sub
+        removed = [key for key in old if key not in new]
+        if changed:
+            patch["d"] = changed
+        if removed:
+            patch["r"] = removed
+        return patch
+    if isinstance(old, list) and isinstance(new, list):
+        items = {}
+        for index, value in enumerate(new):
+            sub = make_delta(old[index], value) if index < len(old) else {"v": value}
+            if sub is not None:
+                items[str(index)] = sub
+        return {"l": len(new), "i": items}
+    return {"v": new}
+
+
+def apply_delta(old: Any, patch: Dict[str, Any]) -> Any:
+    """
+    Apply a diff produced by :func:`make_delta` to ``old`` (which is not modified).
+
+    Unchanged parts of ``old`` and values taken from ``patch`` are shared
+    with the result, not copied.
+    """
+    if "v" in patch:
+        return patch["v"]
+    if "l" in patch:
+        result = list(old[:patch["l"]])
+        result.extend([None] * (patch["l"] - len(result)))
+        for index, sub in patch["i"].items():
+            index = int(index)
+            result[index] = apply_delta(old[index] if index < len(old) else None, sub)
+        return result
+    result = {key: value for key, value in old.items() if key not in patch.get("r", ())}
+    for key, sub in patch.get("d", {}).items():
+        result[key] = apply_delta(old.get(key), sub)
+    return result
+
+
+def json_columns(model) -> List[str]:
+    return [c.name for c in model.__table__.columns if isinstance(c.type, JSON)]
+
+
+def _cache_key(resource: str, record_id: int) -> Hashable:
+    return ("revision", resource, record_id)
+
+
+# Session.info key of the cache changes staged by the current transaction
+_STAGED = "revision_cache_staged"
+
+
+def _stage(db: Session) -> Dict[Hashable, Optional[Dict[str, Any]]]:
+    """Cache changes of ``db``'s transaction, applied on commit; starts staging."""
+    return db.info.setdefault(_STAGED, {})
+
+
+def _cache_set(db: Session, key: Hashable, payload: Dict[str, Any]):
+    # Once the transaction changed revision storage its reads may see
+    # uncommitted rows, so they are only cached if it commits
+    if _STAGED in db.info:
+        db.info[_STAGED][key] = payload
+    else:
+        revision_cache.set(key, payload)
+
+
+def _cache_discard(db: Session, key: Hashable):
+    revision_cache.discard(key)
+    # Again after commit, in case a concurrent read cached the old state
+    _stage(db)[key] = None
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_staged(session: Session):
+    for key, payload in session.info.pop(_STAGED, {}).items():
+        if payload is None:
+            revision_cache.discard(key)
+        else:
+            revision_cache.set(key, payload)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _drop_staged(session: Session, transaction):
+    # Still staged when the transaction ends without committing (rollback, close)
+    if transaction.parent is None:
+        session.info.pop(_STAGED, None)
+
+
+def _is_stored_as_delta(record: Dict[str, Any], columns: List[str]) -> bool:
+    return any(name in record and record[name] is None for name in columns)
+
+
+def _reconstruct_many(db: Session, model, record_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Return ``{record_id: {json column: value}}`` for ``record_ids``.
+
+    The chains of all requested revisions are walked together, one level
+    per round of ``IN (...)`` queries, so reading a long history costs a
+    few queries per snapshot interval rather than a few per row.
+    """
+    table, deltas = model.__table__, ConfigDelta.__table__
+    resource, columns = table.name, json_columns(model)
+
+    known: Dict[int, Dict[str, Any]] = {}
+    pending: Dict[int, Any] = {}  # record_id -> (base_id, delta)
+    frontier = set()
+    for record_id in record_ids:
+        cached = revision_cache.get(_cache_key(resource, record_id))
+        if cached is not None:
+            known[record_id] = cached
+        else:
+            frontier.add(record_id)
+
+    # Walk back until every chain reaches a cached or full revision
+    while frontier:
+        ids = sorted(frontier)
+        frontier = set()
+        for start in range(0, len(ids), RECONSTRUCT_BATCH_SIZE):
+            rows = db.execute(
+                select(table.c.id, *(table.c[name] for name in columns), deltas.c.base_id, deltas.c.delta)
+                .outerjoin(deltas, and_(deltas.c.resource == resource, deltas.c.record_id == table.c.id))
+                .where(table.c.id.in_(ids[start:start + RECONSTRUCT_BATCH_SIZE]))
+            ).mappings()
+            for row in rows:
+                if row["delta"] is None:
+                    known[row["id"]] = {name: row[name] for name in columns}
+                    continue
+                pending[row["id"]] = (row["base_id"], row["delta"])
+                base_id = row["base_id"]
+                if base_id in known or base_id in pending:
+                    continue
+                cached = revision_cache.get(_cache_key(resource, base_id))
+                if cached is not None:
+                    known[base_id] = cached
+                else:
+                    frontier.add(base_id)
+        missing = [i for i in ids if i not in known and i not in pending]
+        if missing:
+            raise LookupError(f"Revision {missing[0]} of {resource} not found")
+
+    # Apply the diffs from the base of each chain forward
+    for record_id in pending:
+        chain = []
+        current_id = record_id
+        while current_id not in known:
+            chain.append(current_id)
+            current_id = pending[current_id][0]
+        payload = known[current_id]
+        for revision_id in reversed(chain):
+            delta = pending[revision_id][1]
+            payload = {name: apply_delta(payload[name], delta[name]) if name in delta else payload[name] for name in columns}
+            known[revision_id] = payload
+            _cache_set(db, _cache_key(resource, revision_id), payload)
+    return {record_id: known[record_id] for record_id in record_ids}
+
+
+def reconstruct(db: Session, model, record_id: int) -> Dict[str, Any]:
+    """Return ``{json column: value}`` of a revision, applying diffs from its snapshot."""
+    return copy.deepcopy(_reconstruct_many(db, model, [record_id])[record_id])
+
+
+def hydrate(db: Session, model, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Fill in the JSON columns of records stored as deltas (in place). Returns ``records``.
+
+    Reconstructed revisions share structure with each other and with the
+    revision cache, so each record gets its own copy of the values.
+    """
+    if model.__tablename__ not in DELTA_TABLES:
+        return records
+    columns = json_columns(model)
+    targets = [record for record in records if _is_stored_as_delta(record, columns)]
+    if targets:
+        payloads = _reconstruct_many(db, model, [record["id"] for record in targets])
+        for record in targets:
+            payload = payloads[record["id"]]
+            record.update({name: copy.deepcopy(payload[name]) for name in columns if name in record})
+    return records
+
+
+def _previous_revision(db: Session, model, group: str, record_id: int) -> Optional[int]:
+    """ID of the group's revision just before ``record_id`` (served by the group index)."""
+    table = model.__table__
+    return db.execute(
+        select(table.c.id)
+        .where(table.c.analytical_group == group, table.c.id < record_id)
+        .order_by(table.c.id.desc())
+        .limit(1)
+    ).scalar()
+
+
+def compact_superseded(db: Session, model, created: List[Dict[str, Any]]):
+    """
+    Store the revisions superseded by ``created`` as diffs. The caller commits.
+
+    ``created`` holds the freshly inserted records (id, analytical_group and
+    the JSON columns). Per group, the revision that was newest before the
+    insert and all but the last new revision are superseded; each is
+    diffed against the revision before it.
+    """
+    if model.__tablename__ not in DELTA_TABLES or not created:
+        return
+
+    by_group: Dict[str, List[Dict[str, Any]]] = {}
+    for record in created:
+        by_group.setdefault(record["analytical_group"], []).append(record)
+
+    for group, new_records in by_group.items():
+        chain = sorted(new_records, key=lambda r: r["id"])
+        previous_id = _previous_revision(db, model, group, chain[0]["id"])
+        if previous_id is not None:
+            chain.insert(0, {"id": previous_id, **reconstruct(db, model, previous_id)})
+        for index, record in enumerate(chain[:-1]):
+            base_id = chain[index - 1]["id"] if index else _previous_revision(db, model, group, record["id"])
+            _store_as_delta(db, model, record, base_id)
+
+
+def _store_as_delta(db: Session, model, record: Dict[str, Any], base_id: Optional[int]):
+    """Re-write one full revision as a diff against ``base_id`` if that pays off."""
+    table, deltas = model.__table__, ConfigDelta.__table__
+    resource, columns = table.name, json_columns(model)
+    if base_id is None:
+        return
+    already = db.execute(
+        select(deltas.c.record_id).where(deltas.c.resource == resource, deltas.c.record_id == record["id"])
+    ).first()
+    if already:
+        return
+    base_depth = db.execute(
+        select(deltas.c.depth).where(deltas.c.resource == resource, deltas.c.record_id == base_id)
+    ).scalar() or 0
+    if base_depth + 1 >= REVISION_SNAPSHOT_INTERVAL:
+        return  # re-base: this revision stays a full snapshot
+
+    base = reconstruct(db, model, base_id)
+    delta = {}
+    for name in columns:
+        sub = make_delta(base[name], record[name])
+        if sub is not None:
+            delta[name] = sub
+    full_size = len(json.dumps({name: record[name] for name in columns}))
+    if len(json.dumps(delta)) > full_size * REVISION_MAX_DELTA_RATIO:
+        return
+
+    _stage(db)
+    db.execute(insert(deltas).values(
+        resource=resource, record_id=record["id"], base_id=base_id, depth=base_depth + 1, delta=delta
+    ))
+    db.execute(
+        table.update()
+        .where(table.c.id == record["id"])
+        # Keep updated_at: re-encoding storage is not a change to the record
+        .values(**{name: JSON.NULL for name in columns}, updated_at=table.c.updated_at)
+    )
+    _cache_set(db, _cache_key(resource, record["id"]), copy.deepcopy({name: record[name] for name in columns}))
+
+
+def _store_in_full(db: Session, model, record_id: int) -> Dict[str, Any]:
+    """Re-write a revision stored as a diff in full. Returns its JSON columns."""
+    table, deltas = model.__table__, ConfigDelta.__table__
+    _stage(db)
+    payload = reconstruct(db, model, record_id)
+    db.execute(delete(deltas).where(deltas.c.resource == table.name, deltas.c.record_id == record_id))
+    db.execute(
+        table.update()
+        .where(table.c.id == record_id)
+        .values(**payload, updated_at=table.c.updated_at)
+    )
+    return payload
+
+
+def detach_dependents(db: Session, model, record_id: int):
+    """
+    Prepare revision ``record_id`` for deletion. The caller commits.
+
+    Revisions diffed against it are re-based onto its own base (or stored in
+    full if it has none), and its own diff entry is removed.
+    """
+    if model.__tablename__ not in DELTA_TABLES:
+        return
+    resource, deltas = model.__tablename__, ConfigDelta.__table__
+    own = db.execute(
+        select(deltas.c.base_id, deltas.c.depth).where(deltas.c.resource == resource, deltas.c.record_id == record_id)
+    ).first()
+    dependents = db.execute(
+        select(deltas.c.record_id).where(deltas.c.resource == resource, deltas.c.base_id == record_id)
+    ).scalars().all()
+    for dependent_id in dependents:
+        payload = _store_in_full(db, model, dependent_id)
+        if own is not None:
+            # Diff against the deleted revision's base instead; depth is unchanged or smaller
+            _store_as_delta(db, model, {"id": dependent_id, **payload}, own.base_id)
+    db.execute(delete(deltas).where(deltas.c.resource == resource, deltas.c.record_id == record_id))
+    _cache_discard(db, _cache_key(resource, record_id))
+
+
+def release_revisions(db: Session, model, record_ids: List[int]):
+    """
+    Prepare several revisions of one table for removal at once. The caller commits.
+
+    Revisions outside ``record_ids`` that are diffed against one of them are
+    stored in full again, and the diff entries of ``record_ids`` are removed.
+    """
+    if model.__tablename__ not in DELTA_TABLES or not record_ids:
+        return
+    resource, deltas = model.__tablename__, ConfigDelta.__table__
+    dependents = db.execute(
+        select(deltas.c.record_id).where(
+            deltas.c.resource == resource,
+            deltas.c.base_id.in_(record_ids),
+            deltas.c.record_id.not_in(record_ids),
+        )
+    ).scalars().all()
+    for dependent_id in dependents:
+        _store_in_full(db, model, dependent_id)
+    db.execute(delete(deltas).where(deltas.c.resource == resource, deltas.c.record_id.in_(record_ids)))
+    for record_id in record_ids:
+        _cache_discard(db, _cache_key(resource, record_id))
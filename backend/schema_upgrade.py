@@ -0,0 +1,70 @@
+"""
+In-place schema upgrade for existing databases.
+
+``Base.metadata.create_all`` only creates missing tables, so columns and
+indexes added to models.py later never reach a database created by an
+earlier version. :func:`upgrade_schema` compares the models with the live
+schema and adds what is missing. New columns must be nullable, have a
+server default or be generated. Nothing is altered, and the only thing
+dropped is an index listed in RETIRED_INDEXES once its replacement exists.
+"""
+import logging
+from typing import Dict, List
+
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateColumn
+
+from database import Base
+
+logger = logging.getLogger(__name__)
+
+# Indexes superseded by composite indexes in models.py, per table
+RETIRED_INDEXES: Dict[str, List[str]] = {
+    "analytical_conditions": [
+        "ix_analytical_conditions_analytical_group",
+        "idx_group_method",
+        "idx_ac_source_seq1",
+        "idx_ac_monitor_element",
+    ],
+    "element_information": ["ix_element_information_analytical_group", "idx_elem_group"],
+    "channel_information": ["ix_channel_information_analytical_group", "idx_chan_group"],
+    "attenuator_information": ["ix_attenuator_information_analytical_group", "idx_att_group"],
+}
+
+
+def upgrade_schema(connection, metadata=Base.metadata) -> List[str]:
+    """Add missing columns and indexes to existing tables and drop retired indexes.
+
+    Returns the DDL that was run.
+    """
+    inspector = inspect(connection)
+    preparer = connection.dialect.identifier_preparer
+    applied = []
+    for table in metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            column_ddl = CreateColumn(column).compile(dialect=connection.dialect)
+            ddl = f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {column_ddl}"
+            connection.exec_driver_sql(ddl)
+            applied.append(ddl)
+        existing_indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing_indexes:
+                continue
+            index.create(connection)
+            applied.append(f"CREATE INDEX {index.name} ON {table.name}")
+        for name in RETIRED_INDEXES.get(table.name, ()):
+            if name not in existing_indexes:
+                continue
+            ddl = f"DROP INDEX {preparer.quote(name)}"
+            if connection.dialect.name in ("mysql", "mariadb"):
+                ddl += f" ON {preparer.format_table(table)}"
+            connection.exec_driver_sql(ddl)
+            applied.append(ddl)
+    for ddl in applied:
+        logger.info("Schema upgrade: %s", ddl)
+    return applied
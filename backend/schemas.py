@@ -1,4 +1,4 @@
-from typing import List, Literal
+from typing import Any, Dict, List, Literal, Optional
 from pydantic import BaseModel, Field, constr, field_validator
 from datetime import datetime
 
@@ -118,6 +118,16 @@ class AnalyticalConditionBulkResponse(BaseModel):
     message: str
     count: int
     records: List[AnalyticalConditionResponse]
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, if any")
+
+
+class AnalyticalConditionBatchResponse(BaseModel):
+    """Schema for reading analytical conditions by ID"""
+    success: bool
+    message: str
+    count: int
+    records: List[AnalyticalConditionResponse]
+    missing_ids: List[int] = Field(default_factory=list, description="Requested IDs that do not exist")
 
 
 # ============================================================================
@@ -168,6 +178,16 @@ class ElementInformationBulkResponse(BaseModel):
     message: str
     count: int
     records: List[ElementInformationResponse]
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, if any")
+
+
+class ElementInformationBatchResponse(BaseModel):
+    """Schema for reading element information records by ID"""
+    success: bool
+    message: str
+    count: int
+    records: List[ElementInformationResponse]
+    missing_ids: List[int] = Field(default_factory=list, description="Requested IDs that do not exist")
 
 
 # ============================================================================
@@ -217,6 +237,16 @@ class ChannelInformationBulkResponse(BaseModel):
     message: str
     count: int
     records: List[ChannelInformationResponse]
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, if any")
+
+
+class ChannelInformationBatchResponse(BaseModel):
+    """Schema for reading channel information records by ID"""
+    success: bool
+    message: str
+    count: int
+    records: List[ChannelInformationResponse]
+    missing_ids: List[int] = Field(default_factory=list, description="Requested IDs that do not exist")
 
 
 # ============================================================================
@@ -264,3 +294,145 @@ class AttenuatorInformationBulkResponse(BaseModel):
     message: str
     count: int
     records: List[AttenuatorInformationResponse]
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, if any")
+
+
+class AttenuatorInformationBatchResponse(BaseModel):
+    """Schema for reading attenuator information records by ID"""
+    success: bool
+    message: str
+    count: int
+    records: List[AttenuatorInformationResponse]
+    missing_ids: List[int] = Field(default_factory=list, description="Requested IDs that do not exist")
+
+
+# ============================================================================
+# Shared Schemas
+# ============================================================================
+
+class BulkCreateMinimalResponse(BaseModel):
+    """Schema for bulk create response when called with ``return=minimal``"""
+    success: bool
+    message: str
+    count: int
+    ids: List[int] = Field(..., description="IDs of the created records, in request order")
+
+
+class IdListRequest(BaseModel):
+    """Schema for reading records by ID with a POST body (for ID lists too long for a URL)"""
+    ids: List[int] = Field(..., description="Record IDs, in the order the records should be returned")
+
+
+class ImportLineError(BaseModel):
+    """A line (or whole chunk, when ``line`` is null) that could not be imported"""
+    line: Optional[int] = Field(None, description="1-based line number in the NDJSON body")
+    error: str
+
+
+class ImportChunkResult(BaseModel):
+    """Progress report for one committed (or rolled back) import chunk"""
+    chunk: int = Field(..., description="1-based chunk number")
+    first_line: int
+    last_line: int
+    inserted: int
+    ids: List[int] = Field(default_factory=list, description="IDs created by this chunk")
+    errors: List[ImportLineError] = Field(default_factory=list)
+
+
+class ImportResponse(BaseModel):
+    """Schema for streaming NDJSON import response"""
+    success: bool
+    message: str
+    lines: int = Field(..., description="Non-blank NDJSON lines read")
+    inserted: int
+    failed: int
+    chunks: List[ImportChunkResult]
+
+
+class ProjectedBulkResponse(BaseModel):
+    """Schema for bulk read response with ``view=summary`` or ``fields=``"""
+    success: bool
+    message: str
+    count: int
+    records: List[Dict[str, Any]] = Field(..., description="Records holding only the requested columns")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, if any")
+
+
+# ============================================================================
+# Search Schemas
+# ============================================================================
+
+class ElementEntryMatch(BaseModel):
+    """An element entry found by the element information search"""
+    record_id: int
+    analytical_group: str
+    position: int = Field(..., description="Index in the record's elements array")
+    ele_name: str
+    chemic_ele: str
+    element: str
+    asterisk: str
+    analytical_range_min: Optional[float] = None
+    analytical_range_max: Optional[float] = None
+
+
+class ChannelEntryMatch(BaseModel):
+    """A channel entry found by the channel information search"""
+    record_id: int
+    analytical_group: str
+    position: int = Field(..., description="Index in the record's channels array")
+    ele_name: str
+    wavelength: Optional[float] = Field(None, description="Wavelength in nm, parsed from w_lengh")
+    seq: Optional[int] = None
+    w_no: str
+    interval_element: str
+    interval_value: Optional[float] = None
+
+
+class AttenuatorEntryMatch(BaseModel):
+    """An attenuator table row found by the attenuator information search"""
+    record_id: int
+    analytical_group: str
+    side: Literal["left", "right"]
+    position: int = Field(..., description="Index in the record's left_table or right_table")
+    element: str
+    ele_value: Optional[float] = None
+    att_value: Optional[int] = None
+
+
+class ElementSearchResponse(BaseModel):
+    """Schema for element information search response"""
+    success: bool
+    message: str
+    count: int
+    matches: List[ElementEntryMatch]
+
+
+class ChannelSearchResponse(BaseModel):
+    """Schema for channel information search response"""
+    success: bool
+    message: str
+    count: int
+    matches: List[ChannelEntryMatch]
+
+
+class AttenuatorSearchResponse(BaseModel):
+    """Schema for attenuator information search response"""
+    success: bool
+    message: str
+    count: int
+    matches: List[AttenuatorEntryMatch]
+
+
+# ============================================================================
+# Group Snapshot Schemas
+# ============================================================================
+
+class GroupSnapshotResponse(BaseModel):
+    """Schema for the current configuration of every resource of one analytical group"""
+    success: bool
+    message: str
+    analytical_group: str
+    analytical_condition: Optional[AnalyticalConditionResponse] = None
+    element_information: Optional[ElementInformationResponse] = None
+    channel_information: Optional[ChannelInformationResponse] = None
+    attenuator_information: Optional[AttenuatorInformationResponse] = None
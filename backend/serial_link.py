@@ -0,0 +1,401 @@
+"""
+Long-lived serial connection and command queue for the acquisition hardware.
+
+Opening the port resets the Arduino, so opening it per command (and
+waiting out the reset) made every hardware command take more than two
+seconds. :class:`SerialLink` owns the port in a background I/O thread
+instead: the port is opened once (main.py starts the link at startup) and
+reopened automatically, every SERIAL_RECONNECT_SECONDS, after it fails or
+could not be opened.
+
+Commands are submitted as jobs (one or more frames) with
+:meth:`SerialLink.submit`, which returns immediately; callers poll the job
+by ID or wait on ``job.future``. Jobs are taken from a priority queue
+(lower number first, FIFO within a priority) and a job's frames are always
+sent back to back. With SERIAL_ACKS on, the device answers every frame
+with ACK (0x06) or NAK (0x15): up to SERIAL_ACK_WINDOW frames, across
+consecutive jobs, are written before waiting for replies, which are
+matched to frames in the order they were sent. A NAK, or no reply within
+SERIAL_ACK_TIMEOUT, fails the job. With SERIAL_ACKS off (firmware that
+doesn't acknowledge) a job is done once its frames are written.
+
+SERIAL_PORT (a device name, a pyserial URL such as ``loop://``, or
+``virtual://`` for the emulated board in virtual_device.py; empty, the
+default, disables the link), SERIAL_BAUD_RATE and SERIAL_RESET_DELAY (seconds to wait after
+opening) configure the port.
+"""
+import itertools
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import serial
+
+SERIAL_PORT = os.getenv("SERIAL_PORT", "")
+SERIAL_BAUD_RATE = int(os.getenv("SERIAL_BAUD_RATE", "115200"))
+SERIAL_RESET_DELAY = float(os.getenv("SERIAL_RESET_DELAY", "2"))
+SERIAL_RECONNECT_SECONDS = float(os.getenv("SERIAL_RECONNECT_SECONDS", "5"))
+# Seconds a request waits for its job when it asks to wait
+SERIAL_WRITE_TIMEOUT = float(os.getenv("SERIAL_WRITE_TIMEOUT", "5"))
+SERIAL_ACKS = os.getenv("SERIAL_ACKS", "0").lower() in ("1", "true", "yes")
+SERIAL_ACK_WINDOW = int(os.getenv("SERIAL_ACK_WINDOW", "8"))
+SERIAL_ACK_TIMEOUT = float(os.getenv("SERIAL_ACK_TIMEOUT", "1"))
+# Finished jobs kept for status lookups and the latency metrics
+SERIAL_JOB_HISTORY = 1000
+# Bytes of consecutive jobs coalesced into one write
+SERIAL_WRITE_CHUNK = 4096
+
+ACK = 0x06
+NAK = 0x15
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 9
+
+
+def open_transport(port: str, baud_rate: int, timeout: float = 0.05):
+    """
+    Open ``port`` and return a pyserial-like port object.
+
+    ``virtual://`` URLs open the shared in-memory device from
+    virtual_device.py; anything else goes to ``serial.serial_for_url``.
+    """
+    if port.startswith("virtual://"):
+        from virtual_device import device_for_url
+
+        return device_for_url(port, baud_rate).open(timeout)
+    return serial.serial_for_url(port, baud_rate, timeout=timeout)
+
+
+class SerialLinkError(Exception):
+    """The job failed (link stopped, port not open, I/O error, NAK or no reply)."""
+
+
+class Job:
+    """Frames submitted together; sent back to back and finished together."""
+
+    def __init__(self, job_id: int, frames: List[bytes], priority: int):
+        self.id = job_id
+        self.frames = frames
+        self.priority = priority
+        self.state = "queued"
+        self.error: Optional[str] = None
+        self.frames_sent = 0
+        self.frames_acked = 0
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        # Resolves to the number of bytes sent, or raises SerialLinkError
+        self.future: Future = Future()
+
+    @property
+    def finished(self) -> bool:
+        return self.state in ("done", "failed")
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "state": self.state,
+            "priority": self.priority,
+            "frames": len(self.frames),
+            "frames_sent": self.frames_sent,
+            "frames_acked": self.frames_acked,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+def _percentile_ms(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] * 1000
+
+
+class SerialLink:
+    """
+    A serial port owned by a background thread, fed from a job queue.
+
+    ``opener(port, baud_rate)`` returns the open port object (by default
+    :func:`open_transport`); it needs
+    ``write``, ``flush``, ``read`` (returning after its timeout),
+    ``in_waiting``, ``reset_input_buffer`` and ``close``.
+    """
+
+    def __init__(
+        self,
+        port: str = SERIAL_PORT,
+        baud_rate: int = SERIAL_BAUD_RATE,
+        reset_delay: float = SERIAL_RESET_DELAY,
+        reconnect_seconds: float = SERIAL_RECONNECT_SECONDS,
+        acks: bool = SERIAL_ACKS,
+        ack_window: int = SERIAL_ACK_WINDOW,
+        ack_timeout: float = SERIAL_ACK_TIMEOUT,
+        opener: Optional[Callable[[str, int], Any]] = None,
+    ):
+        self.port = port
+        self.baud_rate = baud_rate
+        self.reset_delay = reset_delay
+        self.reconnect_seconds = reconnect_seconds
+        self.acks = acks
+        self.ack_window = max(1, ack_window)
+        self.ack_timeout = ack_timeout
+        self._opener = opener or open_transport
+        self._queue: "queue.PriorityQueue" = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[int, Job]" = OrderedDict()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._serial = None
+        # One entry per frame written and awaiting its reply, oldest first
+        self._inflight: Deque[Job] = deque()
+        self._reply_deadline = 0.0
+        # (queue wait, total latency) in seconds of the last finished jobs
+        self._latencies: Deque[Tuple[float, float]] = deque(maxlen=SERIAL_JOB_HISTORY)
+        self.last_error: Optional[str] = None
+        self.connects = 0
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.jobs_done = 0
+        self.jobs_failed = 0
+        self.naks = 0
+        self.ack_timeouts = 0
+
+    @property
+    def connected(self) -> bool:
+        return self._serial is not None
+
+    def start(self):
+        """Start the I/O thread (it opens the port)."""
+        if self._thread is not None or not self.port:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="serial-link", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the I/O thread and close the port; unfinished jobs fail."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._queue.put((-1, -1, None))
+        self._thread.join(timeout)
+        self._thread = None
+        self._fail_pending("serial link stopped")
+
+    def submit(self, frames: List[bytes], priority: int = PRIORITY_NORMAL) -> Job:
+        """Queue a job sending ``frames`` and return it without waiting."""
+        if not frames:
+            raise ValueError("a job needs at least one frame")
+        with self._lock:
+            job = Job(next(self._ids), [bytes(frame) for frame in frames], priority)
+            self._jobs[job.id] = job
+            # Forget the oldest finished jobs
+            while len(self._jobs) > SERIAL_JOB_HISTORY and next(iter(self._jobs.values())).finished:
+                self._jobs.popitem(last=False)
+        if self._thread is None:
+            self._finish(job, "serial link is not running" if self.port else "serial link is disabled")
+        elif self._serial is None and self.last_error:
+            # Opening failed last time; fail now rather than wait for the next attempt
+            self._finish(job, f"serial port {self.port} is not open: {self.last_error}")
+        else:
+            self._queue.put((priority, next(self._order), job))
+        return job
+
+    def get_job(self, job_id: int) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self) -> Dict[str, Any]:
+        """Link state, counters, queue depth and job latency percentiles (over the last finished jobs)."""
+        with self._lock:
+            latencies = list(self._latencies)
+        waits = [wait for wait, _ in latencies]
+        totals = [total for _, total in latencies]
+        return {
+            "port": self.port,
+            "baud_rate": self.baud_rate,
+            "running": self._thread is not None,
+            "connected": self.connected,
+            "acks": self.acks,
+            "connects": self.connects,
+            "last_error": self.last_error,
+            "queue_depth": self._queue.qsize(),
+            "frames_in_flight": len(self._inflight),
+            "frames_sent": self.frames_sent,
+            "bytes_sent": self.bytes_sent,
+            "jobs_done": self.jobs_done,
+            "jobs_failed": self.jobs_failed,
+            "naks": self.naks,
+            "ack_timeouts": self.ack_timeouts,
+            "queue_wait_ms_p50": _percentile_ms(waits, 50),
+            "queue_wait_ms_p95": _percentile_ms(waits, 95),
+            "latency_ms_p50": _percentile_ms(totals, 50),
+            "latency_ms_p95": _percentile_ms(totals, 95),
+        }
+
+    def _finish(self, job: Job, error: Optional[str] = None):
+        with self._lock:
+            if job.finished:
+                return
+            job.finished_at = time.time()
+            job.state = "failed" if error else "done"
+            job.error = error
+            if error:
+                self.jobs_failed += 1
+            else:
+                self.jobs_done += 1
+            if job.started_at is not None:
+                self._latencies.append((job.started_at - job.submitted_at, job.finished_at - job.submitted_at))
+        if error:
+            job.future.set_exception(SerialLinkError(error))
+        else:
+            job.future.set_result(sum(len(frame) for frame in job.frames))
+
+    def _fail_pending(self, message: str):
+        """Fail every queued job (used while the port cannot be opened)."""
+        while True:
+            try:
+                _, _, job = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if job is not None:
+                self._finish(job, message)
+
+    def _fail_inflight(self, message: str):
+        while self._inflight:
+            self._finish(self._inflight.popleft(), message)
+
+    def _open(self):
+        self._serial = self._opener(self.port, self.baud_rate)
+        # Opening the port resets the board; give it time to boot
+        self._stop.wait(self.reset_delay)
+        self._serial.reset_input_buffer()
+        self.connects += 1
+        self.last_error = None
+        logging.info(f"Serial link connected to {self.port} at {self.baud_rate} baud")
+
+    def _close(self):
+        if self._serial is not None:
+            try:
+                self._serial.close()
+            except Exception:
+                pass
+            self._serial = None
+
+    def _next_job(self, block: bool) -> Optional[Job]:
+        """Take the next queued job (waiting briefly if ``block``); None if there is none or on stop."""
+        try:
+            _, _, job = self._queue.get(timeout=0.5) if block else self._queue.get_nowait()
+        except queue.Empty:
+            return None
+        if job is not None:
+            job.state = "sending"
+            job.started_at = time.time()
+        return job
+
+    def _write(self, job: Job) -> Optional[Job]:
+        """
+        Write the frames of ``job`` and of the jobs queued after it in one write.
+
+        With acknowledgements only as many frames as fit in the ACK window
+        are written. Returns the job with frames still to write, or None.
+        """
+        buffer = bytearray()
+        frames = 0
+        written: List[Job] = []
+        while job is not None and len(buffer) < SERIAL_WRITE_CHUNK:
+            while job.frames_sent < len(job.frames) and (not self.acks or len(self._inflight) < self.ack_window):
+                buffer += job.frames[job.frames_sent]
+                job.frames_sent += 1
+                frames += 1
+                if self.acks:
+                    if not self._inflight:
+                        self._reply_deadline = time.monotonic() + self.ack_timeout
+                    self._inflight.append(job)
+            if job.frames_sent < len(job.frames):
+                break
+            written.append(job)
+            job = self._next_job(block=False)
+        if buffer:
+            try:
+                self._serial.write(buffer)
+                self._serial.flush()
+            except Exception as e:
+                for failed in written + ([job] if job is not None else []):
+                    self._finish(failed, f"I/O on {self.port} failed: {e}")
+                raise
+            self.frames_sent += frames
+            self.bytes_sent += len(buffer)
+        if not self.acks:
+            for done in written:
+                self._finish(done)
+        return job
+
+    def _read_replies(self):
+        """Match ACK/NAK replies to the frames in flight, oldest first."""
+        # Take what has arrived (at least one byte, waiting up to the port timeout)
+        data = self._serial.read(max(1, min(self._serial.in_waiting, len(self._inflight))))
+        for byte in data:
+            if byte not in (ACK, NAK) or not self._inflight:
+                continue  # debug output from the firmware
+            job = self._inflight.popleft()
+            self._reply_deadline = time.monotonic() + self.ack_timeout
+            if byte == NAK:
+                self.naks += 1
+                self._finish(job, f"device rejected frame {job.frames_acked + 1} of {len(job.frames)} (NAK)")
+                continue
+            job.frames_acked += 1
+            if job.frames_acked == len(job.frames):
+                self._finish(job)
+        if self._inflight and time.monotonic() > self._reply_deadline:
+            self.ack_timeouts += 1
+            self._fail_inflight(f"no reply from the device within {self.ack_timeout}s")
+            self._serial.reset_input_buffer()
+
+    def _run(self):
+        job: Optional[Job] = None
+        while not self._stop.is_set():
+            if self._serial is None:
+                try:
+                    self._open()
+                except Exception as e:
+                    if self.last_error != str(e):
+                        logging.error(f"Serial link cannot open {self.port}: {e}")
+                    self.last_error = str(e)
+                    self._close()
+                    # Don't keep callers waiting for a port that isn't there
+                    self._fail_pending(f"serial port {self.port} is not open: {e}")
+                    self._stop.wait(self.reconnect_seconds)
+                    continue
+            if job is None:
+                job = self._next_job(block=not self._inflight)
+            try:
+                if job is not None:
+                    job = self._write(job)
+                if self._inflight:
+                    self._read_replies()
+            except Exception as e:
+                logging.error(f"Serial link I/O on {self.port} failed, reconnecting: {e}")
+                self.last_error = str(e)
+                self._close()
+                self._fail_inflight(f"I/O on {self.port} failed: {e}")
+                if job is not None:
+                    self._finish(job, f"I/O on {self.port} failed: {e}")
+                    job = None
+        if job is not None:
+            self._finish(job, "serial link stopped")
+        self._fail_inflight("serial link stopped")
+        self._close()
+
+
+serial_link = SerialLink()
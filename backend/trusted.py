@@ -0,0 +1,128 @@
+"""
+Trusted serialization of configuration rows read from the database.
+
+Every row was validated against its ``*Create`` schema when it was
+written, so running the response schemas' ``constr(pattern=...)`` and
+``Literal`` checks again on every read only costs time; for groups with a
+long history of 40-element configurations it dominated response time.
+The bulk and by-ID list endpoints and the NDJSON streams therefore
+serialize the row dicts directly, with every object (the nested ones in
+the JSON columns included) rebuilt in the response schema's field order.
+The stored values were produced by ``model_dump`` of the same schemas,
+but MySQL's JSON type keeps object keys in its own order, so they are not
+written as stored.
+The result is byte-identical to the Pydantic response (``bench.py
+serialize`` checks this against each backend and measures the speedup).
+
+TRUSTED_READS=0 switches back to validating every row, e.g. after editing
+rows by hand. MessagePack responses always go through Pydantic.
+"""
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Type, Union, get_args, get_origin
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+from json_codec import dumps_bytes
+from negotiation import negotiated, wants_msgpack
+
+TRUSTED_READS = os.getenv("TRUSTED_READS", "1").lower() in ("1", "true", "yes")
+
+
+def _field_defaults(schema: Type[BaseModel]) -> Dict[str, Any]:
+    return {
+        name: field.get_default(call_default_factory=True)
+        for name, field in schema.model_fields.items()
+        if not field.is_required()
+    }
+
+
+def _nested_model(annotation: Any) -> Tuple[Optional[Type[BaseModel]], bool]:
+    """The model in a field annotation (``Model``, ``List[Model]``, optionally ``Optional``) and whether it is a list."""
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        annotation = args[0] if len(args) == 1 else annotation
+    many = get_origin(annotation) in (list, List)
+    if many:
+        annotation = get_args(annotation)[0] if get_args(annotation) else None
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, many
+    return None, False
+
+
+@lru_cache(maxsize=None)
+def _layout(schema: Type[BaseModel]) -> Tuple[Tuple[str, Any, bool], ...]:
+    """``(field, layout of the nested model or None, is a list)`` for every field of ``schema``."""
+    layout = []
+    for name, field in schema.model_fields.items():
+        model, many = _nested_model(field.annotation)
+        layout.append((name, _layout(model) if model is not None else None, many))
+    return tuple(layout)
+
+
+def _ordered(record: Dict[str, Any], layout: Tuple[Tuple[str, Any, bool], ...]) -> Dict[str, Any]:
+    """``record`` with its keys, and those of its nested objects, in schema order."""
+    ordered = {}
+    for name, nested, many in layout:
+        value = record[name]
+        if nested is not None and value is not None:
+            value = [_ordered(item, nested) for item in value] if many else _ordered(value, nested)
+        ordered[name] = value
+    return ordered
+
+
+def trusted_content(
+    schema: Type[BaseModel],
+    record_schema: Type[BaseModel],
+    records: List[Dict[str, Any]],
+    **fields: Any,
+) -> Dict[str, Any]:
+    """
+    Build the JSON-ready content of a ``schema`` response holding ``records``.
+
+    ``records`` are row dicts (extra columns such as the generated ones are
+    dropped) and ``fields`` the other fields of ``schema``; fields left out
+    take their schema default.
+    """
+    layout = _layout(record_schema)
+    values = {**_field_defaults(schema), **fields}
+    values["records"] = [_ordered(record, layout) for record in records]
+    return {name: values[name] for name in schema.model_fields}
+
+
+def dump_record(record_schema: Type[BaseModel], record: Dict[str, Any]) -> bytes:
+    """JSON of one ``record_schema`` record (validated when TRUSTED_READS is off)."""
+    if not TRUSTED_READS:
+        return record_schema.model_validate(record).model_dump_json().encode()
+    return dumps_bytes(_ordered(record, _layout(record_schema)))
+
+
+def trusted_response(
+    request: Request,
+    response: Response,
+    schema: Type[BaseModel],
+    record_schema: Type[BaseModel],
+    records: List[Dict[str, Any]],
+    **fields: Any,
+) -> Any:
+    """
+    Return a ``schema`` response holding ``records`` without re-validating them.
+
+    Headers set on the injected ``response`` (e.g. ETag) are copied over.
+    Falls back to building and validating the Pydantic model when
+    TRUSTED_READS is off or the client asked for MessagePack.
+    """
+    if not TRUSTED_READS or wants_msgpack(request):
+        return negotiated(request, response, schema(
+            records=[record_schema.model_validate(r) for r in records],
+            **fields
+        ))
+    response.headers["Vary"] = "Accept"
+    headers = {k: v for k, v in response.headers.items() if k.lower() not in ("content-length", "content-type")}
+    return Response(
+        dumps_bytes(trusted_content(schema, record_schema, records, **fields)),
+        status_code=response.status_code or 200,
+        media_type="application/json",
+        headers=headers,
+    )
@@ -0,0 +1,258 @@
+"""
+Virtual acquisition board for testing the serial paths without hardware.
+
+:class:`VirtualDevice` emulates the firmware side of the 0xFF-header frame
+protocol: a 0xFF sync byte followed by ``payload_length`` bytes (2 for
+the ``/api/test-hardware`` frames), or with ``decoder_factory`` another
+framing such as the crc framing of connection/framing.py (NAK on a CRC error).
+It records every byte and every complete frame it receives, takes
+``latency`` seconds to process each frame, optionally answers with ACK /
+NAK (see serial_link.py), drops bytes that arrive within ``reset_delay``
+of the port being opened (like the Arduino bootloader after the reset
+that opening the port triggers), and paces input at ``baud_rate``
+(10 bits per byte).
+
+Two ways to connect to it:
+
+- :meth:`VirtualDevice.open` returns an in-memory port object with the
+  pyserial methods :class:`serial_link.SerialLink` uses. SERIAL_PORT
+  ``virtual://`` makes the serial link use a shared in-memory device;
+  query parameters configure it, e.g.
+  ``virtual://?latency=0.002&reset_delay=2&acks=1``.
+- :meth:`VirtualDevice.start_pty` (Linux/macOS) creates a pseudo terminal
+  and returns its path, which any pyserial code (connect.py included)
+  can open like a real port. The reset is emulated once, when the pty is
+  created.
+"""
+import os
+import select
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+SYNC_BYTE = 0xFF
+ACK = 0x06
+NAK = 0x15
+
+
+class SyncDecoder:
+    """Parser for the plain protocol: a 0xFF sync byte and ``payload_length`` bytes."""
+
+    def __init__(self, payload_length: int = 2):
+        self.payload_length = payload_length
+        self._frame = bytearray()
+
+    def feed(self, data: bytes) -> List[Tuple[bytes, bool]]:
+        """Consume ``data``; return ``(frame, ok)`` for every frame completed by it."""
+        frames = []
+        for byte in data:
+            if not self._frame and byte != SYNC_BYTE:
+                continue  # out of sync; wait for the next header
+            self._frame.append(byte)
+            if len(self._frame) == 1 + self.payload_length:
+                frames.append((bytes(self._frame), True))
+                self._frame.clear()
+        return frames
+
+
+class VirtualDevice:
+    """Emulated firmware that records what it receives (see the module docstring)."""
+
+    def __init__(
+        self,
+        baud_rate: int = 115200,
+        latency: float = 0.0,
+        reset_delay: float = 0.0,
+        acks: bool = False,
+        payload_length: int = 2,
+        reject: Optional[Callable[[bytes], bool]] = None,
+        decoder_factory: Optional[Callable[[], Any]] = None,
+    ):
+        self.baud_rate = baud_rate
+        self.latency = latency
+        self.reset_delay = reset_delay
+        self.acks = acks
+        self.payload_length = payload_length
+        # Frames for which reject(frame) is true are answered with NAK
+        self.reject = reject
+        # Builds the frame parser (reset with the board); anything with
+        # feed(data) -> [(frame, ok)], e.g. connection/framing.FrameDecoder
+        self._decoder_factory = decoder_factory or (lambda: SyncDecoder(payload_length))
+        self._decoder = self._decoder_factory()
+        self.received = bytearray()
+        self.frames: List[bytes] = []
+        self.bad_frames = 0
+        self.dropped = 0
+        self._booted_at = 0.0
+        self._busy_until = 0.0
+        self._replies: Deque[Tuple[float, int]] = deque()
+        self._cond = threading.Condition()
+        self._pty: Optional[Tuple[int, int]] = None
+        self._pty_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def wire_time(self, nbytes: int) -> float:
+        """Seconds ``nbytes`` take on the wire (8N1: 10 bits per byte)."""
+        return nbytes * 10 / self.baud_rate
+
+    def reset(self):
+        """Emulate the board reset: bytes are dropped for ``reset_delay`` seconds."""
+        with self._cond:
+            self._booted_at = time.monotonic() + self.reset_delay
+            self._decoder = self._decoder_factory()
+            self._replies.clear()
+
+    def clear(self):
+        """Forget everything recorded so far."""
+        with self._cond:
+            self.received.clear()
+            self.frames.clear()
+            self.bad_frames = 0
+            self.dropped = 0
+
+    def feed(self, data: bytes, now: Optional[float] = None):
+        """Deliver ``data`` to the firmware (arriving at ``now``, default: now)."""
+        now = time.monotonic() if now is None else now
+        with self._cond:
+            if now < self._booted_at:
+                self.dropped += len(data)
+                return
+            self.received += data
+            for frame, ok in self._decoder.feed(data):
+                self._complete(frame, ok, now)
+
+    def _complete(self, frame: bytes, ok: bool, now: float):
+        if ok:
+            self.frames.append(frame)
+        else:
+            self.bad_frames += 1
+        self._busy_until = max(now, self._busy_until) + self.latency
+        if self.acks:
+            rejected = not ok or (self.reject is not None and self.reject(frame))
+            self._replies.append((self._busy_until, NAK if rejected else ACK))
+            self._cond.notify_all()
+
+    def replies_ready(self) -> int:
+        now = time.monotonic()
+        with self._cond:
+            return sum(1 for ready, _ in self._replies if ready <= now)
+
+    def take_replies(self, limit: int, timeout: float) -> bytes:
+        """Up to ``limit`` reply bytes, waiting up to ``timeout`` for the first one."""
+        deadline = time.monotonic() + timeout
+        out = bytearray()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                while self._replies and self._replies[0][0] <= now and len(out) < limit:
+                    out.append(self._replies.popleft()[1])
+                if out or now >= deadline:
+                    return bytes(out)
+                wake = self._replies[0][0] if self._replies else deadline
+                self._cond.wait(max(0.0, min(wake, deadline) - now))
+
+    def drop_replies(self):
+        with self._cond:
+            now = time.monotonic()
+            while self._replies and self._replies[0][0] <= now:
+                self._replies.popleft()
+
+    def open(self, timeout: float = 1.0) -> "VirtualPort":
+        """Open an in-memory port to the device (this resets it, like a real board)."""
+        self.reset()
+        return VirtualPort(self, timeout)
+
+    def start_pty(self) -> str:
+        """Serve the device on a new pseudo terminal and return its path."""
+        import tty
+
+        master, slave = os.openpty()
+        tty.setraw(slave)
+        self._pty = (master, slave)
+        self._stop.clear()
+        self.reset()
+        self._pty_thread = threading.Thread(target=self._serve_pty, name="virtual-device", daemon=True)
+        self._pty_thread.start()
+        return os.ttyname(slave)
+
+    def stop(self):
+        """Stop serving the pty."""
+        if self._pty_thread is None:
+            return
+        self._stop.set()
+        self._pty_thread.join(5)
+        self._pty_thread = None
+        for fd in self._pty:
+            os.close(fd)
+        self._pty = None
+
+    def _serve_pty(self):
+        master = self._pty[0]
+        while not self._stop.is_set():
+            with self._cond:
+                next_reply = self._replies[0][0] if self._replies else None
+            wait = 0.05 if next_reply is None else max(0.0, min(0.05, next_reply - time.monotonic()))
+            readable, _, _ = select.select([master], [], [], wait)
+            if readable:
+                try:
+                    data = os.read(master, 4096)
+                except OSError:
+                    data = b""
+                if data:
+                    # Take the bytes at line speed; the pty buffer pushes back on the writer
+                    time.sleep(self.wire_time(len(data)))
+                    self.feed(data)
+            replies = self.take_replies(4096, 0)
+            if replies:
+                os.write(master, replies)
+
+
+class VirtualPort:
+    """In-memory port to a :class:`VirtualDevice` (the subset of ``serial.Serial`` the backend uses)."""
+
+    def __init__(self, device: VirtualDevice, timeout: float):
+        self.device = device
+        self.timeout = timeout
+        self.is_open = True
+
+    def write(self, data: bytes) -> int:
+        # Block for the time the bytes take on the wire, like write() + flush()
+        time.sleep(self.device.wire_time(len(data)))
+        self.device.feed(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def read(self, size: int = 1) -> bytes:
+        return self.device.take_replies(size, self.timeout)
+
+    @property
+    def in_waiting(self) -> int:
+        return self.device.replies_ready()
+
+    def reset_input_buffer(self):
+        self.device.drop_replies()
+
+    def close(self):
+        self.is_open = False
+
+
+# Devices behind virtual:// URLs, so tests can inspect what they received
+devices: Dict[str, VirtualDevice] = {}
+
+
+def device_for_url(url: str, baud_rate: int) -> VirtualDevice:
+    """The shared device for a ``virtual://?latency=..&reset_delay=..&acks=..`` URL."""
+    if url not in devices:
+        params = {name: values[-1] for name, values in parse_qs(urlsplit(url).query).items()}
+        devices[url] = VirtualDevice(
+            baud_rate=baud_rate,
+            latency=float(params.get("latency", 0)),
+            reset_delay=float(params.get("reset_delay", 0)),
+            acks=params.get("acks", "0").lower() in ("1", "true", "yes"),
+            payload_length=int(params.get("payload_length", 2)),
+        )
+    return devices[url]
@@ -3,67 +3,43 @@ import serial
 import time
 import os
 
+from framing import FrameError, TransmissionPlan, bits_to_bytes
+
 # -------------------- CONFIG --------------------
 JSON_PATH = r"connection\sample_bit_hex.json"
 SERIAL_PORT = "COM3"     # change to your actual COM port
 BAUD_RATE = 115200         # must match your microcontroller
-SYNC_BYTE = b'\xFF'      # 0xFF sync byte in binary
+# Framing (see framing.py): "legacy" is the 0xFF + step bytes framing the
+# current firmware understands (the same header /api/test-hardware sends);
+# "crc" (FF 5A | LEN | payload | CRC16) needs firmware that implements it
+FRAMING = os.getenv("CONNECT_FRAMING", "legacy")
+# Pacing: "chunked" writes whole frames in chunks that fit the board's
+# receive buffer and pauses after each one, "rtscts" relies on hardware
+# flow control, "ack" waits for the board's ACK/NAK replies (crc framing
+# only; opt in once the firmware sends them, like SERIAL_ACKS) and "none"
+# writes the whole plan at once
+PACING = os.getenv("CONNECT_PACING", "chunked")
+CHUNK_BYTES = int(os.getenv("CONNECT_CHUNK_BYTES", "64"))        # board receive buffer
+CHUNK_DELAY = float(os.getenv("CONNECT_CHUNK_DELAY", "0.05"))   # seconds for the MCU to process a chunk
+ACK_WINDOW = 8           # frames sent ahead of the ACKs
+ACK_TIMEOUT = 1.0        # seconds to wait for a reply
+PLAN_SUFFIX = ".plan"    # precompiled plans (see compile_plan)
 # ------------------------------------------------
 
 
-def send_binary_string(ser, binary_str):
-    """
-    Convert a binary string (e.g., '01001100') into a byte and send over serial.
-    Pads automatically if length is not multiple of 8.
-    """
-    # clean and pad
-    binary_str = binary_str.strip()
-    if len(binary_str) % 8 != 0:
-        binary_str = binary_str.zfill(8 - (len(binary_str) % 8) + len(binary_str))
-
-    # split into 8-bit chunks
-    for i in range(0, len(binary_str), 8):
-        chunk = binary_str[i:i+8]
-        byte_val = int(chunk, 2)
-        ser.write(byte_val.to_bytes(1, byteorder='big'))
-        time.sleep(0.05)  # small delay for MCU to process
-
-
-def transmit_json_data(json_path):
-    """Read JSON and send each step’s binary data over serial."""
-    if not os.path.isfile(json_path):
-        print(f"❌ File not found: {json_path}")
-        return
+def step_payload(step):
+    """Frame payload of one sequence step: the step_name byte(s) followed by the purge byte(s)."""
+    return bits_to_bytes(step["step_name"]) + bits_to_bytes(step["purge"])
 
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
 
-    # Connect to serial port
-    try:
-        ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=1)
-        time.sleep(2)  # allow time for connection
-        print(f"✅ Connected to {SERIAL_PORT} at {BAUD_RATE} baud.")
-    except serial.SerialException as e:
-        print(f"❌ Serial connection failed: {e}")
-        return
+def collect_steps(data):
+    """Payloads of every step (a dict with step_name and purge) in document order."""
+    payloads = []
 
-    # Recursive function to find and send any binary pairs
     def process_dict(d):
         if isinstance(d, dict):
             if "step_name" in d and "purge" in d:
-                # Send sync
-                ser.write(SYNC_BYTE)
-                print("↪ Sent sync (0xFF)")
-
-                # Send step_name
-                step_bits = d["step_name"]
-                purge_bits = d["purge"]
-
-                send_binary_string(ser, step_bits)
-                print(f"↪ Sent step_name: {step_bits}")
-
-                send_binary_string(ser, purge_bits)
-                print(f"↪ Sent purge: {purge_bits}")
+                payloads.append(step_payload(d))
 
             # Process nested dicts or lists
             for val in d.values():
@@ -72,12 +48,97 @@ def transmit_json_data(json_path):
             for item in d:
                 process_dict(item)
 
-    # Start sending
     process_dict(data)
+    return payloads
+
+
+def compile_plan(json_path, framing=FRAMING):
+    """Compile phase: turn a bit/hex JSON sequence into a transmission plan (one frame per step)."""
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return TransmissionPlan.compile(collect_steps(data), framing)
+
+
+def load_plan(path, framing=FRAMING):
+    """A plan saved with ``TransmissionPlan.save`` (*.plan, keeps its framing) or compiled from a JSON sequence."""
+    if path.endswith(PLAN_SUFFIX):
+        return TransmissionPlan.load(path)
+    return compile_plan(path, framing)
+
+
+def send_plan(plan, port=SERIAL_PORT, baud_rate=BAUD_RATE, pacing=PACING):
+    """
+    Send phase: stream a compiled plan over serial.
+
+    With ``pacing="chunked"`` frames are written CHUNK_BYTES at most at a
+    time with CHUNK_DELAY pauses; with "ack" (crc plans only) the board's
+    ACKs pace the transmission, with "rtscts" hardware flow control does;
+    "none" is a single write. ``port`` may also be a pyserial URL or the pty path of
+    the virtual device in backend/virtual_device.py.
+    """
+    if pacing == "ack" and plan.framing != "crc":
+        print(f"❌ ACK pacing needs a crc plan, this one uses {plan.framing} framing")
+        return
+
+    # Connect to serial port
+    try:
+        ser = serial.serial_for_url(port, baud_rate, timeout=ACK_TIMEOUT, rtscts=pacing == "rtscts")
+        time.sleep(2)  # allow time for connection
+        ser.reset_input_buffer()
+        print(f"✅ Connected to {port} at {baud_rate} baud.")
+    except serial.SerialException as e:
+        print(f"❌ Serial connection failed: {e}")
+        return
+
+    start = time.perf_counter()
+    try:
+        written = plan.send(ser, acks=pacing == "ack", window=ACK_WINDOW, timeout=ACK_TIMEOUT,
+                            chunk_size=CHUNK_BYTES if pacing == "chunked" else 0, delay=CHUNK_DELAY)
+        print(f"↪ Sent {len(plan)} step(s), {written} bytes in {(time.perf_counter() - start) * 1000:.1f} ms")
+        print("✅ Transmission complete.")
+    except FrameError as e:
+        print(f"❌ Transmission stopped at step {e.index + 1} of {len(plan)}: {e}")
+    finally:
+        ser.close()
+        print("Serial port closed.")
+
+
+def transmit_json_data(json_path, port=SERIAL_PORT, baud_rate=BAUD_RATE, pacing=PACING, save_plan=None, framing=FRAMING):
+    """
+    Read JSON (or a saved *.plan) and send each step’s binary data over serial.
+
+    The sequence is compiled into a plan first (every step one frame,
+    see framing.py); ``save_plan`` writes that plan to disk so repeated
+    runs can skip the compile phase.
+    """
+    if not os.path.isfile(json_path):
+        print(f"❌ File not found: {json_path}")
+        return
 
-    ser.close()
-    print("✅ Transmission complete & serial port closed.")
+    plan = load_plan(json_path, framing)
+    if save_plan:
+        plan.save(save_plan)
+        print(f"✅ Saved plan ({len(plan)} step(s), {len(plan.data)} bytes) to {save_plan}")
+    send_plan(plan, port, baud_rate, pacing)
 
 
 if __name__ == "__main__":
-    transmit_json_data(JSON_PATH)
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Send a bit/hex JSON sequence (or a saved plan) to the board")
+    parser.add_argument("path", nargs="?", default=JSON_PATH, help=f"JSON sequence or *{PLAN_SUFFIX} file")
+    parser.add_argument("port", nargs="?", default=SERIAL_PORT)
+    parser.add_argument("--baud", type=int, default=BAUD_RATE)
+    parser.add_argument("--framing", choices=["legacy", "crc"], default=FRAMING,
+                        help="crc needs firmware that understands FF 5A frames")
+    parser.add_argument("--pacing", choices=["chunked", "rtscts", "ack", "none"], default=PACING,
+                        help="ack needs --framing crc and firmware that answers ACK/NAK")
+    parser.add_argument("--save-plan", help=f"Also save the compiled plan (*{PLAN_SUFFIX})")
+    parser.add_argument("--compile-only", action="store_true", help="Save the plan without sending it")
+    args = parser.parse_args()
+    if args.compile_only:
+        if not args.save_plan:
+            parser.error("--compile-only needs --save-plan")
+        load_plan(args.path, args.framing).save(args.save_plan)
+    else:
+        transmit_json_data(args.path, args.port, args.baud, args.pacing, args.save_plan, args.framing)
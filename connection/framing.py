@@ -0,0 +1,265 @@
+"""Framed serial protocol for sending sequences to the acquisition board.
+
+Two framings are supported. ``legacy`` is what the current firmware
+understands: a 0xFF sync byte followed by the payload bytes, with no
+length or CRC and no reply from the board (``/api/test-hardware`` sends the
+same header with 2-byte payloads). ``crc`` frames need firmware that
+implements them; every frame carries a sync header, a length, the payload
+and a CRC:
+
+    FF 5A | LEN | PAYLOAD (LEN bytes, 1-255) | CRC16 (high byte, low byte)
+
+The CRC is CRC-16/CCITT-FALSE (polynomial 0x1021, initial value 0xFFFF)
+over LEN and PAYLOAD. The board answers every frame with ACK (0x06) once
+it has processed it, or NAK (0x15) when the CRC does not match.
+
+Frames are compiled once into a :class:`TransmissionPlan` (one buffer
+holding all frames plus their offsets, which can be saved and reloaded)
+and written as slices of it, never byte by byte. With acknowledgements
+the board paces the transmission: up to ``window`` frames are written
+ahead of its replies (``crc`` framing only). Without them the plan is
+written in chunks of whole frames no larger than ``chunk_size`` (the
+board's receive buffer) with ``delay`` seconds after each one, or in one
+write when ``chunk_size`` is 0, e.g. with hardware flow control (RTS/CTS),
+where ``ser.write`` itself blocks while the board is busy.
+"""
+
+from __future__ import annotations
+
+import struct
+import time
+from typing import List, Tuple
+
+SYNC = b"\xFF\x5A"
+LEGACY_SYNC = b"\xFF"
+MAX_PAYLOAD = 255
+ACK = 0x06
+NAK = 0x15
+
+
+def _crc_table() -> List[int]:
+    table = []
+    for byte in range(256):
+        crc = byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+        table.append(crc & 0xFFFF)
+    return table
+
+
+_CRC_TABLE = _crc_table()
+
+
+def crc16(data: bytes, crc: int = 0xFFFF) -> int:
+    """CRC-16/CCITT-FALSE of ``data``."""
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFF) ^ _CRC_TABLE[(crc >> 8) ^ byte]
+    return crc
+
+
+def encode_frame(payload: bytes) -> bytes:
+    """Wrap ``payload`` (1-255 bytes) in a frame."""
+    if not 0 < len(payload) <= MAX_PAYLOAD:
+        raise ValueError(f"frame payload must be 1-{MAX_PAYLOAD} bytes, got {len(payload)}")
+    body = bytes([len(payload)]) + payload
+    return SYNC + body + crc16(body).to_bytes(2, "big")
+
+
+def encode_legacy_frame(payload: bytes) -> bytes:
+    """Prefix ``payload`` with the 0xFF sync byte of the legacy framing."""
+    if not payload:
+        raise ValueError("frame payload must not be empty")
+    return LEGACY_SYNC + payload
+
+
+# name -> (encoder, header bytes, trailer bytes); the index is stored in plan files
+FRAMINGS = {
+    "crc": (encode_frame, 3, 2),
+    "legacy": (encode_legacy_frame, 1, 0),
+}
+
+
+def bits_to_bytes(binary_str: str) -> bytes:
+    """Convert a binary string such as '01001100' to bytes, left-padding to whole bytes."""
+    binary_str = binary_str.strip()
+    nbytes = (len(binary_str) + 7) // 8
+    return int(binary_str, 2).to_bytes(nbytes, "big") if binary_str else b""
+
+
+class FrameDecoder:
+    """Incremental frame parser (the board's side; used by the virtual device)."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> List[Tuple[bytes, bool]]:
+        """Consume ``data``; return ``(payload, crc_ok)`` for every frame completed by it."""
+        self._buffer += data
+        frames = []
+        while True:
+            start = self._buffer.find(SYNC)
+            if start < 0:
+                # Keep a trailing 0xFF, it may be the first half of the next header
+                keep = 1 if self._buffer.endswith(SYNC[:1]) else 0
+                del self._buffer[:len(self._buffer) - keep]
+                return frames
+            del self._buffer[:start]
+            if len(self._buffer) < 3:
+                return frames
+            length = self._buffer[2]
+            end = 3 + length + 2
+            if length == 0:
+                del self._buffer[:2]
+                continue
+            if len(self._buffer) < end:
+                return frames
+            body = bytes(self._buffer[2:3 + length])
+            ok = crc16(body) == int.from_bytes(self._buffer[3 + length:end], "big")
+            frames.append((body[1:], ok))
+            # A bad frame may be a false header; resync right after it
+            del self._buffer[:end if ok else 2]
+
+
+class FrameError(Exception):
+    """The board rejected a frame (NAK) or did not answer in time."""
+
+    def __init__(self, index: int, message: str):
+        super().__init__(f"frame {index}: {message}")
+        self.index = index
+
+
+class TransmissionPlan:
+    """Frames encoded back to back in one buffer, with the offset of each frame.
+
+    Built once with :meth:`compile` (or loaded from a file saved with
+    :meth:`save`), a plan is sent with :meth:`send` without any per-frame
+    conversion: every write is a slice of the buffer.
+
+    Plan files start with ``DAQPLAN2``, then the framing (its index in
+    FRAMINGS), the frame count and the ``count + 1`` frame offsets as
+    little-endian uint32, then the frames.
+    """
+
+    MAGIC = b"DAQPLAN2"
+
+    def __init__(self, data: bytes, offsets: List[int], framing: str = "crc"):
+        if not offsets or offsets[0] != 0 or offsets[-1] != len(data):
+            raise ValueError("plan offsets don't match its data")
+        if framing not in FRAMINGS:
+            raise ValueError(f"unknown framing {framing!r}")
+        self.data = data
+        self.offsets = offsets
+        self.framing = framing
+
+    @classmethod
+    def compile(cls, payloads: List[bytes], framing: str = "crc") -> "TransmissionPlan":
+        encode = FRAMINGS[framing][0]
+        buffer = bytearray()
+        offsets = [0]
+        for payload in payloads:
+            buffer += encode(payload)
+            offsets.append(len(buffer))
+        return cls(bytes(buffer), offsets, framing)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def frame(self, index: int) -> memoryview:
+        return memoryview(self.data)[self.offsets[index]:self.offsets[index + 1]]
+
+    def payloads(self) -> List[bytes]:
+        """The payloads of the frames (header, length and CRC stripped)."""
+        _, head, tail = FRAMINGS[self.framing]
+        return [self.data[self.offsets[i] + head:self.offsets[i + 1] - tail] for i in range(len(self))]
+
+    def save(self, path) -> None:
+        framing = list(FRAMINGS).index(self.framing)
+        header = struct.pack(f"<{len(self.MAGIC)}sII{len(self.offsets)}I", self.MAGIC, framing, len(self), *self.offsets)
+        with open(path, "wb") as f:
+            f.write(header + self.data)
+
+    @classmethod
+    def load(cls, path) -> "TransmissionPlan":
+        with open(path, "rb") as f:
+            blob = f.read()
+        magic_size = len(cls.MAGIC)
+        if blob[:magic_size] != cls.MAGIC:
+            raise ValueError(f"{path} is not a transmission plan")
+        framing, count = struct.unpack_from("<II", blob, magic_size)
+        offsets = list(struct.unpack_from(f"<{count + 1}I", blob, magic_size + 8))
+        return cls(blob[magic_size + 4 * (count + 3):], offsets, list(FRAMINGS)[framing])
+
+    def _chunks(self, chunk_size: int) -> List[Tuple[int, int]]:
+        """``(start, end)`` byte ranges of runs of whole frames of at most ``chunk_size`` bytes."""
+        chunks = []
+        start = 0
+        for index in range(len(self)):
+            end = self.offsets[index + 1]
+            if end - start > chunk_size and self.offsets[index] > start:
+                chunks.append((start, self.offsets[index]))
+                start = self.offsets[index]
+        if start < len(self.data):
+            chunks.append((start, len(self.data)))
+        return chunks
+
+    def send(self, ser, acks: bool = True, window: int = 8, timeout: float = 1.0, retries: int = 2,
+             chunk_size: int = 0, delay: float = 0.0) -> int:
+        """Stream the plan to ``ser``; returns the bytes written.
+
+        Without ``acks`` each write is the run of frames that fits in
+        ``chunk_size`` bytes (a larger frame goes alone), followed by a
+        ``delay`` second pause; ``chunk_size`` 0 writes the whole plan at
+        once. With ``acks`` each
+        write is the run of frames that fits in the window (up to
+        ``window`` frames in flight) and replies are matched to frames in
+        order. A NAK'd frame is resent up to ``retries`` times when
+        ``window`` is 1 (with a larger window the frames after it were
+        already processed, so the send stops). Raises FrameError, or
+        ValueError for ``acks`` with a framing the board does not answer.
+        """
+        view = memoryview(self.data)
+        if acks and self.framing != "crc":
+            raise ValueError(f"acknowledgements need the crc framing, not {self.framing}")
+        if not acks:
+            if chunk_size <= 0:
+                ser.write(view)
+                ser.flush()
+                return len(self.data)
+            for start, end in self._chunks(chunk_size):
+                if start:
+                    time.sleep(delay)
+                ser.write(view[start:end])
+                ser.flush()
+            return len(self.data)
+
+        window = max(1, window)
+        count = len(self)
+        next_frame = 0
+        acked = 0
+        attempts = 0
+        written = 0
+        deadline = time.monotonic() + timeout
+        while acked < count:
+            end = min(count, acked + window)
+            if next_frame < end:
+                chunk = view[self.offsets[next_frame]:self.offsets[end]]
+                ser.write(chunk)
+                written += len(chunk)
+                ser.flush()
+                next_frame = end
+                deadline = time.monotonic() + timeout
+            reply = ser.read(1)
+            if not reply:
+                if time.monotonic() > deadline:
+                    raise FrameError(acked, f"no reply within {timeout}s")
+                continue
+            if reply[0] == ACK:
+                acked += 1
+                attempts = 0
+                deadline = time.monotonic() + timeout
+            elif reply[0] == NAK:
+                if window > 1 or attempts >= retries:
+                    raise FrameError(acked, "rejected by the board (NAK)")
+                attempts += 1
+                next_frame = acked
+        return written
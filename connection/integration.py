@@ -8,20 +8,25 @@ Bulk endpoints:
 - /api/element-information/bulk
 - /api/analytical-conditions/bulk
 
-Individual endpoints (by ID):
-- /api/attenuator-information/{id}
-- /api/channel-information/{id}
-- /api/element-information/{id}
-- /api/analytical-conditions/{id}
+Batch by-ID endpoints:
+- /api/attenuator-information?ids=1,2,3
+- /api/channel-information?ids=1,2,3
+- /api/element-information?ids=1,2,3
+- /api/analytical-conditions?ids=1,2,3
 
 Workflow:
-1. Fetch all bulk endpoints to get all records
-2. For each record returned, fetch the individual record by ID
+1. Fetch all bulk endpoints (summary view) to get all record IDs
+2. Fetch the full records by ID, BY_ID_BATCH_SIZE IDs per request
 3. Combine all results in `attenuator_info.json`
 
 Run from the `connection` folder:
 python integration.py --base-url http://localhost:8000
 
+To fetch only the current configuration of one analytical group, use
+``--group``; it is read with a single call to
+/api/groups/{analytical_group}/snapshot:
+python integration.py --group "LAS 2023"
+
 Output:
 A JSON file containing bulk data and individual records retrieved by ID.
 If bulk fetch returns no records, individual endpoint fetching is skipped.
@@ -33,13 +38,19 @@ import argparse
 import json
 import logging
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import quote
 
 import requests
 
 
 DEFAULT_BASE_URL = "http://localhost:8000"
 OUTPUT_FILENAME = "attenuator_info.json"
+# The bulk listing is only used to discover record IDs (full records are then
+# fetched by ID), so ask for the summary view without the heavy JSON columns.
+BULK_PARAMS = {"view": "summary"}
+# IDs per batch by-ID request (keeps the query string short)
+BY_ID_BATCH_SIZE = 200
 ENDPOINTS = {
 	"attenuator_information": {
 		"bulk": "/api/attenuator-information/bulk",
@@ -60,13 +71,31 @@ ENDPOINTS = {
 }
 
 
-def fetch_endpoint(base_url: str, path: str, timeout: float = 5.0) -> Dict[str, Any]:
+def fetch_endpoint(
+	base_url: str,
+	path: str,
+	timeout: float = 5.0,
+	params: Optional[Dict[str, Any]] = None,
+	previous: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+	"""GET an endpoint and wrap the result.
+
+	If ``previous`` (the result of the same call in an earlier run) carries an
+	ETag it is sent as If-None-Match, and on 304 Not Modified ``previous`` is
+	returned as-is instead of downloading the payload again.
+	"""
 	url = base_url.rstrip("/") + path
+	headers = {}
+	if previous and previous.get("success") and previous.get("etag"):
+		headers["If-None-Match"] = previous["etag"]
 	try:
-		resp = requests.get(url, timeout=timeout)
+		resp = requests.get(url, params=params, headers=headers, timeout=timeout)
 	except Exception as e:
 		return {"success": False, "error": f"Request failed: {e}"}
 
+	if resp.status_code == 304 and headers:
+		return previous
+
 	if resp.status_code != 200:
 		return {"success": False, "status_code": resp.status_code, "text": resp.text}
 
@@ -75,53 +104,108 @@ def fetch_endpoint(base_url: str, path: str, timeout: float = 5.0) -> Dict[str,
 	except Exception as e:
 		return {"success": False, "error": f"Invalid JSON response: {e}", "text": resp.text}
 
+	etag = {"etag": resp.headers["ETag"]} if "ETag" in resp.headers else {}
+
 	# Many of the bulk endpoints return a wrapper { success, message, count, records }
 	# We prefer to store the `records` array when present.
 	if isinstance(data, dict) and "records" in data:
-		return {"success": True, "records": data.get("records", [])}
+		missing = {"missing_ids": data["missing_ids"]} if "missing_ids" in data else {}
+		return {"success": True, "records": data.get("records", []), **missing, **etag}
 
 	# Otherwise store the whole response
-	return {"success": True, "data": data}
-
-
-def collect_all(base_url: str) -> Dict[str, Any]:
-	"""Fetch bulk endpoints, then fetch individual records by ID.
+	return {"success": True, "data": data, **etag}
+
+
+def fetch_by_ids(
+	base_url: str,
+	path: str,
+	record_ids: List[int],
+	previous: Optional[Dict[str, Any]] = None,
+) -> Tuple[Dict[int, Any], Dict[str, Any]]:
+	"""Fetch records by ID in batches of BY_ID_BATCH_SIZE.
+
+	Returns ``(by_id, batches)``: the per-ID results (the record, or the
+	error of its batch / 404 if it does not exist) and per-batch validators.
+	``previous`` is the endpoint section of an earlier run; a batch whose
+	ETag still matches is taken from its ``by_id`` results, unless one of
+	its IDs has no previous result.
+	"""
+	previous = previous or {}
+	prev_by_id = previous.get("by_id", {})
+	prev_batches = previous.get("by_id_batches", {})
+	by_id: Dict[int, Any] = {}
+	batches: Dict[str, Any] = {}
+
+	for start in range(0, len(record_ids), BY_ID_BATCH_SIZE):
+		chunk = record_ids[start:start + BY_ID_BATCH_SIZE]
+		key = ",".join(str(record_id) for record_id in chunk)
+		logging.info(f"  Fetching {len(chunk)} record(s) by ID from {path}")
+		prev_batch = prev_batches.get(key)
+		if prev_batch and any(prev_by_id.get(str(record_id)) is None for record_id in chunk):
+			# An ID without a previous result counts as changed: fetch the whole batch
+			prev_batch = None
+		res = fetch_endpoint(base_url, path, params={"ids": key}, previous=prev_batch)
+		if res.get("success") and "records" not in res:
+			# 304: the batch is unchanged, reuse the previous per-ID results
+			by_id.update((record_id, prev_by_id[str(record_id)]) for record_id in chunk)
+			batches[key] = res
+			continue
+		if not res.get("success"):
+			by_id.update((record_id, res) for record_id in chunk)
+			continue
+		for record in res["records"]:
+			by_id[record["id"]] = {"success": True, "data": record}
+		for record_id in res.get("missing_ids", []):
+			by_id[record_id] = {"success": False, "status_code": 404}
+		batches[key] = {k: v for k, v in res.items() if k != "records"}
+	return by_id, batches
+
+
+def collect_all(base_url: str, previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+	"""Fetch bulk endpoints, then fetch the listed records by ID in batches.
 	
 	For each endpoint:
 	1. Fetch the bulk endpoint to get all records
-	2. For each record returned, fetch the individual record by ID
+	2. Fetch the full records returned with the batch by-ID endpoint
 	3. Store both bulk and individual results
+	
+	``previous`` is the ``data`` section of an earlier output file; its ETags
+	are used for conditional requests so unchanged payloads are not re-sent.
 	"""
 	results: Dict[str, Any] = {}
+	previous = previous or {}
 	
 	for endpoint_key, paths in ENDPOINTS.items():
+		prev_endpoint = previous.get(endpoint_key, {})
 		logging.info(f"Fetching bulk {endpoint_key} from {paths['bulk']}")
-		bulk_res = fetch_endpoint(base_url, paths["bulk"])
+		bulk_res = fetch_endpoint(base_url, paths["bulk"], params=BULK_PARAMS, previous=prev_endpoint.get("bulk"))
 		
 		# Initialize result structure
 		results[endpoint_key] = {
 			"bulk": bulk_res,
-			"by_id": {}
+			"by_id": {},
+			"by_id_batches": {}
 		}
 		
-		# If bulk fetch was successful and has records, fetch each by ID
+		# If bulk fetch was successful and has records, fetch them by ID
 		if bulk_res.get("success") and bulk_res.get("records"):
-			records = bulk_res["records"]
-			logging.info(f"Retrieved {len(records)} {endpoint_key} record(s), fetching each by ID...")
-			
-			for record in records:
-				record_id = record.get("id")
-				if record_id:
-					individual_path = f"{paths['by_id']}/{record_id}"
-					logging.info(f"  Fetching {endpoint_key} ID {record_id}")
-					individual_res = fetch_endpoint(base_url, individual_path)
-					results[endpoint_key]["by_id"][record_id] = individual_res
+			record_ids = [record["id"] for record in bulk_res["records"] if record.get("id")]
+			logging.info(f"Retrieved {len(record_ids)} {endpoint_key} record(s), fetching them by ID...")
+			by_id, batches = fetch_by_ids(base_url, paths["by_id"], record_ids, prev_endpoint)
+			results[endpoint_key]["by_id"] = by_id
+			results[endpoint_key]["by_id_batches"] = batches
 		else:
 			logging.warning(f"No records returned from bulk {endpoint_key} endpoint")
 	
 	return results
 
 
+def collect_group(base_url: str, analytical_group: str, previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+	"""Fetch the current configuration of every resource of one group in a single request."""
+	path = f"/api/groups/{quote(analytical_group, safe='')}/snapshot"
+	logging.info(f"Fetching snapshot of group {analytical_group} from {path}")
+	return {"snapshot": fetch_endpoint(base_url, path, previous=(previous or {}).get("snapshot"))}
+
 
 def write_output_file(output_path: Path, payload: Dict[str, Any]) -> None:
 	output_path.write_text(json.dumps(payload, indent=2, ensure_ascii=False))
@@ -131,6 +215,7 @@ def main() -> int:
 	parser = argparse.ArgumentParser(description="Fetch DAQ endpoints and write combined JSON")
 	parser.add_argument("--base-url", default=DEFAULT_BASE_URL, help="Base URL of the DAQ backend")
 	parser.add_argument("--out", default=OUTPUT_FILENAME, help="Output filename in this folder")
+	parser.add_argument("--group", help="Only fetch the current configuration of this analytical group")
 	args = parser.parse_args()
 
 	logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
@@ -138,14 +223,26 @@ def main() -> int:
 	script_dir = Path(__file__).resolve().parent
 	output_path = script_dir / args.out
 
+	# Reuse the previous output (if any) for conditional requests
+	previous = None
+	if output_path.exists():
+		try:
+			previous = json.loads(output_path.read_text()).get("data")
+		except Exception as e:
+			logging.warning(f"Ignoring unreadable previous output {output_path}: {e}")
+
 	logging.info(f"Collecting data from {args.base_url}")
-	payload = collect_all(args.base_url)
+	if args.group:
+		payload = collect_group(args.base_url, args.group, previous)
+	else:
+		payload = collect_all(args.base_url, previous)
 
 	# Add some metadata
 	final = {
 		"meta": {
 			"base_url": args.base_url,
 			"source": "integration.py",
+			"analytical_group": args.group,
 		},
 		"data": payload,
 	}
@@ -5,6 +5,14 @@ import requests
 import json
 from typing import Optional, Dict, Any, List
 import os
+from urllib.parse import quote
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
 
 class DataManager:
     """Singleton class to manage data across all pages and handle API communication"""
@@ -14,9 +22,15 @@ class DataManager:
     # Backend API base URL
     API_BASE_URL = "http://localhost:8000/api"
     
+    # Exchange MessagePack instead of JSON with the backend when available
+    USE_MSGPACK = msgpack is not None
+    
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(DataManager, cls).__new__(cls)
+            # Last response per (url, params) for conditional GETs:
+            # {key: (etag, content type, body)}
+            cls._instance._etag_cache = {}
             cls._data = {
                 'analytical_condition': {},
                 'element_information': {},
@@ -78,6 +92,66 @@ class DataManager:
     # API Integration Methods
     # ========================================================================
     
+    def _decode_body(self, content_type: str, content: bytes) -> Dict[str, Any]:
+        """Decode a JSON or MessagePack body"""
+        if content_type.startswith(MSGPACK_MEDIA_TYPE):
+            return msgpack.unpackb(content)
+        return json.loads(content)
+    
+    def _decode_response(self, response: requests.Response) -> Dict[str, Any]:
+        """Decode a JSON or MessagePack response body"""
+        return self._decode_body(response.headers.get("Content-Type", ""), response.content)
+    
+    def _put_group_config(self, path: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        PUT a record as the current configuration of its analytical group.
+        
+        Replaces the group's active configuration instead of appending another
+        copy; the backend skips the write when nothing changed. Sent as
+        MessagePack if enabled.
+        """
+        url = f"{self.API_BASE_URL}{path}/groups/{quote(data.get('analytical_group', ''), safe='')}"
+        if self.USE_MSGPACK:
+            response = requests.put(
+                url,
+                data=msgpack.packb(data),
+                headers={"Content-Type": MSGPACK_MEDIA_TYPE, "Accept": MSGPACK_MEDIA_TYPE},
+                timeout=10
+            )
+        else:
+            response = requests.put(
+                url,
+                json=data,
+                headers={"Content-Type": "application/json"},
+                timeout=10
+            )
+        response.raise_for_status()
+        return self._decode_response(response)
+    
+    def _fetch_records(self, path: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        GET a bulk endpoint and return its records, revalidating with ETags.
+        
+        The previous ETag for the same URL and parameters is sent as
+        If-None-Match; on 304 Not Modified the cached body is decoded again
+        instead of downloading it, so every caller gets its own records.
+        """
+        url = f"{self.API_BASE_URL}{path}"
+        key = (url, tuple(sorted(params.items())), self.USE_MSGPACK)
+        cached = self._etag_cache.get(key)
+        headers = {"If-None-Match": cached[0]} if cached else {}
+        if self.USE_MSGPACK:
+            headers["Accept"] = MSGPACK_MEDIA_TYPE
+        
+        response = requests.get(url, params=params, headers=headers, timeout=10)
+        if response.status_code == 304 and cached:
+            return self._decode_body(cached[1], cached[2]).get('records', [])
+        response.raise_for_status()
+        etag = response.headers.get("ETag")
+        if etag:
+            self._etag_cache[key] = (etag, response.headers.get("Content-Type", ""), response.content)
+        return self._decode_response(response).get('records', [])
+    
     def upload_analytical_condition(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Upload analytical condition data to backend API
@@ -86,20 +160,10 @@ class DataManager:
             data: Single analytical condition record
             
         Returns:
-            API response with created record including ID and timestamps
+            API response with the group's current record including ID and timestamps
         """
         try:
-            # Wrap single record in bulk format
-            bulk_data = {"records": [data]}
-            
-            response = requests.post(
-                f"{self.API_BASE_URL}/analytical-conditions/bulk",
-                json=bulk_data,
-                headers={"Content-Type": "application/json"},
-                timeout=10
-            )
-            response.raise_for_status()
-            return response.json()
+            return self._put_group_config("/analytical-conditions", data)
         except requests.exceptions.RequestException as e:
             raise Exception(f"API Error: {str(e)}")
     
@@ -114,16 +178,7 @@ class DataManager:
             API response with created record
         """
         try:
-            bulk_data = {"records": [data]}
-            
-            response = requests.post(
-                f"{self.API_BASE_URL}/element-information/bulk",
-                json=bulk_data,
-                headers={"Content-Type": "application/json"},
-                timeout=10
-            )
-            response.raise_for_status()
-            return response.json()
+            return self._put_group_config("/element-information", data)
         except requests.exceptions.RequestException as e:
             raise Exception(f"API Error: {str(e)}")
     
@@ -138,16 +193,7 @@ class DataManager:
             API response with created record
         """
         try:
-            bulk_data = {"records": [data]}
-            
-            response = requests.post(
-                f"{self.API_BASE_URL}/channel-information/bulk",
-                json=bulk_data,
-                headers={"Content-Type": "application/json"},
-                timeout=10
-            )
-            response.raise_for_status()
-            return response.json()
+            return self._put_group_config("/channel-information", data)
         except requests.exceptions.RequestException as e:
             raise Exception(f"API Error: {str(e)}")
     
@@ -162,16 +208,7 @@ class DataManager:
             API response with created record
         """
         try:
-            bulk_data = {"records": [data]}
-            
-            response = requests.post(
-                f"{self.API_BASE_URL}/attenuator-information/bulk",
-                json=bulk_data,
-                headers={"Content-Type": "application/json"},
-                timeout=10
-            )
-            response.raise_for_status()
-            return response.json()
+            return self._put_group_config("/attenuator-information", data)
         except requests.exceptions.RequestException as e:
             raise Exception(f"API Error: {str(e)}")
     
@@ -190,14 +227,7 @@ class DataManager:
             if analytical_group:
                 params['analytical_group'] = analytical_group
             
-            response = requests.get(
-                f"{self.API_BASE_URL}/analytical-conditions/bulk",
-                params=params,
-                timeout=10
-            )
-            response.raise_for_status()
-            result = response.json()
-            return result.get('records', [])
+            return self._fetch_records("/analytical-conditions/bulk", params)
         except requests.exceptions.RequestException as e:
             raise Exception(f"API Error: {str(e)}")
     
@@ -208,14 +238,7 @@ class DataManager:
             if analytical_group:
                 params['analytical_group'] = analytical_group
             
-            response = requests.get(
-                f"{self.API_BASE_URL}/element-information/bulk",
-                params=params,
-                timeout=10
-            )
-            response.raise_for_status()
-            result = response.json()
-            return result.get('records', [])
+            return self._fetch_records("/element-information/bulk", params)
         except requests.exceptions.RequestException as e:
             raise Exception(f"API Error: {str(e)}")
     
@@ -226,14 +249,7 @@ class DataManager:
             if analytical_group:
                 params['analytical_group'] = analytical_group
             
-            response = requests.get(
-                f"{self.API_BASE_URL}/channel-information/bulk",
-                params=params,
-                timeout=10
-            )
-            response.raise_for_status()
-            result = response.json()
-            return result.get('records', [])
+            return self._fetch_records("/channel-information/bulk", params)
         except requests.exceptions.RequestException as e:
             raise Exception(f"API Error: {str(e)}")
     
@@ -244,14 +260,7 @@ class DataManager:
             if analytical_group:
                 params['analytical_group'] = analytical_group
             
-            response = requests.get(
-                f"{self.API_BASE_URL}/attenuator-information/bulk",
-                params=params,
-                timeout=10
-            )
-            response.raise_for_status()
-            result = response.json()
-            return result.get('records', [])
+            return self._fetch_records("/attenuator-information/bulk", params)
         except requests.exceptions.RequestException as e:
             raise Exception(f"API Error: {str(e)}")
     def save_measurement_mode(self, data):